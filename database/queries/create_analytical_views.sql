@@ -73,24 +73,26 @@ ORDER BY
 -- ------------------------------------------------------
 -- View 2: Top 2 and Bottom 2 Pollutants by State (Southern India)
 -- Requirement: Southern states (April 2022 onwards)
+-- Readings listing several pollutants count once for each of them
 -- ------------------------------------------------------
 
 CREATE OR REPLACE VIEW vw_south_india_pollutants AS
 WITH pollutant_counts AS (
     SELECT 
         s.state_name,
-        f.prominent_pollutants as pollutant,
+        p.pollutant_code as pollutant,
         COUNT(*) as occurrence_count,
         AVG(f.aqi_value) as avg_aqi_for_pollutant
     FROM 
         fact_aqi_daily f
         JOIN dim_state s ON f.state_id = s.state_id
+        JOIN aqi_pollutant ap ON ap.aqi_id = f.aqi_id
+        JOIN dim_pollutant p ON p.pollutant_id = ap.pollutant_id
     WHERE 
         s.region = 'South'
         AND f.date_value >= '2022-04-01'
-        AND f.prominent_pollutants IS NOT NULL
     GROUP BY 
-        s.state_name, f.prominent_pollutants
+        s.state_name, p.pollutant_code
 ),
 ranked_pollutants AS (
     SELECT 
@@ -173,7 +175,7 @@ WITH state_area_count AS (
         state_id,
         COUNT(DISTINCT city_id) as distinct_areas
     FROM 
-        fact_aqi_daily
+        fact_aqi_monthly
     GROUP BY 
         state_id
     ORDER BY 
@@ -181,21 +183,21 @@ WITH state_area_count AS (
     LIMIT 10
 ),
 monthly_aqi AS (
+    -- Read from the monthly rollup: mean = SUM(aqi_sum) / SUM(aqi_count)
     SELECT 
         s.state_name,
-        d.month,
-        d.month_name,
-        AVG(f.aqi_value) as avg_monthly_aqi,
-        COUNT(DISTINCT f.city_id) as cities_count
+        r.month,
+        MONTHNAME(MAKEDATE(2000, 1) + INTERVAL (r.month - 1) MONTH) as month_name,
+        SUM(r.aqi_sum) / SUM(r.aqi_count) as avg_monthly_aqi,
+        COUNT(DISTINCT r.city_id) as cities_count
     FROM 
-        fact_aqi_daily f
-        JOIN dim_state s ON f.state_id = s.state_id
-        JOIN dim_date d ON f.date_id = d.date_id
+        fact_aqi_monthly r
+        JOIN dim_state s ON r.state_id = s.state_id
     WHERE 
-        f.state_id IN (SELECT state_id FROM state_area_count)
-        AND f.aqi_value IS NOT NULL
+        r.state_id IN (SELECT state_id FROM state_area_count)
+        AND r.aqi_count > 0
     GROUP BY 
-        s.state_name, d.month, d.month_name
+        s.state_name, r.month
 ),
 ranked_months AS (
     SELECT 
@@ -380,6 +382,8 @@ ORDER BY
 
 CREATE OR REPLACE VIEW vw_city_severity_risk AS
 WITH city_metrics AS (
+    -- Daily rows, not the monthly rollup: the view reports per prominent
+    -- pollutant combination and counts distinct monitored days
     SELECT 
         c.city_name,
         s.state_name,
@@ -447,17 +451,19 @@ ORDER BY
 
 CREATE OR REPLACE VIEW vw_health_aqi_correlation AS
 WITH monthly_aqi AS (
+    -- Read from the monthly rollup instead of re-aggregating fact_aqi_daily
     SELECT 
         s.state_name,
-        d.year,
-        d.month,
-        AVG(f.aqi_value) as avg_monthly_aqi
+        r.year,
+        r.month,
+        SUM(r.aqi_sum) / NULLIF(SUM(r.aqi_count), 0) as avg_monthly_aqi
     FROM 
-        fact_aqi_daily f
-        JOIN dim_state s ON f.state_id = s.state_id
-        JOIN dim_date d ON f.date_id = d.date_id
+        fact_aqi_monthly r
+        JOIN dim_state s ON r.state_id = s.state_id
+    WHERE 
+        r.year >= 2022
     GROUP BY 
-        s.state_name, d.year, d.month
+        s.state_name, r.year, r.month
 ),
 monthly_health AS (
     SELECT 
@@ -496,6 +502,7 @@ ORDER BY
 -- ------------------------------------------------------
 -- View: Pollutant-Specific Analysis
 -- Purpose: Identify dominant pollutants by region
+-- (one count per pollutant via the aqi_pollutant bridge)
 -- ------------------------------------------------------
 
 CREATE OR REPLACE VIEW vw_pollutant_analysis AS
@@ -503,7 +510,7 @@ SELECT
     s.state_name,
     s.region,
     c.city_tier,
-    f.prominent_pollutants as pollutant,
+    p.pollutant_code as pollutant,
     COUNT(*) as occurrence_count,
     AVG(f.aqi_value) as avg_aqi_for_pollutant,
     MIN(f.aqi_value) as min_aqi,
@@ -513,11 +520,12 @@ FROM
     fact_aqi_daily f
     JOIN dim_state s ON f.state_id = s.state_id
     JOIN dim_city c ON f.city_id = c.city_id
+    JOIN aqi_pollutant ap ON ap.aqi_id = f.aqi_id
+    JOIN dim_pollutant p ON p.pollutant_id = ap.pollutant_id
 WHERE 
-    f.prominent_pollutants IS NOT NULL
-    AND f.date_value >= '2022-01-01'
+    f.date_value >= '2022-01-01'
 GROUP BY 
-    s.state_name, s.region, c.city_tier, f.prominent_pollutants
+    s.state_name, s.region, c.city_tier, p.pollutant_code
 ORDER BY 
     s.region, occurrence_count DESC;
 
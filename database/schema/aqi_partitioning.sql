@@ -0,0 +1,93 @@
+-- =====================================================
+-- AirPure AQI Analytics - AQI Date Partitioning (opt-in)
+-- =====================================================
+-- Splits aqi_daily (schema v2) and fact_aqi_daily (star schema) into one
+-- RANGE partition per year of the reading date, so date-window queries
+-- only read the years they ask for, and adds the composite covering
+-- indexes declared in the schema files to databases created before them.
+--
+-- Run after loading, e.g.:
+--     python index_advisor.py --migrate
+-- (applies this file statement by statement, then checks the plans).
+-- Statements whose change is already in place only warn. A full reload
+-- (etl_simple.py without --incremental, etl_star_schema.py --rebuild)
+-- recreates the tables unpartitioned, so run the migration again after it.
+--
+-- MySQL requires the partitioning column in every unique key, so the
+-- primary keys become (id, date) / (aqi_id, date_value) and the date
+-- becomes NOT NULL: rows without a date must be fixed or removed first
+--     SELECT COUNT(*) FROM aqi_daily WHERE date IS NULL
+-- Partitioned InnoDB tables cannot have foreign keys, so those of
+-- fact_aqi_daily are dropped (etl_star_schema.py resolves the keys).
+--
+-- Each year needs its partition before its first reading arrives.
+-- Readings beyond the last year land in pmax (index_advisor.py warns):
+--     ALTER TABLE aqi_daily REORGANIZE PARTITION pmax INTO (
+--         PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+--         PARTITION pmax VALUES LESS THAN (MAXVALUE))
+-- =====================================================
+
+USE airpure_aqi_db;
+
+-- =====================================================
+-- aqi_daily
+-- =====================================================
+
+ALTER TABLE aqi_daily ADD INDEX idx_state_date_aqi (state, date, aqi_value);
+
+ALTER TABLE aqi_daily ADD INDEX idx_area_date_aqi_status (area, date, aqi_value, air_quality_status);
+
+-- Prefixes of the covering indexes
+ALTER TABLE aqi_daily DROP INDEX idx_state;
+
+ALTER TABLE aqi_daily DROP INDEX idx_area;
+
+ALTER TABLE aqi_daily
+    MODIFY date DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, date)
+PARTITION BY RANGE COLUMNS (date) (
+    PARTITION p_old VALUES LESS THAN ('2020-01-01'),
+    PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+-- =====================================================
+-- fact_aqi_daily
+-- =====================================================
+
+-- Foreign keys in schema order (MySQL's generated names)
+ALTER TABLE fact_aqi_daily
+    DROP FOREIGN KEY fact_aqi_daily_ibfk_1,
+    DROP FOREIGN KEY fact_aqi_daily_ibfk_2,
+    DROP FOREIGN KEY fact_aqi_daily_ibfk_3;
+
+ALTER TABLE fact_aqi_daily ADD INDEX idx_state_date_aqi (state_id, date_value, aqi_value);
+
+ALTER TABLE fact_aqi_daily ADD INDEX idx_city_date_aqi_status (city_id, date_value, aqi_value, air_quality_status);
+
+ALTER TABLE fact_aqi_daily DROP INDEX idx_state;
+
+ALTER TABLE fact_aqi_daily DROP INDEX idx_city;
+
+ALTER TABLE fact_aqi_daily
+    MODIFY date_value DATE NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (aqi_id, date_value)
+PARTITION BY RANGE COLUMNS (date_value) (
+    PARTITION p_old VALUES LESS THAN ('2020-01-01'),
+    PARTITION p2020 VALUES LESS THAN ('2021-01-01'),
+    PARTITION p2021 VALUES LESS THAN ('2022-01-01'),
+    PARTITION p2022 VALUES LESS THAN ('2023-01-01'),
+    PARTITION p2023 VALUES LESS THAN ('2024-01-01'),
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
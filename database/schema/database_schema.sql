@@ -59,6 +59,7 @@ CREATE TABLE dim_pollutant (
     pollutant_name VARCHAR(100),
     pollutant_category VARCHAR(50),  -- Particulate Matter, Gas, etc.
     health_impact VARCHAR(255),
+    bit_position TINYINT UNIQUE,  -- bit in fact_aqi_daily.pollutant_mask
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -80,6 +81,7 @@ CREATE TABLE dim_population (
 -- =====================================================
 
 -- Fact: Daily AQI Measurements
+-- Partitioned by year with the opt-in migration aqi_partitioning.sql
 CREATE TABLE fact_aqi_daily (
     aqi_id BIGINT AUTO_INCREMENT PRIMARY KEY,
     date_id INT,
@@ -90,6 +92,7 @@ CREATE TABLE fact_aqi_daily (
     city_name VARCHAR(100),
     number_of_monitoring_stations INT,
     prominent_pollutants VARCHAR(255),
+    pollutant_mask SMALLINT UNSIGNED NOT NULL DEFAULT 0,  -- bit per dim_pollutant.bit_position
     aqi_value DECIMAL(10, 2),
     air_quality_status VARCHAR(50),
     unit VARCHAR(200),
@@ -99,9 +102,51 @@ CREATE TABLE fact_aqi_daily (
     FOREIGN KEY (state_id) REFERENCES dim_state(state_id),
     FOREIGN KEY (city_id) REFERENCES dim_city(city_id),
     INDEX idx_date (date_value),
+    -- Covering indexes for the views' date windows joined by state / city
+    -- (they also back the state_id and city_id foreign keys)
+    INDEX idx_state_date_aqi (state_id, date_value, aqi_value),
+    INDEX idx_city_date_aqi_status (city_id, date_value, aqi_value, air_quality_status),
+    INDEX idx_aqi_value (aqi_value)
+);
+
+-- Bridge: Daily AQI reading <-> Pollutant (one row per prominent pollutant)
+-- Filled by etl_star_schema.py from pollutant_mask, with no foreign key
+-- to fact_aqi_daily so the fact table can be partitioned
+CREATE TABLE aqi_pollutant (
+    aqi_id BIGINT NOT NULL,
+    pollutant_id INT NOT NULL,
+    PRIMARY KEY (aqi_id, pollutant_id),
+    FOREIGN KEY (pollutant_id) REFERENCES dim_pollutant(pollutant_id),
+    INDEX idx_pollutant (pollutant_id, aqi_id)
+);
+
+-- Fact: Monthly AQI Rollup (one row per city and month)
+-- Maintained by etl_star_schema.py alongside fact_aqi_daily. The
+-- analytical views read monthly means and severe-day counts from here
+CREATE TABLE fact_aqi_monthly (
+    state_name VARCHAR(100) NOT NULL,
+    city_name VARCHAR(100) NOT NULL,
+    year INT NOT NULL,
+    month INT NOT NULL,
+    state_id INT,
+    city_id INT,
+    aqi_sum DECIMAL(16, 2) NOT NULL DEFAULT 0,
+    aqi_count INT NOT NULL DEFAULT 0,
+    aqi_min DECIMAL(10, 2),
+    aqi_max DECIMAL(10, 2),
+    row_count INT NOT NULL DEFAULT 0,
+    first_date DATE,
+    last_date DATE,
+    good_days INT NOT NULL DEFAULT 0,
+    satisfactory_days INT NOT NULL DEFAULT 0,
+    moderate_days INT NOT NULL DEFAULT 0,
+    poor_days INT NOT NULL DEFAULT 0,
+    very_poor_days INT NOT NULL DEFAULT 0,
+    severe_days INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (state_name, city_name, year, month),
     INDEX idx_state (state_id),
     INDEX idx_city (city_id),
-    INDEX idx_aqi_value (aqi_value)
+    INDEX idx_year_month (year, month)
 );
 
 -- Fact: Disease Outbreak
@@ -148,19 +193,40 @@ CREATE TABLE fact_vehicle_registration (
     INDEX idx_vehicle_class (vehicle_class)
 );
 
+-- =====================================================
+-- MATERIALIZED VIEWS
+-- =====================================================
+
+-- Refresh log of the mv_* summary tables (one row per vw_* view)
+-- The mv_* tables themselves are created from the views by
+-- materialized_views.py. source_fingerprint holds the per-state row
+-- counts and hash sums of the tables behind the view at its last refresh
+CREATE TABLE mv_refresh_log (
+    view_name VARCHAR(64) PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    refreshed_at DATETIME NOT NULL,
+    refresh_mode VARCHAR(20),  -- full, partial
+    partitions_refreshed INT,  -- states rewritten by a partial refresh
+    rows_written INT,
+    seconds DECIMAL(10, 3),
+    definition_hash CHAR(40),
+    source_fingerprint MEDIUMTEXT
+);
+
 -- =====================================================
 -- Insert Reference Data
 -- =====================================================
 
 -- Insert Pollutant Reference Data
-INSERT IGNORE INTO dim_pollutant (pollutant_code, pollutant_name, pollutant_category, health_impact) VALUES
-('PM2.5', 'Particulate Matter 2.5', 'Particulate Matter', 'Respiratory issues, heart disease, lung cancer'),
-('PM10', 'Particulate Matter 10', 'Particulate Matter', 'Respiratory issues, asthma'),
-('O3', 'Ozone', 'Gas', 'Respiratory issues, reduced lung function'),
-('NO2', 'Nitrogen Dioxide', 'Gas', 'Respiratory issues, asthma exacerbation'),
-('SO2', 'Sulfur Dioxide', 'Gas', 'Respiratory issues, bronchitis'),
-('CO', 'Carbon Monoxide', 'Gas', 'Reduced oxygen delivery, cardiovascular issues'),
-('NH3', 'Ammonia', 'Gas', 'Eye irritation, respiratory issues');
+-- bit_position must match sources.POLLUTANT_BITS
+INSERT IGNORE INTO dim_pollutant (pollutant_code, pollutant_name, pollutant_category, health_impact, bit_position) VALUES
+('PM2.5', 'Particulate Matter 2.5', 'Particulate Matter', 'Respiratory issues, heart disease, lung cancer', 0),
+('PM10', 'Particulate Matter 10', 'Particulate Matter', 'Respiratory issues, asthma', 1),
+('O3', 'Ozone', 'Gas', 'Respiratory issues, reduced lung function', 2),
+('NO2', 'Nitrogen Dioxide', 'Gas', 'Respiratory issues, asthma exacerbation', 3),
+('SO2', 'Sulfur Dioxide', 'Gas', 'Respiratory issues, bronchitis', 4),
+('CO', 'Carbon Monoxide', 'Gas', 'Reduced oxygen delivery, cardiovascular issues', 5),
+('NH3', 'Ammonia', 'Gas', 'Eye irritation, respiratory issues', 6);
 
 -- Insert Metro Cities Reference (will be populated during ETL)
 -- Metro cities: Delhi, Mumbai, Chennai, Kolkata, Bengaluru, Hyderabad, Ahmedabad, Pune
@@ -12,6 +12,7 @@ USE airpure_aqi_db;
 -- =====================================================
 -- Table 1: AQI Daily Data
 -- Source: day-wise-state-wise-air-quality-index-aqi...csv
+-- Partitioned by year with the opt-in migration aqi_partitioning.sql
 -- =====================================================
 CREATE TABLE aqi_daily (
     id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -20,13 +21,16 @@ CREATE TABLE aqi_daily (
     area VARCHAR(100),
     monitoring_stations INT,
     prominent_pollutants VARCHAR(255),
+    pollutant_mask SMALLINT UNSIGNED NOT NULL DEFAULT 0,  -- bit per pollutant (sources.POLLUTANT_BITS)
     aqi_value DECIMAL(10,2),
     air_quality_status VARCHAR(50),
     unit VARCHAR(200),
     note TEXT,
     INDEX idx_date (date),
-    INDEX idx_state (state),
-    INDEX idx_area (area),
+    -- Covering indexes for date-window queries grouped by state / area
+    -- (they also serve lookups by state or area alone)
+    INDEX idx_state_date_aqi (state, date, aqi_value),
+    INDEX idx_area_date_aqi_status (area, date, aqi_value, air_quality_status),
     INDEX idx_aqi_value (aqi_value)
 );
 
@@ -89,4 +93,112 @@ CREATE TABLE population (
     INDEX idx_year (year)
 );
 
+-- =====================================================
+-- Table 5: Monthly AQI Rollup
+-- One row per (state, area, year, month), kept in step with aqi_daily
+-- by the ETL (each loaded chunk is merged in the same transaction).
+-- Means are aqi_sum / aqi_count, and *_days count rows per air_quality_status
+-- =====================================================
+CREATE TABLE aqi_monthly_rollup (
+    state VARCHAR(100) NOT NULL,
+    area VARCHAR(100) NOT NULL,
+    year SMALLINT NOT NULL,
+    month TINYINT NOT NULL,
+    aqi_sum DECIMAL(16,2) NOT NULL DEFAULT 0,
+    aqi_count INT NOT NULL DEFAULT 0,
+    aqi_min DECIMAL(10,2),
+    aqi_max DECIMAL(10,2),
+    row_count INT NOT NULL DEFAULT 0,
+    first_date DATE,
+    last_date DATE,
+    good_days INT NOT NULL DEFAULT 0,
+    satisfactory_days INT NOT NULL DEFAULT 0,
+    moderate_days INT NOT NULL DEFAULT 0,
+    poor_days INT NOT NULL DEFAULT 0,
+    very_poor_days INT NOT NULL DEFAULT 0,
+    severe_days INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (state, area, year, month)
+);
+
+-- =====================================================
+-- Table 6: ETL Load Checkpoints
+-- One row per committed chunk, written in the chunk's transaction.
+-- etl_simple.py resumes each table after its last checkpoint
+-- =====================================================
+CREATE TABLE etl_checkpoint (
+    table_name VARCHAR(64) NOT NULL,
+    chunk_no INT NOT NULL,
+    source_sha256 CHAR(64),
+    row_start BIGINT,
+    row_end BIGINT,
+    rows_committed INT,
+    rows_rejected INT,
+    chunk_checksum CHAR(64),
+    committed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, chunk_no)
+);
+
+-- =====================================================
+-- Table 7: ETL Rejects
+-- Malformed source lines (source_line) and rows refused by the
+-- database (source_row), with the chunk they belong to
+-- =====================================================
+CREATE TABLE etl_reject (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(64) NOT NULL,
+    chunk_no INT,
+    source_line BIGINT,
+    source_row BIGINT,
+    reason VARCHAR(255),
+    raw_record TEXT,
+    rejected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_table_chunk (table_name, chunk_no)
+);
+
+-- =====================================================
+-- Table 8: Rolling AQI Windows
+-- One row per (state, area, date), rebuilt nightly by aqi_rolling.py.
+-- Windows are calendar days ending on date (gaps simply have no
+-- readings). poor_days_* count Poor / Very Poor / Severe days and
+-- exceedance_streak is the run of consecutive poor days ending on date
+-- =====================================================
+CREATE TABLE aqi_rolling_daily (
+    state VARCHAR(100) NOT NULL,
+    area VARCHAR(100) NOT NULL,
+    date DATE NOT NULL,
+    aqi_value DECIMAL(10,2),
+    air_quality_status VARCHAR(50),
+    mean_7d DECIMAL(10,2),
+    readings_7d SMALLINT,
+    poor_days_7d SMALLINT,
+    mean_30d DECIMAL(10,2),
+    readings_30d SMALLINT,
+    poor_days_30d SMALLINT,
+    mean_90d DECIMAL(10,2),
+    readings_90d SMALLINT,
+    poor_days_90d SMALLINT,
+    exceedance_streak INT,
+    PRIMARY KEY (state, area, date),
+    INDEX idx_date (date)
+);
+
+-- =====================================================
+-- Table 9: Exceedance Streaks per Area
+-- Longest and latest run of consecutive poor days, rebuilt with Table 8
+-- =====================================================
+CREATE TABLE aqi_exceedance_streak (
+    state VARCHAR(100) NOT NULL,
+    area VARCHAR(100) NOT NULL,
+    first_date DATE,
+    last_date DATE,
+    days_observed INT,
+    poor_days INT,
+    longest_streak INT,
+    longest_streak_start DATE,
+    longest_streak_end DATE,
+    current_streak INT,
+    PRIMARY KEY (state, area),
+    INDEX idx_longest_streak (longest_streak)
+);
+
 SELECT 'Schema v2 created successfully!' as Status;
@@ -0,0 +1,324 @@
+"""
+AirPure AQI Analytics - Primary Analysis Engine
+================================================
+The 7 Primary Analysis questions as importable functions.
+
+Each function takes the DataFrames it needs (as returned by
+load_datasets) and returns DataFrames / dicts; nothing is printed.
+Every question is answered with grouped aggregations over all states or
+cities at once instead of re-filtering the frame per state or city.
+Questions that only need monthly means (Q1 over whole months, Q4, Q6,
+Q7) read the area x month rollup from aqi_rollup instead of the daily
+AQI rows.
+primary_analysis.py prints the report from these results.
+"""
+
+import calendar
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from aqi_rollup import load_rollup, rollup_mean, rollup_rows
+from instrumentation import stage
+from sources import POLLUTANT_BITS
+from staging import read_table
+
+# =====================================================
+# Configuration
+# =====================================================
+
+SOUTHERN_STATES = ['Karnataka', 'Tamil Nadu', 'Kerala', 'Andhra Pradesh', 'Telangana', 'Puducherry']
+
+METRO_CITIES = ['Delhi', 'Mumbai', 'Chennai', 'Kolkata', 'Bengaluru', 'Bangalore',
+                'Hyderabad', 'Ahmedabad', 'Pune']
+
+BENGALURU_NAMES = ['Bengaluru', 'Bangalore']
+
+# =====================================================
+# Data Loading
+# =====================================================
+
+def load_datasets():
+    """Read the three analysis tables through the Parquet staging cache
+
+    Columns are already cleaned, renamed to the database names, date-parsed
+    and typed per COLUMN_TYPES (categorical strings, so groupbys pass
+    observed=True).
+    """
+    with stage('analysis.load') as record:
+        data = {
+            'aqi': read_table('aqi_daily'),
+            'rollup': load_rollup(),
+            'disease': read_table('disease_outbreak'),
+            'vehicle': read_table('vehicle_registration'),
+        }
+        record['rows'] = sum(len(frame) for frame in data.values())
+    return data
+
+def index_by_date(df):
+    """Sort rows by date and flag the frame so _between can binary-search it
+
+    The flag lives in df.attrs, which pandas carries over to filtered
+    subsets (which stay sorted). Missing dates sort last.
+    """
+    df = df.sort_values('date', kind='stable', na_position='last').reset_index(drop=True)
+    df.attrs['date_sorted'] = True
+    return df
+
+def _between(df, start=None, end=None):
+    """Rows of df whose date lies in [start, end]"""
+    if df.attrs.get('date_sorted'):
+        dates = df['date'].to_numpy()
+        lo = 0 if start is None else dates.searchsorted(np.datetime64(pd.Timestamp(start)), side='left')
+        hi = len(dates) if end is None else dates.searchsorted(np.datetime64(pd.Timestamp(end)), side='right')
+        return df.iloc[lo:hi]
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['date'] >= start
+    if end is not None:
+        mask &= df['date'] <= end
+    return df[mask]
+
+def whole_months(start=None, end=None):
+    """Whether [start, end] spans whole calendar months, so the monthly rollup answers it exactly"""
+    starts = start is None or pd.Timestamp(start) == pd.Timestamp(start).normalize().replace(day=1)
+    ends = end is None or pd.Timestamp(end).normalize() == (pd.Timestamp(end) + pd.offsets.MonthEnd(0)).normalize()
+    return starts and ends
+
+def _months_between(rollup, start=None, end=None):
+    """Rollup rows for the calendar months from start's month to end's month"""
+    month_index = rollup['year'] * 12 + rollup['month']
+    mask = pd.Series(True, index=rollup.index)
+    if start is not None:
+        mask &= month_index >= start.year * 12 + start.month
+    if end is not None:
+        mask &= month_index <= end.year * 12 + end.month
+    return rollup[mask]
+
+# =====================================================
+# Questions
+# =====================================================
+
+def q1_area_extremes(rollup, aqi_df, start=datetime(2024, 12, 1), end=datetime(2025, 5, 31),
+                     min_points=30, n=5):
+    """Q1: areas with the highest / lowest average AQI between start and end
+
+    Windows of whole months are answered from the rollup; any other window
+    rolls up just its daily rows, so it is never widened to whole months.
+    Returns {'ranked', 'top', 'bottom', 'period_rows', 'available'}; ranked
+    holds every area with at least min_points readings (area, avg_aqi,
+    data_points), worst first, and available is the (first, last) date of
+    all readings.
+    """
+    if whole_months(start, end):
+        period = _months_between(rollup, start, end)
+    else:
+        period = rollup_rows(_between(aqi_df, start, end))
+    sums = period.groupby('area', sort=True)[['aqi_sum', 'aqi_count']].sum()
+    ranked = pd.DataFrame({'avg_aqi': sums['aqi_sum'] / sums['aqi_count'].where(sums['aqi_count'] > 0),
+                           'data_points': sums['aqi_count']}).reset_index()
+    ranked = ranked[ranked['data_points'] >= min_points].sort_values('avg_aqi', ascending=False, kind='stable')
+    return {
+        'ranked': ranked,
+        'top': ranked.head(n),
+        'bottom': ranked.tail(n).sort_values('avg_aqi', kind='stable'),
+        'period_rows': int(period['row_count'].sum()),
+        'available': (rollup['first_date'].min(), rollup['last_date'].max()),
+    }
+
+def q2_state_pollutants(aqi_df, states=SOUTHERN_STATES, since=datetime(2022, 1, 1)):
+    """Q2: how often each prominent pollutant is reported, per state
+
+    Counts come from the pollutant_mask bitmask set at ingest: readings are
+    counted once per (state, mask) and each mask's bits are then summed, so
+    no strings are parsed here. states=None covers every state. Returns a
+    DataFrame (state, pollutant, count) ordered by state, then count
+    descending.
+    """
+    subset = _between(aqi_df, since)
+    if states is None:
+        states = sorted(subset['state'].dropna().unique().astype(str))
+    subset = subset[subset['state'].isin(states)]
+    combos = subset.groupby(['state', 'pollutant_mask'], observed=True).size()
+    return pollutant_counts(combos, states)
+
+def pollutant_counts(combos, states):
+    """Expand reading counts per (state, pollutant_mask) into counts per pollutant
+
+    Returns a DataFrame (state, pollutant, count) ordered by `states`, then
+    count descending, then pollutant; pollutants never reported are left out.
+    """
+    masks = combos.index.get_level_values('pollutant_mask').to_numpy(dtype='int64')
+    bits = np.array(list(POLLUTANT_BITS.values()))
+    hits = (masks[:, None] >> bits) & 1
+    per_state = pd.DataFrame(hits * combos.to_numpy(dtype='int64')[:, None], columns=list(POLLUTANT_BITS),
+                             index=combos.index.get_level_values('state').astype(str))
+    counts = (per_state.groupby(level=0).sum()
+                       .rename_axis('state').rename_axis(columns='pollutant')
+                       .stack().rename('count').reset_index())
+    counts = counts[counts['count'] > 0]
+    order = {state: i for i, state in enumerate(states)}
+    counts['_order'] = counts['state'].map(order)
+    counts = counts.sort_values(['_order', 'count', 'pollutant'], ascending=[True, False, True])
+    return counts.drop(columns='_order').reset_index(drop=True)
+
+def q3_weekend_weekday(aqi_df, cities=METRO_CITIES, years=1, min_points=10):
+    """Q3: weekday vs weekend average AQI per city over the last `years`
+
+    Returns {'start', 'end', 'rows', 'cities', 'overall'}. cities has one row per
+    city with more than min_points readings (in `cities` order); overall
+    holds the weekday/weekend averages across all of them. cities=None
+    covers every area.
+    """
+    end = aqi_df['date'].max()
+    start = end - pd.DateOffset(years=years)
+    subset = _between(aqi_df, start)
+    if cities is None:
+        cities = sorted(subset['area'].dropna().unique().astype(str))
+    subset = subset[subset['area'].isin(cities)]
+    is_weekend = subset['date'].dt.dayofweek >= 5
+
+    by_city = (subset.groupby([subset['area'].astype(str), is_weekend.rename('is_weekend')])['aqi_value']
+                     .mean().unstack('is_weekend')
+                     .reindex(columns=[False, True]))
+    by_city.columns = ['weekday_avg', 'weekend_avg']
+    sizes = subset.groupby(subset['area'].astype(str)).size()
+    keep = [city for city in cities if sizes.get(city, 0) > min_points]
+    table = by_city.reindex(keep).rename_axis('area').reset_index()
+    table['difference'] = table['weekday_avg'] - table['weekend_avg']
+    table['better_on'] = table['difference'].gt(0).map({True: 'Weekend', False: 'Weekday'})
+
+    overall = subset.groupby(is_weekend)['aqi_value'].mean()
+    return {
+        'start': start,
+        'end': end,
+        'rows': len(subset),
+        'cities': table,
+        'overall': {'weekday_avg': overall.get(False, float('nan')),
+                    'weekend_avg': overall.get(True, float('nan'))},
+    }
+
+def q4_worst_months(rollup, n_states=10):
+    """Q4: average AQI per calendar month over the states with most distinct areas
+
+    Returns {'states', 'months'}; months has (month, month_name, aqi_value),
+    worst month first.
+    """
+    state_areas = rollup.groupby('state', sort=True)['area'].nunique().sort_values(ascending=False, kind='stable')
+    states = state_areas.head(n_states).index.tolist()
+    months = rollup_mean(rollup[rollup['state'].isin(states)], 'month').rename('aqi_value')
+    months = months.sort_index().reset_index()
+    months.insert(1, 'month_name', [calendar.month_name[int(m)] for m in months['month']])
+    return {
+        'states': states,
+        'months': months.sort_values('aqi_value', ascending=False, kind='stable').reset_index(drop=True),
+    }
+
+def q5_category_days(aqi_df, start=datetime(2025, 3, 1), end=datetime(2025, 5, 31),
+                     names=BENGALURU_NAMES, fallback_months=3):
+    """Q5: days per air-quality category for Bengaluru
+
+    If the requested period has no readings, the last fallback_months of
+    available data are used instead. Returns {'counts', 'total_days',
+    'start', 'end', 'fallback', 'available'}; counts is empty when the city
+    has no data at all.
+    """
+    city = aqi_df[aqi_df['area'].isin(names)]
+    period = _between(city, start, end)
+    fallback = period.empty
+    available = (city['date'].min(), city['date'].max()) if len(city) else None
+    if fallback and available:
+        end = available[1]
+        start = end - pd.DateOffset(months=fallback_months)
+        period = _between(city, start)
+    counts = period['air_quality_status'].value_counts()
+    return {
+        'counts': counts[counts > 0],
+        'total_days': len(period),
+        'start': start,
+        'end': end,
+        'fallback': fallback,
+        'available': available,
+    }
+
+def q6_disease_aqi(disease_df, rollup, current_year=None, years=3, n_states=10):
+    """Q6: two diseases with most cases per state, with the state's average AQI
+
+    Covers the first n_states states (in data order) over the last `years`
+    years. Returns a DataFrame (state, disease_1, disease_2, avg_aqi) for
+    states with at least two diseases; avg_aqi is NaN without AQI data.
+    """
+    current_year = current_year or datetime.now().year
+    recent = disease_df[disease_df['year'] >= current_year - years]
+    states = [str(state) for state in recent['state'].unique()[:n_states]]
+
+    cases = (recent.groupby(['state', 'disease_name'], observed=True)['cases']
+                   .sum().reset_index())
+    cases['state'] = cases['state'].astype(str)
+    cases = cases[cases['state'].isin(states)]
+    # Stable sort keeps nlargest's first-seen order among equal case counts
+    top2 = cases.sort_values('cases', ascending=False, kind='stable').groupby('state').head(2)
+    top2 = top2.assign(rank=top2.groupby('state').cumcount() + 1)
+    wide = top2.pivot(index='state', columns='rank', values='disease_name')
+    wide = wide.reindex(columns=[1, 2]).dropna()
+    wide.columns = ['disease_1', 'disease_2']
+
+    state_aqi = state_average_aqi(rollup[rollup['year'] >= current_year - years])
+    result = wide.reindex([state for state in states if state in wide.index])
+    result['avg_aqi'] = result.index.map(state_aqi)
+    return result.rename_axis('state').reset_index()
+
+def q7_ev_adoption(vehicle_df, rollup, n=5):
+    """Q7: average AQI of the top and bottom n states by EV registrations
+
+    Returns {'ev_by_state', 'top', 'bottom', 'avg_aqi_top', 'avg_aqi_bottom'};
+    top / bottom are DataFrames (state, ev_registrations, avg_aqi).
+    """
+    fuels = vehicle_df['fuel'].cat.categories
+    ev_fuels = fuels[fuels.str.lower().str.contains('electric', na=False)]
+    ev = vehicle_df[vehicle_df['fuel'].isin(ev_fuels)]
+    ev_by_state = ev.groupby('state', observed=True)['value'].sum().sort_values(ascending=False, kind='stable')
+    ev_by_state.index = ev_by_state.index.astype(str)
+    state_aqi = state_average_aqi(rollup)
+
+    def side(states):
+        return pd.DataFrame({'state': states,
+                             'ev_registrations': [ev_by_state[s] for s in states],
+                             'avg_aqi': [state_aqi.get(s, float('nan')) for s in states]})
+
+    top = side(ev_by_state.head(n).index.tolist())
+    bottom = side(ev_by_state.tail(n).index.tolist())
+    return {
+        'ev_by_state': ev_by_state,
+        'top': top,
+        'bottom': bottom,
+        'avg_aqi_top': state_aqi[state_aqi.index.isin(top['state'])].mean(),
+        'avg_aqi_bottom': state_aqi[state_aqi.index.isin(bottom['state'])].mean(),
+    }
+
+def state_average_aqi(rollup):
+    """Mean AQI per state from rollup rows (index as plain strings)"""
+    means = rollup_mean(rollup, 'state')
+    means.index = means.index.astype(str)
+    return means
+
+# =====================================================
+# Registry
+# =====================================================
+
+# question -> (function, datasets it takes, in order)
+QUESTIONS = {
+    'q1': (q1_area_extremes, ('rollup', 'aqi')),
+    'q2': (q2_state_pollutants, ('aqi',)),
+    'q3': (q3_weekend_weekday, ('aqi',)),
+    'q4': (q4_worst_months, ('rollup',)),
+    'q5': (q5_category_days, ('aqi',)),
+    'q6': (q6_disease_aqi, ('disease', 'rollup')),
+    'q7': (q7_ev_adoption, ('vehicle', 'rollup')),
+}
+
+def run_question(name, data, **params):
+    """Answer one question from a load_datasets() dict"""
+    func, datasets = QUESTIONS[name]
+    return func(*(data[key] for key in datasets), **params)
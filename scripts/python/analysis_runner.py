@@ -0,0 +1,240 @@
+"""
+AirPure AQI Analytics - Concurrent Analysis Runner
+===================================================
+Runs the Primary Analysis questions concurrently and writes structured
+results for automated cross-checks (e.g. against Power BI exports).
+
+Questions share one read-only load_datasets() dict in a thread pool, or
+each worker process loads its own copy from the staging cache
+(--pool process). With the sql backend every worker queries MySQL through
+a shared connection pool. Total time is bounded by the slowest question
+rather than the sum of all of them. Answers already in the result cache
+(result_cache.py) are returned without loading any data.
+
+Output (--output DIR):
+    results.json            every answer as JSON plus per-question timings
+    <question>_<name>.parquet   each DataFrame / Series in an answer
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import QUESTIONS, load_datasets, run_question
+from instrumentation import add_arguments, configure_from_args, stage
+from result_cache import cache_get, cache_key, cache_put
+
+# =====================================================
+# Configuration
+# =====================================================
+
+DEFAULT_WORKERS = min(len(QUESTIONS), os.cpu_count() or 1)
+
+OUTPUT_PATH = r'd:\FEB_AQI_P2\data\processed\analysis_results'
+
+# Per-process state for --pool process (set by _init_worker)
+_WORKER = {}
+
+# =====================================================
+# Running Questions
+# =====================================================
+
+def _answer(name, backend, data, engine, params):
+    """Answer one question; returns (name, result, seconds)"""
+    started = time.perf_counter()
+    with stage(f"analysis.{name}", backend=backend):
+        if backend == 'sql':
+            from analysis_sql import run_question as run_sql_question
+            result = run_sql_question(name, engine, **params)
+        else:
+            result = run_question(name, data, **params)
+    return name, result, time.perf_counter() - started
+
+def _init_worker(backend):
+    """Load this process's read-only datasets (or engine) once"""
+    if backend == 'sql':
+        from analysis_sql import get_engine
+        _WORKER['engine'] = get_engine(pool_size=1, max_overflow=0)
+    else:
+        _WORKER['data'] = load_datasets()
+
+def _answer_in_worker(name, backend, params):
+    return _answer(name, backend, _WORKER.get('data'), _WORKER.get('engine'), params)
+
+def run_questions(questions=None, backend='pandas', data=None, workers=DEFAULT_WORKERS, pool='thread',
+                  params=None, use_cache=True, load=load_datasets):
+    """Answer questions concurrently
+
+    data is a load_datasets() dict shared by all threads; when None it is
+    loaded with load() only if some question is not cached (process
+    workers load their own). params maps a question to its keyword
+    arguments. Returns ({question: result}, {question: seconds, 'wall':
+    seconds}, [questions served from the result cache]) with results in
+    `questions` order.
+    """
+    questions = list(questions or QUESTIONS)
+    params = params or {}
+    results, timings, keys = {}, {}, {}
+    started = time.perf_counter()
+
+    if use_cache:
+        for name in questions:
+            lookup_started = time.perf_counter()
+            keys[name] = cache_key(name, backend, params.get(name, {}))
+            cached = cache_get(keys[name])
+            if cached is not None:
+                results[name] = cached
+                timings[name] = time.perf_counter() - lookup_started
+    cached_names = [name for name in questions if name in results]
+    pending = [name for name in questions if name not in results]
+
+    if pending:
+        workers = max(1, min(workers, len(pending)))
+        if pool == 'process':
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,))
+            submit = lambda name: executor.submit(_answer_in_worker, name, backend, params.get(name, {}))
+        else:
+            engine = None
+            if backend == 'sql':
+                from analysis_sql import get_engine
+                engine = get_engine(pool_size=workers, max_overflow=0)
+            elif data is None:
+                data = load()
+            executor = ThreadPoolExecutor(max_workers=workers)
+            submit = lambda name: executor.submit(_answer, name, backend, data, engine, params.get(name, {}))
+
+        with executor:
+            futures = [submit(name) for name in pending]
+            for future in as_completed(futures):
+                name, result, seconds = future.result()
+                results[name] = result
+                timings[name] = seconds
+                if use_cache:
+                    cache_put(keys[name], result)
+
+    wall = time.perf_counter() - started
+    timings = {name: timings[name] for name in questions}
+    timings['wall'] = wall
+    return {name: results[name] for name in questions}, timings, cached_names
+
+# =====================================================
+# Structured Output
+# =====================================================
+
+def to_jsonable(value):
+    """Answer values as plain JSON types (NaN/NaT become null)"""
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, pd.DataFrame):
+        return [to_jsonable(row) for row in value.to_dict(orient='records')]
+    if isinstance(value, pd.Series):
+        return [{'key': to_jsonable(key), 'value': to_jsonable(item)} for key, item in value.items()]
+    if isinstance(value, (list, tuple, pd.Index, np.ndarray)):
+        return [to_jsonable(item) for item in value]
+    if value is None or value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    return value
+
+def _frames(name, result):
+    """(file stem, DataFrame) for every table in an answer"""
+    if isinstance(result, pd.DataFrame):
+        yield name, result
+    elif isinstance(result, pd.Series):
+        yield name, result.rename_axis(result.index.name or 'key').reset_index(name=result.name or 'value')
+    elif isinstance(result, dict):
+        for key, value in result.items():
+            yield from _frames(f"{name}_{key}", value)
+
+def write_results(results, timings, output_path=OUTPUT_PATH, backend='pandas', cached=()):
+    """Write results.json and one Parquet file per table; returns the JSON path"""
+    os.makedirs(output_path, exist_ok=True)
+    tables = {}
+    for name, result in results.items():
+        for stem, frame in _frames(name, result):
+            frame = frame.copy()
+            for col in frame.columns:
+                if isinstance(frame[col].dtype, pd.CategoricalDtype):
+                    frame[col] = frame[col].astype(str)
+            file_name = f"{stem}.parquet"
+            frame.reset_index(drop=True).to_parquet(os.path.join(output_path, file_name), index=False)
+            tables.setdefault(name, []).append(file_name)
+
+    document = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'backend': backend,
+        'timings_seconds': {key: round(seconds, 4) for key, seconds in timings.items()},
+        'cached': list(cached),
+        'results': to_jsonable(results),
+        'parquet': tables,
+    }
+    json_path = os.path.join(output_path, 'results.json')
+    tmp_path = json_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    os.replace(tmp_path, json_path)
+    return json_path
+
+def print_timings(timings, cached=()):
+    """Per-question timing table (cache hits marked)"""
+    question_total = sum(seconds for name, seconds in timings.items() if name != 'wall')
+    print(f"\n{'Question':<10} | {'Seconds':>10}")
+    print("-" * 25)
+    for name, seconds in timings.items():
+        if name != 'wall':
+            print(f"{name:<10} | {seconds:>10.3f}{'  (cached)' if name in cached else ''}")
+    print("-" * 25)
+    print(f"{'Sum':<10} | {question_total:>10.3f}")
+    print(f"{'Wall':<10} | {timings['wall']:>10.3f}")
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Run the Primary Analysis questions concurrently")
+    parser.add_argument('--backend', choices=['pandas', 'sql'], default='pandas',
+                        help="pandas: in memory from the staging cache; sql: aggregate queries in MySQL")
+    parser.add_argument('--question', action='append', choices=list(QUESTIONS),
+                        help="run only this question (repeatable; default all)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent questions (default {DEFAULT_WORKERS})")
+    parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                        help="thread: share one copy of the data; process: one copy per worker")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="recompute every answer instead of using the result cache")
+    parser.add_argument('--output', default=OUTPUT_PATH,
+                        help=f"directory for results.json and Parquet tables (default {OUTPUT_PATH})")
+    add_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_args(args)
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Analysis Runner")
+    print("=" * 60)
+    print(f"Backend: {args.backend} | Workers: {args.workers} ({args.pool} pool)")
+
+    results, timings, cached = run_questions(args.question, backend=args.backend, workers=args.workers,
+                                             pool=args.pool, use_cache=not args.no_cache)
+    json_path = write_results(results, timings, args.output, backend=args.backend, cached=cached)
+    print_timings(timings, cached)
+    print(f"\n[OK] Results written to {json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+AirPure AQI Analytics - SQL Analysis Backend
+=============================================
+The 7 Primary Analysis questions pushed down to MySQL.
+
+Each function mirrors its analysis_engine counterpart (same parameters
+after the engine, same return shape), but the filtering and grouping run
+as aggregate queries over aqi_daily, aqi_monthly_rollup, disease_outbreak
+and vehicle_registration, so only result rows cross the network. Ordering
+and tie-breaking that must match pandas exactly (stable sorts, category
+order) is applied in Python to those few rows.
+
+check_parity() runs questions on both backends and reports any answer
+that differs.
+"""
+
+import calendar
+import math
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analysis_engine import (BENGALURU_NAMES, METRO_CITIES, QUESTIONS, SOUTHERN_STATES,
+                             pollutant_counts, run_question as run_pandas_question, whole_months)
+from db import get_engine
+
+# =====================================================
+# Configuration
+# =====================================================
+
+# Relative tolerance for float answers in the parity check (MySQL sums
+# DECIMAL values exactly, pandas sums float64)
+PARITY_RTOL = 1e-9
+
+_captured = None
+
+# =====================================================
+# Query Helpers
+# =====================================================
+
+def _read(engine, sql, params=()):
+    """Run an aggregate query and return its (small) result as a DataFrame"""
+    if _captured is not None:
+        _captured.append((sql, tuple(params)))
+    return pd.read_sql(sql, engine, params=tuple(params))
+
+@contextmanager
+def capture_queries():
+    """Collect (sql, params) of every query run inside the block (used by index_advisor.py)"""
+    global _captured
+    previous, _captured = _captured, []
+    try:
+        yield _captured
+    finally:
+        _captured = previous
+
+def _in_list(values):
+    """Placeholders for an IN (...) clause"""
+    return ', '.join(['%s'] * len(values))
+
+def _floats(values):
+    """DECIMAL aggregates (returned as Decimal / None) as float64 with NaN"""
+    return pd.to_numeric(values, errors='coerce').astype('float64')
+
+def _timestamp(value):
+    """DATE result as a Timestamp (NaT for NULL)"""
+    return pd.Timestamp(value) if value is not None else pd.NaT
+
+def _state_means(engine, where='', params=()):
+    """Mean AQI per state from aqi_monthly_rollup (NaN where a state has no readings)"""
+    means = _read(engine,
+                  f"SELECT state, SUM(aqi_sum) AS aqi_sum, SUM(aqi_count) AS aqi_count "
+                  f"FROM aqi_monthly_rollup {where} GROUP BY state", params)
+    counts = _floats(means['aqi_count']).replace(0, np.nan)
+    return pd.Series((_floats(means['aqi_sum']) / counts).to_numpy(),
+                     index=means['state'].astype(str).to_numpy())
+
+# =====================================================
+# Questions
+# =====================================================
+
+def q1_area_extremes(engine, start=datetime(2024, 12, 1), end=datetime(2025, 5, 31),
+                     min_points=30, n=5):
+    """Q1 over aqi_monthly_rollup, or aqi_daily for partial months (see analysis_engine.q1_area_extremes)"""
+    if whole_months(start, end):
+        sums = _read(engine,
+                     "SELECT area, SUM(aqi_sum) AS aqi_sum, SUM(aqi_count) AS aqi_count, "
+                     "SUM(row_count) AS row_count FROM aqi_monthly_rollup "
+                     "WHERE year * 12 + month BETWEEN %s AND %s GROUP BY area",
+                     (start.year * 12 + start.month, end.year * 12 + end.month))
+    else:
+        # Same rows as the rollup would hold: a state, an area and a date
+        sums = _read(engine,
+                     "SELECT area, SUM(aqi_value) AS aqi_sum, COUNT(aqi_value) AS aqi_count, "
+                     "COUNT(*) AS row_count FROM aqi_daily "
+                     "WHERE date BETWEEN %s AND %s AND state IS NOT NULL AND area IS NOT NULL GROUP BY area",
+                     (start.date(), end.date()))
+    sums['area'] = sums['area'].astype(str)
+    sums = sums.sort_values('area', kind='stable')
+    counts = _floats(sums['aqi_count']).astype('int64')
+    ranked = pd.DataFrame({'area': sums['area'],
+                           'avg_aqi': _floats(sums['aqi_sum']) / counts.where(counts > 0),
+                           'data_points': counts})
+    ranked = ranked[ranked['data_points'] >= min_points].sort_values('avg_aqi', ascending=False, kind='stable')
+    span = _read(engine, "SELECT MIN(first_date) AS first_date, MAX(last_date) AS last_date "
+                         "FROM aqi_monthly_rollup").iloc[0]
+    return {
+        'ranked': ranked,
+        'top': ranked.head(n),
+        'bottom': ranked.tail(n).sort_values('avg_aqi', kind='stable'),
+        'period_rows': int(_floats(sums['row_count']).sum()),
+        'available': (_timestamp(span['first_date']), _timestamp(span['last_date'])),
+    }
+
+def q2_state_pollutants(engine, states=SOUTHERN_STATES, since=datetime(2022, 1, 1)):
+    """Q2 over aqi_daily.pollutant_mask (see analysis_engine.q2_state_pollutants)"""
+    sql = ("SELECT state, pollutant_mask, COUNT(*) AS readings FROM aqi_daily "
+           "WHERE date >= %s AND state IS NOT NULL")
+    params = [since.date()]
+    if states is not None:
+        sql += f" AND state IN ({_in_list(states)})"
+        params += list(states)
+    combos = _read(engine, sql + " GROUP BY state, pollutant_mask", params)
+    combos['state'] = combos['state'].astype(str)
+    if states is None:
+        states = sorted(combos['state'].unique())
+    combos = combos.set_index(['state', 'pollutant_mask'])['readings']
+    return pollutant_counts(combos, states)
+
+def q3_weekend_weekday(engine, cities=METRO_CITIES, years=1, min_points=10):
+    """Q3 over aqi_daily (see analysis_engine.q3_weekend_weekday)"""
+    end = _timestamp(_read(engine, "SELECT MAX(date) AS last_date FROM aqi_daily").iloc[0]['last_date'])
+    start = end - pd.DateOffset(years=years)
+    # WEEKDAY() is 0 for Monday, so >= 5 matches pandas' dayofweek >= 5
+    sql = ("SELECT area, WEEKDAY(date) >= 5 AS is_weekend, COUNT(*) AS row_count, "
+           "COUNT(aqi_value) AS aqi_count, SUM(aqi_value) AS aqi_sum FROM aqi_daily "
+           "WHERE date >= %s AND area IS NOT NULL")
+    params = [start.date()]
+    if cities is not None:
+        sql += f" AND area IN ({_in_list(cities)})"
+        params += list(cities)
+    groups = _read(engine, sql + " GROUP BY area, is_weekend", params)
+    groups['area'] = groups['area'].astype(str)
+    groups['is_weekend'] = groups['is_weekend'].astype(bool)
+    groups['aqi_sum'] = _floats(groups['aqi_sum'])
+    groups['aqi_count'] = groups['aqi_count'].astype('int64')
+    if cities is None:
+        cities = sorted(groups['area'].unique())
+
+    groups['aqi_avg'] = groups['aqi_sum'] / groups['aqi_count'].replace(0, np.nan)
+    by_city = (groups.pivot(index='area', columns='is_weekend', values='aqi_avg')
+                     .reindex(columns=[False, True]))
+    by_city.columns = ['weekday_avg', 'weekend_avg']
+    sizes = groups.groupby('area')['row_count'].sum()
+    keep = [city for city in cities if sizes.get(city, 0) > min_points]
+    table = by_city.reindex(keep).rename_axis('area').reset_index()
+    table['difference'] = table['weekday_avg'] - table['weekend_avg']
+    table['better_on'] = table['difference'].gt(0).map({True: 'Weekend', False: 'Weekday'})
+
+    overall = groups.groupby('is_weekend')[['aqi_sum', 'aqi_count']].sum()
+    overall = overall['aqi_sum'] / overall['aqi_count'].replace(0, np.nan)
+    return {
+        'start': start,
+        'end': end,
+        'rows': int(groups['row_count'].sum()),
+        'cities': table,
+        'overall': {'weekday_avg': overall.get(False, float('nan')),
+                    'weekend_avg': overall.get(True, float('nan'))},
+    }
+
+def q4_worst_months(engine, n_states=10):
+    """Q4 over aqi_monthly_rollup (see analysis_engine.q4_worst_months)"""
+    areas = _read(engine, "SELECT state, COUNT(DISTINCT area) AS areas FROM aqi_monthly_rollup GROUP BY state")
+    state_areas = areas.set_index(areas['state'].astype(str))['areas'].sort_index()
+    states = state_areas.sort_values(ascending=False, kind='stable').head(n_states).index.tolist()
+    if not states:
+        return {'states': [], 'months': pd.DataFrame(columns=['month', 'month_name', 'aqi_value'])}
+
+    months = _read(engine,
+                   f"SELECT month, SUM(aqi_sum) AS aqi_sum, SUM(aqi_count) AS aqi_count "
+                   f"FROM aqi_monthly_rollup WHERE state IN ({_in_list(states)}) GROUP BY month",
+                   states)
+    months = months.sort_values('month').reset_index(drop=True)
+    months['month'] = months['month'].astype('int64')
+    months['aqi_value'] = _floats(months['aqi_sum']) / _floats(months['aqi_count']).replace(0, np.nan)
+    months = months[['month', 'aqi_value']]
+    months.insert(1, 'month_name', [calendar.month_name[int(m)] for m in months['month']])
+    return {
+        'states': states,
+        'months': months.sort_values('aqi_value', ascending=False, kind='stable').reset_index(drop=True),
+    }
+
+def q5_category_days(engine, start=datetime(2025, 3, 1), end=datetime(2025, 5, 31),
+                     names=BENGALURU_NAMES, fallback_months=3):
+    """Q5 over aqi_daily (see analysis_engine.q5_category_days)"""
+    def status_counts(since, until=None):
+        sql = (f"SELECT air_quality_status, COUNT(*) AS days FROM aqi_daily "
+               f"WHERE area IN ({_in_list(names)}) AND date >= %s")
+        params = list(names) + [since.date()]
+        if until is not None:
+            sql += " AND date <= %s"
+            params.append(until.date())
+        return _read(engine, sql + " GROUP BY air_quality_status", params)
+
+    span = _read(engine, f"SELECT COUNT(*) AS row_count, MIN(date) AS first_date, MAX(date) AS last_date "
+                         f"FROM aqi_daily WHERE area IN ({_in_list(names)})", names).iloc[0]
+    available = (_timestamp(span['first_date']), _timestamp(span['last_date'])) if span['row_count'] else None
+    period = status_counts(start, end)
+    fallback = period.empty
+    if fallback and available:
+        end = available[1]
+        start = end - pd.DateOffset(months=fallback_months)
+        period = status_counts(start)
+
+    total_days = int(period['days'].sum())
+    period = period.dropna(subset=['air_quality_status'])
+    # value_counts order: count descending, ties in (sorted) category order
+    period = period.sort_values('air_quality_status').sort_values('days', ascending=False, kind='stable')
+    counts = pd.Series(period['days'].astype('int64').to_numpy(), name='count',
+                       index=pd.Index(period['air_quality_status'].astype(str), name='air_quality_status'))
+    return {
+        'counts': counts[counts > 0],
+        'total_days': total_days,
+        'start': start,
+        'end': end,
+        'fallback': fallback,
+        'available': available,
+    }
+
+def q6_disease_aqi(engine, current_year=None, years=3, n_states=10):
+    """Q6 over disease_outbreak and aqi_monthly_rollup (see analysis_engine.q6_disease_aqi)
+
+    "Data order" of states is load order, i.e. the first id per state.
+    """
+    current_year = current_year or datetime.now().year
+    since = current_year - years
+    states = _read(engine,
+                   "SELECT state FROM disease_outbreak WHERE year >= %s AND state IS NOT NULL "
+                   "GROUP BY state ORDER BY MIN(id) LIMIT %s", (since, n_states))['state'].astype(str).tolist()
+    if not states:
+        return pd.DataFrame(columns=['state', 'disease_1', 'disease_2', 'avg_aqi'])
+
+    top2 = _read(engine,
+                 f"SELECT state, disease_name, row_no FROM ("
+                 f"  SELECT state, disease_name, ROW_NUMBER() OVER ("
+                 f"    PARTITION BY state ORDER BY COALESCE(SUM(cases), 0) DESC, disease_name) AS row_no"
+                 f"  FROM disease_outbreak"
+                 f"  WHERE year >= %s AND state IN ({_in_list(states)}) AND disease_name IS NOT NULL"
+                 f"  GROUP BY state, disease_name"
+                 f") ranked WHERE row_no <= 2",
+                 [since] + states)
+    top2['state'] = top2['state'].astype(str)
+    wide = top2.pivot(index='state', columns='row_no', values='disease_name')
+    wide = wide.reindex(columns=[1, 2]).dropna()
+    wide.columns = ['disease_1', 'disease_2']
+
+    state_aqi = _state_means(engine, f"WHERE year >= %s AND state IN ({_in_list(states)})", [since] + states)
+    result = wide.reindex([state for state in states if state in wide.index])
+    result['avg_aqi'] = result.index.map(state_aqi)
+    return result.rename_axis('state').reset_index()
+
+def q7_ev_adoption(engine, n=5):
+    """Q7 over vehicle_registration and aqi_monthly_rollup (see analysis_engine.q7_ev_adoption)"""
+    ev = _read(engine,
+               "SELECT state, COALESCE(SUM(value), 0) AS value FROM vehicle_registration "
+               "WHERE LOWER(fuel) LIKE %s AND state IS NOT NULL GROUP BY state", ('%electric%',))
+    ev_by_state = pd.Series(_floats(ev['value']).astype('int64').to_numpy(), name='value',
+                            index=pd.Index(ev['state'].astype(str), name='state'))
+    ev_by_state = ev_by_state.sort_index().sort_values(ascending=False, kind='stable')
+    state_aqi = _state_means(engine)
+
+    def side(states):
+        return pd.DataFrame({'state': states,
+                             'ev_registrations': [ev_by_state[s] for s in states],
+                             'avg_aqi': [state_aqi.get(s, float('nan')) for s in states]})
+
+    top = side(ev_by_state.head(n).index.tolist())
+    bottom = side(ev_by_state.tail(n).index.tolist())
+    return {
+        'ev_by_state': ev_by_state,
+        'top': top,
+        'bottom': bottom,
+        'avg_aqi_top': state_aqi[state_aqi.index.isin(top['state'])].mean(),
+        'avg_aqi_bottom': state_aqi[state_aqi.index.isin(bottom['state'])].mean(),
+    }
+
+# =====================================================
+# Registry
+# =====================================================
+
+SQL_QUESTIONS = {
+    'q1': q1_area_extremes,
+    'q2': q2_state_pollutants,
+    'q3': q3_weekend_weekday,
+    'q4': q4_worst_months,
+    'q5': q5_category_days,
+    'q6': q6_disease_aqi,
+    'q7': q7_ev_adoption,
+}
+
+def run_question(name, engine=None, **params):
+    """Answer one question with server-side aggregation"""
+    return SQL_QUESTIONS[name](engine or get_engine(), **params)
+
+# =====================================================
+# Parity Check
+# =====================================================
+
+def _differences(path, left, right, rtol=PARITY_RTOL):
+    """Human-readable differences between two answers (empty when they agree)"""
+    if isinstance(left, dict) and isinstance(right, dict):
+        if left.keys() != right.keys():
+            return [f"{path}: keys {sorted(left)} != {sorted(right)}"]
+        return [diff for key in left for diff in _differences(f"{path}.{key}", left[key], right[key], rtol)]
+    if isinstance(left, pd.DataFrame) and isinstance(right, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(left.reset_index(drop=True), right.reset_index(drop=True),
+                                          check_dtype=False, check_index_type=False,
+                                          check_column_type=False, check_categorical=False, rtol=rtol)
+        except AssertionError as e:
+            return [f"{path}: {e}"]
+        return []
+    if isinstance(left, pd.Series) and isinstance(right, pd.Series):
+        left_items = [(str(k), v) for k, v in left.items()]
+        right_items = [(str(k), v) for k, v in right.items()]
+        if [k for k, _ in left_items] != [k for k, _ in right_items]:
+            return [f"{path}: index {[k for k, _ in left_items]} != {[k for k, _ in right_items]}"]
+        return [diff for (key, a), (_, b) in zip(left_items, right_items)
+                for diff in _differences(f"{path}[{key}]", a, b, rtol)]
+    if isinstance(left, (list, tuple)) and isinstance(right, (list, tuple)):
+        if len(left) != len(right):
+            return [f"{path}: {len(left)} items != {len(right)} items"]
+        return [diff for i, (a, b) in enumerate(zip(left, right))
+                for diff in _differences(f"{path}[{i}]", a, b, rtol)]
+    if left is None or right is None:
+        return [] if left is right else [f"{path}: {left!r} != {right!r}"]
+    if isinstance(left, (float, int, np.number)) and isinstance(right, (float, int, np.number)):
+        if (pd.isna(left) and pd.isna(right)) or math.isclose(left, right, rel_tol=rtol):
+            return []
+        return [f"{path}: {left!r} != {right!r}"]
+    if isinstance(left, (datetime, pd.Timestamp)) or isinstance(right, (datetime, pd.Timestamp)):
+        left, right = pd.Timestamp(left), pd.Timestamp(right)
+        return [] if (pd.isna(left) and pd.isna(right)) or left == right else [f"{path}: {left} != {right}"]
+    return [] if str(left) == str(right) else [f"{path}: {left!r} != {right!r}"]
+
+def check_parity(data, engine=None, questions=None, **params):
+    """Answer questions on both backends and compare
+
+    data is a load_datasets() dict for the pandas side. Returns
+    {question: [differences]} (empty lists when the backends agree).
+    """
+    engine = engine or get_engine()
+    report = {}
+    for name in questions or QUESTIONS:
+        in_memory = run_pandas_question(name, data, **params.get(name, {}))
+        pushed_down = run_question(name, engine, **params.get(name, {}))
+        report[name] = _differences(name, in_memory, pushed_down)
+    return report
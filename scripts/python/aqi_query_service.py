@@ -0,0 +1,206 @@
+"""
+AirPure AQI Analytics - Warm Query Service
+===========================================
+Local HTTP service that loads the analysis datasets once and answers the
+7 Primary Analysis questions with any parameters, without paying the
+load and date-parse cost per request.
+
+The daily AQI rows are kept sorted by date (analysis_engine.index_by_date),
+so date windows are binary-search slices instead of full scans.
+
+Endpoints (GET, JSON responses):
+    /q1 .. /q7      answer a question; query parameters override its
+                    defaults, e.g. /q1?start=2024-12-01&end=2025-05-31&n=10
+                    /q2?states=Karnataka,Kerala   (states=all for every state)
+    /questions      parameters accepted by each question
+    /health         row counts and when the data was loaded
+    /reload         (GET or POST) re-read the staged datasets, rebuilding
+                    stages whose source files changed, then swap them in
+
+Usage:
+    python aqi_query_service.py [--host 127.0.0.1] [--port 8765]
+"""
+
+import argparse
+import inspect
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from analysis_engine import QUESTIONS, index_by_date, load_datasets, run_question
+from analysis_runner import to_jsonable
+
+# =====================================================
+# Configuration
+# =====================================================
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Query parameter -> type ('date', 'list' of comma-separated names, 'int')
+PARAM_TYPES = {
+    'start': 'date',
+    'end': 'date',
+    'since': 'date',
+    'states': 'list',
+    'cities': 'list',
+    'names': 'list',
+    'min_points': 'int',
+    'n': 'int',
+    'n_states': 'int',
+    'years': 'int',
+    'current_year': 'int',
+    'fallback_months': 'int',
+}
+
+# =====================================================
+# Resident Data
+# =====================================================
+
+_state = {'data': None, 'loaded_at': None, 'load_seconds': None}
+_reload_lock = threading.Lock()
+
+def load_resident():
+    """Load the datasets, date-sort the daily rows and swap them in
+
+    Requests in flight keep the dict they started with, so a reload never
+    mixes old and new data within one answer.
+    """
+    with _reload_lock:
+        started = time.perf_counter()
+        data = load_datasets()
+        data['aqi'] = index_by_date(data['aqi'])
+        _state.update(data=data, loaded_at=datetime.now().isoformat(timespec='seconds'),
+                      load_seconds=round(time.perf_counter() - started, 3))
+    return _state
+
+def question_params(name):
+    """Parameters a question accepts (everything after its datasets)"""
+    func, datasets = QUESTIONS[name]
+    return list(inspect.signature(func).parameters)[len(datasets):]
+
+def parse_params(name, query):
+    """Convert query-string values to question keyword arguments
+
+    Raises ValueError for unknown parameters or unparseable values.
+    """
+    accepted = question_params(name)
+    params = {}
+    for key, values in query.items():
+        if key not in accepted:
+            raise ValueError(f"{name} does not take '{key}' (accepts: {', '.join(accepted)})")
+        value = values[-1]
+        kind = PARAM_TYPES.get(key)
+        if kind == 'date':
+            params[key] = datetime.fromisoformat(value)
+        elif kind == 'list':
+            params[key] = None if value.lower() == 'all' else [item.strip() for item in value.split(',') if item.strip()]
+        elif kind == 'int':
+            params[key] = int(value)
+        else:
+            params[key] = value
+    return params
+
+# =====================================================
+# HTTP Handler
+# =====================================================
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """Routes /q1../q7, /questions, /health and /reload"""
+
+    def _send(self, status, document):
+        body = json.dumps(to_jsonable(document)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        route = url.path.strip('/')
+        if route in QUESTIONS:
+            self._answer(route, parse_qs(url.query))
+        elif route == 'questions':
+            self._send(200, {name: question_params(name) for name in QUESTIONS})
+        elif route == 'health':
+            data = _state['data']
+            self._send(200, {'loaded_at': _state['loaded_at'], 'load_seconds': _state['load_seconds'],
+                             'rows': {key: len(frame) for key, frame in data.items()}})
+        elif route == 'reload':
+            self._reload()
+        else:
+            self._send(404, {'error': f"unknown endpoint /{route}"})
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip('/') == 'reload':
+            self._reload()
+        else:
+            self._send(404, {'error': "only /reload accepts POST"})
+
+    def _answer(self, name, query):
+        started = time.perf_counter()
+        try:
+            params = parse_params(name, query)
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+            return
+        try:
+            result = run_question(name, _state['data'], **params)
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send(200, {'question': name, 'params': params, 'loaded_at': _state['loaded_at'],
+                         'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+                         'result': result})
+
+    def _reload(self):
+        try:
+            state = load_resident()
+        except Exception as e:
+            self._send(500, {'error': f"reload failed, previous data kept: {type(e).__name__}: {e}"})
+            return
+        self._send(200, {'loaded_at': state['loaded_at'], 'load_seconds': state['load_seconds'],
+                         'rows': {key: len(frame) for key, frame in state['data'].items()}})
+
+    def log_message(self, format, *args):
+        print(f"  [{self.log_date_time_string()}] {format % args}")
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Serve the Primary Analysis questions over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"bind address (default {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port (default {DEFAULT_PORT})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Query Service")
+    print("=" * 60)
+
+    print("Loading datasets...")
+    state = load_resident()
+    for key, frame in state['data'].items():
+        print(f"  {key:<10} {len(frame):>12,} rows")
+    print(f"  [OK] Loaded in {state['load_seconds']:.1f}s")
+
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    print(f"\nServing on http://{args.host}:{args.port}/ (q1..q7, questions, health, reload)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+AirPure AQI Analytics - Rolling Windows and Exceedance Streaks
+===============================================================
+Nightly job computing, for every monitoring area in aqi_daily:
+
+    aqi_rolling_daily       per area and day: 7/30/90-day rolling mean AQI,
+                            readings and poor days (Poor / Very Poor /
+                            Severe) in each window, and the length of the
+                            exceedance streak ending that day
+    aqi_exceedance_streak   per area: longest streak of consecutive poor
+                            days (with its dates), the streak at the last
+                            reading and the days observed
+
+Windows are calendar windows: the 30-day window of a day covers that day
+and the 29 before it, whatever readings exist in between. A missing day
+breaks a streak.
+
+The rows are sorted once by (state, area, date) so each area is one
+contiguous segment. Every row's window start is then found for all areas
+at once with a single searchsorted over a combined (segment, day) key,
+and window sums are differences of cumulative sums. No per-area
+groupby-apply is involved.
+
+Results are written as Parquet next to the staging files and loaded into
+MySQL (tables in database_schema_v2.sql) for the dashboard.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl_loaders import DEFAULT_LOADER, LOADERS, insert_chunk
+from staging import STAGING_PATH, read_table
+
+# =====================================================
+# Configuration
+# =====================================================
+
+WINDOWS = [7, 30, 90]
+
+POOR_STATUSES = ['Poor', 'Very Poor', 'Severe']
+
+ROLLING_TABLE = 'aqi_rolling_daily'
+STREAK_TABLE = 'aqi_exceedance_streak'
+
+LOAD_CHUNK_SIZE = 50000
+
+# Days per segment in the combined key; far above any date span
+SEGMENT_STRIDE = 1 << 32
+
+# =====================================================
+# Computation
+# =====================================================
+
+def _sorted_segments(aqi_df):
+    """Daily rows sorted by (state, area, date), one row per area and day
+
+    Rows without state, area or date are dropped; duplicate readings for an
+    area and day keep the last one loaded.
+    """
+    frame = aqi_df[['state', 'area', 'date', 'aqi_value', 'air_quality_status']]
+    frame = frame.dropna(subset=['state', 'area', 'date'])
+    frame = frame.assign(state=frame['state'].astype(str), area=frame['area'].astype(str))
+    frame = frame.drop_duplicates(subset=['state', 'area', 'date'], keep='last')
+    return frame.sort_values(['state', 'area', 'date'], kind='stable').reset_index(drop=True)
+
+def _window_sum(cumulative, start):
+    """Sum over rows start..i for every row i from an inclusive cumulative sum"""
+    before = np.where(start > 0, cumulative[np.maximum(start - 1, 0)], 0)
+    return cumulative - before
+
+def compute_rolling(aqi_df, windows=WINDOWS, poor_statuses=POOR_STATUSES):
+    """Rolling means, poor-day counts and streaks for every area and day
+
+    Returns (daily, streaks) DataFrames; see the module docstring.
+    """
+    frame = _sorted_segments(aqi_df)
+    n = len(frame)
+    segment = (frame['state'].ne(frame['state'].shift()) | frame['area'].ne(frame['area'].shift())).cumsum().to_numpy() - 1
+    days = frame['date'].to_numpy().astype('datetime64[D]').astype('int64')
+    # Strictly increasing across segments, so a window never reaches into the previous area
+    key = segment.astype('int64') * SEGMENT_STRIDE + (days - days.min() if n else days)
+
+    values = frame['aqi_value'].to_numpy(dtype='float64', na_value=np.nan)
+    has_value = ~np.isnan(values)
+    poor = frame['air_quality_status'].isin(poor_statuses).to_numpy()
+    value_cum = np.cumsum(np.where(has_value, values, 0.0))
+    count_cum = np.cumsum(has_value.astype('int64'))
+    poor_cum = np.cumsum(poor.astype('int64'))
+
+    daily = frame[['state', 'area', 'date', 'aqi_value', 'air_quality_status']].copy()
+    for window in windows:
+        start = np.searchsorted(key, key - (window - 1), side='left')
+        readings = _window_sum(count_cum, start)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily[f'mean_{window}d'] = np.where(readings > 0, _window_sum(value_cum, start) / readings, np.nan)
+        daily[f'readings_{window}d'] = readings
+        daily[f'poor_days_{window}d'] = _window_sum(poor_cum, start)
+
+    # A run breaks at a new area, a missing day or a day that is not poor
+    continues = np.zeros(n, dtype=bool)
+    if n:
+        continues[1:] = (segment[1:] == segment[:-1]) & (days[1:] == days[:-1] + 1) & poor[1:] & poor[:-1]
+    run_start = np.maximum.accumulate(np.where(~continues, np.arange(n), 0)) if n else np.zeros(0, dtype='int64')
+    daily['exceedance_streak'] = np.where(poor, np.arange(n) - run_start + 1, 0)
+
+    return daily, _streak_summary(daily, segment)
+
+def _streak_summary(daily, segment):
+    """Longest and latest exceedance streak per area"""
+    streak = daily['exceedance_streak'].to_numpy()
+    frame = daily[['state', 'area', 'date', 'exceedance_streak']].assign(poor=streak > 0)
+    summary = frame.groupby(segment, sort=True).agg(
+        state=('state', 'first'), area=('area', 'first'),
+        first_date=('date', 'min'), last_date=('date', 'max'),
+        days_observed=('date', 'size'), poor_days=('poor', 'sum'),
+        longest_streak=('exceedance_streak', 'max'), current_streak=('exceedance_streak', 'last'))
+
+    # Row where each area's longest streak ends (first such row on ties)
+    order = np.lexsort((-np.arange(len(streak)), streak, segment))
+    last_of_segment = np.r_[segment[order][1:] != segment[order][:-1], True]
+    best_end = order[last_of_segment]
+    best_len = streak[best_end]
+    end_dates = daily['date'].to_numpy()[best_end]
+    summary['longest_streak_end'] = np.where(best_len > 0, end_dates, np.datetime64('NaT'))
+    summary['longest_streak_start'] = (summary['longest_streak_end']
+                                       - pd.to_timedelta(np.maximum(best_len - 1, 0), unit='D'))
+    return summary[['state', 'area', 'first_date', 'last_date', 'days_observed', 'poor_days',
+                    'longest_streak', 'longest_streak_start', 'longest_streak_end',
+                    'current_streak']].reset_index(drop=True)
+
+# =====================================================
+# Materialization
+# =====================================================
+
+def write_parquet(daily, streaks):
+    """Write both tables next to the staging files; returns their paths"""
+    os.makedirs(STAGING_PATH, exist_ok=True)
+    paths = []
+    for table_name, frame in ((ROLLING_TABLE, daily), (STREAK_TABLE, streaks)):
+        path = os.path.join(STAGING_PATH, f"{table_name}.parquet")
+        frame.to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        paths.append(path)
+    return paths
+
+def load_mysql(engine, daily, streaks, backend=DEFAULT_LOADER, chunk_size=LOAD_CHUNK_SIZE):
+    """Replace both MySQL tables' contents in one transaction"""
+    with engine.begin() as conn:
+        for table_name, frame in ((ROLLING_TABLE, daily), (STREAK_TABLE, streaks)):
+            conn.exec_driver_sql(f"DELETE FROM `{table_name}`")
+            for start in range(0, len(frame), chunk_size):
+                insert_chunk(conn, backend, table_name, frame.iloc[start:start + chunk_size])
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Compute rolling AQI windows and exceedance streaks")
+    parser.add_argument('--no-mysql', action='store_true',
+                        help="only write the Parquet files, do not load MySQL")
+    parser.add_argument('--loader', choices=list(LOADERS), default=DEFAULT_LOADER,
+                        help=f"bulk insert backend for MySQL (default {DEFAULT_LOADER})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Rolling Windows and Streaks")
+    print("=" * 60)
+
+    print("\n[1/3] Reading aqi_daily...")
+    aqi_df = read_table('aqi_daily', columns=['state', 'area', 'date', 'aqi_value', 'air_quality_status'])
+    print(f"  [OK] {len(aqi_df):,} rows")
+
+    print(f"\n[2/3] Computing {'/'.join(map(str, WINDOWS))}-day windows and streaks...")
+    started = time.perf_counter()
+    daily, streaks = compute_rolling(aqi_df)
+    print(f"  [OK] {len(daily):,} area-days across {len(streaks):,} areas "
+          f"in {time.perf_counter() - started:.2f}s")
+    for path in write_parquet(daily, streaks):
+        print(f"  [OK] Written {path}")
+
+    if args.no_mysql:
+        return
+    print("\n[3/3] Loading MySQL...")
+    try:
+        from db import get_engine
+        load_mysql(get_engine(), daily, streaks, backend=args.loader)
+    except Exception as e:
+        print(f"  [ERROR] MySQL load failed: {e}")
+        sys.exit(1)
+    print(f"  [OK] {ROLLING_TABLE}: {len(daily):,} rows, {STREAK_TABLE}: {len(streaks):,} rows")
+
+if __name__ == "__main__":
+    main()
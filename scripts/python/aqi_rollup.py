@@ -0,0 +1,279 @@
+"""
+AirPure AQI Analytics - Monthly AQI Rollup
+===========================================
+One row per (state, area, year, month) carrying additive AQI measures:
+
+    aqi_sum, aqi_count       mean = aqi_sum / aqi_count (NULL readings excluded)
+    aqi_min, aqi_max         extremes
+    row_count                daily rows, including those without a reading
+    first_date, last_date    date span covered
+    good_days .. severe_days rows per air_quality_status
+
+Because every measure merges by addition (or min/max), the rollup is
+maintained incrementally: each batch of new daily rows is rolled up on its
+own and merged into the existing rows. The same code keeps the MySQL
+summary tables (aqi_monthly_rollup, fact_aqi_monthly) and the cached
+in-memory frame used by analysis_engine up to date.
+
+Databases whose daily rows predate the rollup are filled once with
+    python aqi_rollup.py
+(etl_simple.py --incremental does this by itself when the table is empty).
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import exc
+
+from etl_incremental import appended_content, same_content
+from staging import (STAGING_PATH, ensure_stage, iter_table, read_meta, source_path, stage_meta,
+                     staged_row_count)
+
+# =====================================================
+# Configuration
+# =====================================================
+
+ROLLUP_KEYS = ['state', 'area', 'year', 'month']
+
+STATUS_DAY_COLUMNS = {
+    'Good': 'good_days',
+    'Satisfactory': 'satisfactory_days',
+    'Moderate': 'moderate_days',
+    'Poor': 'poor_days',
+    'Very Poor': 'very_poor_days',
+    'Severe': 'severe_days',
+}
+
+SUM_COLUMNS = ['aqi_sum', 'aqi_count', 'row_count'] + list(STATUS_DAY_COLUMNS.values())
+MIN_COLUMNS = ['aqi_min', 'first_date']
+MAX_COLUMNS = ['aqi_max', 'last_date']
+MEASURE_COLUMNS = ['aqi_sum', 'aqi_count', 'aqi_min', 'aqi_max', 'row_count',
+                   'first_date', 'last_date'] + list(STATUS_DAY_COLUMNS.values())
+
+ROLLUP_CHUNK_SIZE = 500000
+
+# summary table -> (FROM clause, {key column: expression}, date expression,
+# {attribute column: expression}) it is backfilled from
+ROLLUP_SOURCES = {
+    'aqi_monthly_rollup': ('aqi_daily', {'state': 'state', 'area': 'area'}, '`date`', {}),
+    'fact_aqi_monthly': ('fact_aqi_daily f JOIN dim_state s ON s.state_id = f.state_id '
+                         'JOIN dim_city c ON c.city_id = f.city_id',
+                         {'state_name': 's.state_name', 'city_name': 'c.city_name'}, 'f.date_value',
+                         {'state_id': 'f.state_id', 'city_id': 'f.city_id'}),
+}
+
+# =====================================================
+# Building and Merging
+# =====================================================
+
+def rollup_rows(df, key_cols=('state', 'area'), date_col='date', value_col='aqi_value',
+                status_col='air_quality_status', attribute_cols=()):
+    """Roll daily rows up to (key_cols..., year, month)
+
+    attribute_cols are carried along unaggregated (they must be constant
+    within a group, e.g. surrogate ids next to names). Rows with a missing
+    key or date are left out.
+    """
+    key_cols = list(key_cols)
+    dates = df[date_col]
+    frame = pd.DataFrame({col: df[col].astype(object) for col in key_cols}, index=df.index)
+    frame['year'] = dates.dt.year
+    frame['month'] = dates.dt.month
+    values = df[value_col].astype('float64')
+    frame['aqi_sum'] = values.fillna(0)
+    frame['aqi_count'] = values.notna().astype('int64')
+    frame['aqi_min'] = values
+    frame['aqi_max'] = values
+    frame['row_count'] = 1
+    frame['first_date'] = dates
+    frame['last_date'] = dates
+    status = df[status_col].astype(object)
+    for label, col in STATUS_DAY_COLUMNS.items():
+        frame[col] = (status == label).astype('int64')
+    for col in attribute_cols:
+        frame[col] = df[col]
+
+    groups = key_cols + ['year', 'month']
+    frame = frame.dropna(subset=groups)
+    return _aggregate(frame, groups, attribute_cols)
+
+def _aggregate(frame, groups, attribute_cols=()):
+    """Combine rollup rows that share a key"""
+    aggs = {col: 'sum' for col in SUM_COLUMNS}
+    aggs.update({col: 'min' for col in MIN_COLUMNS})
+    aggs.update({col: 'max' for col in MAX_COLUMNS})
+    aggs.update({col: 'first' for col in attribute_cols})
+    rolled = frame.groupby(groups, sort=False).agg(aggs).reset_index()
+    rolled['year'] = rolled['year'].astype('int64')
+    rolled['month'] = rolled['month'].astype('int64')
+    return rolled[groups + list(attribute_cols) + MEASURE_COLUMNS]
+
+def merge_rollups(base, delta, key_cols=('state', 'area'), attribute_cols=()):
+    """Merge the rollup of new daily rows into an existing rollup"""
+    if base is None or base.empty:
+        return delta
+    groups = list(key_cols) + ['year', 'month']
+    return _aggregate(pd.concat([base, delta], ignore_index=True), groups, attribute_cols)
+
+def rollup_mean(rollup, by):
+    """Mean AQI per group of rollup rows (NaN where a group has no readings)"""
+    sums = rollup.groupby(by, sort=False)[['aqi_sum', 'aqi_count']].sum()
+    return sums['aqi_sum'] / sums['aqi_count'].replace(0, np.nan)
+
+# =====================================================
+# MySQL Summary Tables
+# =====================================================
+
+def upsert_rollup(conn, table_name, rollup, key_cols=ROLLUP_KEYS):
+    """Merge a rollup frame into a summary table with INSERT ... ON DUPLICATE KEY UPDATE
+
+    Runs inside the caller's transaction so the summary stays consistent
+    with the daily rows it was computed from.
+    """
+    if rollup.empty:
+        return 0
+    columns = list(rollup.columns)
+    updates = []
+    for col in columns:
+        if col in SUM_COLUMNS:
+            updates.append(f"`{col}` = `{col}` + VALUES(`{col}`)")
+        elif col in MIN_COLUMNS or col in MAX_COLUMNS:
+            # LEAST/GREATEST return NULL if either side is NULL
+            func = 'LEAST' if col in MIN_COLUMNS else 'GREATEST'
+            updates.append(f"`{col}` = COALESCE({func}(`{col}`, VALUES(`{col}`)), `{col}`, VALUES(`{col}`))")
+        elif col not in key_cols:
+            updates.append(f"`{col}` = VALUES(`{col}`)")
+    col_list = ', '.join(f"`{col}`" for col in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    sql = (f"INSERT INTO `{table_name}` ({col_list}) VALUES ({placeholders}) "
+           f"ON DUPLICATE KEY UPDATE {', '.join(updates)}")
+
+    out = rollup.copy()
+    for col in ('first_date', 'last_date'):
+        out[col] = out[col].dt.date
+    out = out.astype(object).where(out.notna(), None)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(sql, list(out.itertuples(index=False, name=None)))
+    finally:
+        cursor.close()
+    return len(rollup)
+
+def backfill_sql(table_name):
+    """INSERT ... SELECT ... GROUP BY recomputing a summary table from its daily table"""
+    from_clause, keys, date_expr, attributes = ROLLUP_SOURCES[table_name]
+    selects = dict(keys)
+    selects['year'] = f"YEAR({date_expr})"
+    selects['month'] = f"MONTH({date_expr})"
+    selects.update({col: f"MIN({expr})" for col, expr in attributes.items()})
+    selects.update({
+        'aqi_sum': 'COALESCE(SUM(aqi_value), 0)',
+        'aqi_count': 'COUNT(aqi_value)',
+        'aqi_min': 'MIN(aqi_value)',
+        'aqi_max': 'MAX(aqi_value)',
+        'row_count': 'COUNT(*)',
+        'first_date': f"MIN({date_expr})",
+        'last_date': f"MAX({date_expr})",
+    })
+    for label, col in STATUS_DAY_COLUMNS.items():
+        selects[col] = f"COALESCE(SUM(air_quality_status = '{label}'), 0)"
+    # Rows with a missing key or date are left out, as in rollup_rows
+    present = ' AND '.join(f"{expr} IS NOT NULL" for expr in list(keys.values()) + [date_expr])
+    groups = ', '.join(list(keys.values()) + [f"YEAR({date_expr})", f"MONTH({date_expr})"])
+    return (f"INSERT INTO `{table_name}` ({', '.join(f'`{col}`' for col in selects)}) "
+            f"SELECT {', '.join(selects.values())} FROM {from_clause} WHERE {present} GROUP BY {groups}")
+
+def backfill_rollup(conn, table_name, rebuild=False):
+    """Fill a summary table from the daily rows already in the database
+
+    Needed once for databases whose daily rows were loaded before the
+    rollup existed (later loads keep it up to date). A table that already
+    has rows is left alone unless rebuild; returns the rows written.
+    """
+    if rebuild:
+        conn.exec_driver_sql(f"DELETE FROM `{table_name}`")
+    elif conn.exec_driver_sql(f"SELECT 1 FROM `{table_name}` LIMIT 1").first():
+        return 0
+    return conn.exec_driver_sql(backfill_sql(table_name)).rowcount
+
+# =====================================================
+# In-Memory Rollup (cached next to the staging files)
+# =====================================================
+
+def _rollup_paths():
+    base = os.path.join(STAGING_PATH, 'aqi_monthly_rollup')
+    return base + '.parquet', base + '.json'
+
+def load_rollup():
+    """Monthly rollup of the staged aqi_daily table
+
+    Cached as Parquet and tied to the fingerprint of the stage's source.
+    When the source only gained appended lines, just the staged rows after
+    the ones already rolled up are rolled up and merged in; any other
+    change rebuilds it from the rollups of staged chunks. Either way the
+    daily table is never held in memory for it.
+    """
+    ensure_stage('aqi_daily')
+    fingerprint = stage_meta('aqi_daily')['fingerprint']
+    parquet_path, meta_path = _rollup_paths()
+    meta = read_meta(meta_path)
+    cached = bool(meta) and os.path.exists(parquet_path)
+    if cached and same_content(fingerprint, meta['fingerprint']):
+        return pd.read_parquet(parquet_path)
+
+    base, start_row = None, 0
+    if cached and 'staged_rows' in meta and appended_content(source_path('aqi_daily'), meta['fingerprint']):
+        base, start_row = pd.read_parquet(parquet_path), meta['staged_rows']
+
+    delta = None
+    for chunk in iter_table('aqi_daily', ROLLUP_CHUNK_SIZE, start_row=start_row):
+        delta = merge_rollups(delta, rollup_rows(chunk))
+    rollup = merge_rollups(base, delta) if delta is not None else base
+    if rollup is None:
+        rollup = pd.DataFrame(columns=ROLLUP_KEYS + MEASURE_COLUMNS)
+
+    tmp_path = parquet_path + '.tmp'
+    rollup.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'rows': len(rollup),
+                   'staged_rows': staged_row_count('aqi_daily')}, f, indent=2)
+    return rollup
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Backfill the monthly AQI summary tables from the daily rows")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="recompute the summary tables even if they already have rows")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Monthly Rollup Backfill")
+    print("=" * 60)
+
+    from db import get_engine
+    engine = get_engine()
+    for table_name in ROLLUP_SOURCES:
+        try:
+            with engine.begin() as conn:
+                written = backfill_rollup(conn, table_name, rebuild=args.rebuild)
+        except exc.ProgrammingError as e:
+            print(f"  [WARN] {table_name}: skipped ({e.orig})")
+            continue
+        if written:
+            print(f"  [OK] {table_name}: {written:,} rollup rows written")
+        else:
+            print(f"  [OK] {table_name}: already filled (use --rebuild to recompute)")
+
+if __name__ == "__main__":
+    main()
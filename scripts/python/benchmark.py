@@ -0,0 +1,318 @@
+"""
+AirPure AQI Analytics - Pipeline Benchmark
+===========================================
+Times every stage of the pipeline on synthetic sources (synthetic_data.py)
+and records, per stage, seconds, rows/sec and memory:
+
+    generate    write the synthetic source files (skipped when present)
+    stage       build the Parquet staging files from the sources
+    rollup      build the monthly rollup from the staged daily rows
+    load        insert every staged table into the database
+    datasets    load_datasets() for the analysis
+    q1 .. q7    each Primary Analysis question (result cache bypassed)
+    export      stream every table to CSV with export_to_csv.py
+
+The load and export stages run against a SQLite file in the benchmark
+directory by default, so the suite runs anywhere; --mysql runs them
+through etl_simple against the local MySQL database instead (the schema
+is recreated, so only use it on a development server).
+
+Memory is the process peak RSS after each stage; --trace-memory also
+records each stage's own peak allocation with tracemalloc, which slows
+the stages down severalfold (such runs are only compared with each other).
+
+Every run appends one JSON line (git commit, row counts, stages) to
+benchmark_results.jsonl in the benchmark directory. --compare COMMIT
+checks the run against the latest earlier run of that commit on the same
+row counts and database, and exits with status 1 when a stage slowed
+down beyond --threshold.
+
+Usage:
+    python benchmark.py --dir d:\\bench\\x10 --scale 10
+    python benchmark.py --dir d:\\bench\\x10 --scale 10 --compare 1a2b3c4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+import aqi_rollup
+import result_cache
+import sources
+import staging
+from analysis_engine import QUESTIONS, load_datasets
+from analysis_runner import run_questions
+from etl_loaders import insert_chunk
+from export_to_csv import TABLES as EXPORT_TABLES, export_tables
+from instrumentation import peak_rss_mb
+from sources import FILES
+from synthetic_data import generate
+
+# =====================================================
+# Configuration
+# =====================================================
+
+RESULTS_FILE = 'benchmark_results.jsonl'
+
+# Stages slower than baseline x (1 + threshold) count as regressions
+DEFAULT_THRESHOLD = 0.10
+
+# Stages shorter than this are too noisy to compare
+MIN_COMPARE_SECONDS = 0.05
+
+LOAD_CHUNK_SIZE = 50000
+
+# =====================================================
+# Measurement
+# =====================================================
+
+def measure(stages, name, func, rows=None, trace_memory=False):
+    """Run func() as one stage and record its timing and memory
+
+    rows is the row count the stage processed, or a callable that computes
+    it from func's return value. Returns func's return value.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        value = func()
+        seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    count = rows(value) if callable(rows) else rows
+    rss = peak_rss_mb()
+    stages[name] = {
+        'seconds': round(seconds, 4),
+        'rows': count,
+        'rows_per_sec': round(count / seconds) if count and seconds > 0 else None,
+        'peak_mb': round(peak / (1024 * 1024), 1) if peak is not None else None,
+        'peak_rss_mb': round(rss, 1) if rss is not None else None,
+    }
+    rate = f"{stages[name]['rows_per_sec']:>12,} rows/s" if stages[name]['rows_per_sec'] else ' ' * 19
+    memory = stages[name]['peak_mb'] if peak is not None else stages[name]['peak_rss_mb']
+    memory = f"{memory:>8,.1f} MB" if memory is not None else ''
+    print(f"  {name:<10} {seconds:>9.2f}s {rate} {memory}")
+    return value
+
+def git_commit():
+    """Current commit hash of the working tree (None outside git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# =====================================================
+# Stages
+# =====================================================
+
+def use_bench_paths(bench_dir):
+    """Point sources, staging files and caches at the benchmark directory"""
+    source_dir = os.path.join(bench_dir, 'sources')
+    staging_dir = os.path.join(bench_dir, 'staging')
+    sources.BASE_PATH = staging.BASE_PATH = source_dir
+    staging.STAGING_PATH = aqi_rollup.STAGING_PATH = staging_dir
+    result_cache.CACHE_PATH = os.path.join(bench_dir, 'result_cache')
+    return source_dir
+
+def build_stages():
+    """Rebuild every staging file; returns {table: rows}"""
+    rows = {}
+    for table_name in FILES:
+        staging.build_stage(table_name)
+        rows[table_name] = staging.staged_row_count(table_name)
+    return rows
+
+def sqlite_engine(bench_dir):
+    """Fresh SQLite stand-in database for the load and export stages"""
+    path = os.path.join(bench_dir, 'bench.db')
+    if os.path.exists(path):
+        os.remove(path)
+    return create_engine(f"sqlite:///{path}")
+
+def load_sqlite(engine, table_name):
+    """Insert a staged table in chunks with the to_sql backend"""
+    total = 0
+    with engine.begin() as conn:
+        for chunk in staging.iter_table(table_name, LOAD_CHUNK_SIZE):
+            for col in chunk.columns:
+                if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                    chunk[col] = chunk[col].astype(object)
+            total += insert_chunk(conn, 'to_sql', table_name, chunk)
+    return total
+
+def load_mysql():
+    """Recreate the schema and load every table through etl_simple"""
+    from db import get_engine
+    from etl_simple import execute_schema, run_table
+    if not execute_schema():
+        raise RuntimeError("schema setup failed")
+    engine = get_engine()
+    total = 0
+    for table_name in FILES:
+        total += run_table(table_name, engine, {'staged': True}, {}, [])
+    return engine, total
+
+def export_csv(engine, output_dir):
+    """Export every table to CSV with the Power BI exporter; returns rows written"""
+    results = export_tables(engine, EXPORT_TABLES, output_dir, workers=1)
+    failed = {table: result for table, result in results.items() if isinstance(result, str)}
+    if failed:
+        raise RuntimeError(f"export failed: {failed}")
+    return sum(rows for rows, _, _ in results.values())
+
+def run_benchmark(bench_dir, scale=1.0, seed=42, mysql=False, trace_memory=False):
+    """Run every stage; returns the result document"""
+    source_dir = use_bench_paths(bench_dir)
+    stages = {}
+    print(f"\n{'Stage':<12} {'Seconds':>9} {'Throughput':>19} {'Peak ' + ('traced' if trace_memory else 'RSS'):>11}")
+    print("-" * 55)
+
+    missing = [t for t in FILES if not os.path.exists(os.path.join(source_dir, FILES[t]['file']))]
+    if missing:
+        measure(stages, 'generate', lambda: generate(source_dir, scale=scale, seed=seed, tables=missing),
+                rows=lambda c: sum(c.values()), trace_memory=trace_memory)
+    rows = measure(stages, 'stage', build_stages, rows=lambda r: sum(r.values()), trace_memory=trace_memory)
+
+    for path in aqi_rollup._rollup_paths():
+        if os.path.exists(path):
+            os.remove(path)
+    measure(stages, 'rollup', aqi_rollup.load_rollup, rows=rows['aqi_daily'], trace_memory=trace_memory)
+
+    if mysql:
+        engine, _ = measure(stages, 'load', load_mysql, rows=lambda r: r[1], trace_memory=trace_memory)
+    else:
+        engine = sqlite_engine(bench_dir)
+        measure(stages, 'load', lambda: sum(load_sqlite(engine, t) for t in FILES),
+                rows=lambda r: r, trace_memory=trace_memory)
+
+    data = measure(stages, 'datasets', load_datasets, rows=sum(rows.values()), trace_memory=trace_memory)
+    for name in QUESTIONS:
+        measure(stages, name, lambda: run_questions([name], data=data, workers=1, use_cache=False),
+                rows=rows['aqi_daily'], trace_memory=trace_memory)
+    del data
+
+    measure(stages, 'export', lambda: export_csv(engine, os.path.join(bench_dir, 'export')),
+            rows=lambda r: r, trace_memory=trace_memory)
+    engine.dispose()
+
+    return {
+        'commit': git_commit(),
+        'run_at': datetime.now().isoformat(timespec='seconds'),
+        'scale': scale if missing else None,
+        'seed': seed if missing else None,
+        'trace_memory': trace_memory,
+        'database': 'mysql' if mysql else 'sqlite',
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'rows': rows,
+        'stages': stages,
+    }
+
+# =====================================================
+# Results and Comparison
+# =====================================================
+
+def append_result(bench_dir, result):
+    """Append one run to the results file; returns its path"""
+    path = os.path.join(bench_dir, RESULTS_FILE)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+    return path
+
+def read_results(bench_dir):
+    """Every recorded run, oldest first"""
+    path = os.path.join(bench_dir, RESULTS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def find_baseline(runs, commit, result):
+    """Latest comparable run of a commit (hash prefix): same rows, database and tracing"""
+    for run in reversed(runs):
+        if ((run.get('commit') or '').startswith(commit) and run['rows'] == result['rows']
+                and run['database'] == result['database']
+                and run.get('trace_memory') == result['trace_memory']):
+            return run
+    return None
+
+def compare(result, baseline, threshold=DEFAULT_THRESHOLD):
+    """Print stage times against a baseline run; returns the regressed stages"""
+    print(f"\nAgainst {baseline['commit'][:10]} ({baseline['run_at']}):")
+    print(f"{'Stage':<12} {'Baseline':>9} {'Now':>9} {'Change':>8}")
+    print("-" * 42)
+    regressed = []
+    for name, stage in result['stages'].items():
+        before = baseline['stages'].get(name)
+        if not before:
+            continue
+        change = stage['seconds'] / before['seconds'] - 1 if before['seconds'] > 0 else 0.0
+        slow = change > threshold and before['seconds'] >= MIN_COMPARE_SECONDS
+        if slow:
+            regressed.append(name)
+        print(f"{name:<12} {before['seconds']:>9.2f} {stage['seconds']:>9.2f} {change:>+8.1%}"
+              f"{'  [REGRESSION]' if slow else ''}")
+    return regressed
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Benchmark the ETL, analysis and export on synthetic data")
+    parser.add_argument('--dir', required=True,
+                        help="benchmark directory (sources, staging files, database, results)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="synthetic data scale, used when the sources are not generated yet (default 1)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for generation (default 42)")
+    parser.add_argument('--mysql', action='store_true',
+                        help="load and export through the local MySQL database (recreates its schema)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="record each stage's peak allocation with tracemalloc (much slower)")
+    parser.add_argument('--compare', metavar='COMMIT',
+                        help="compare with the latest recorded run of this commit")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"slowdown counted as a regression (default {DEFAULT_THRESHOLD:.0%})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Pipeline Benchmark")
+    print("=" * 60)
+    print(f"Directory: {args.dir} | Database: {'mysql' if args.mysql else 'sqlite'}")
+
+    os.makedirs(args.dir, exist_ok=True)
+    previous = read_results(args.dir)
+    result = run_benchmark(args.dir, scale=args.scale, seed=args.seed, mysql=args.mysql,
+                           trace_memory=args.trace_memory)
+    path = append_result(args.dir, result)
+    print(f"\n[OK] Results appended to {path}")
+
+    if args.compare:
+        baseline = find_baseline(previous, args.compare, result)
+        if baseline is None:
+            print(f"\n[ERROR] No recorded run of {args.compare} on the same rows and database")
+            sys.exit(2)
+        regressed = compare(result, baseline, args.threshold)
+        if regressed:
+            print(f"\n[ERROR] {len(regressed)} stage(s) slower than {args.threshold:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+        print("\n[OK] No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,4 @@
-import pymysql
-
-# Connect to database
-conn = pymysql.connect(
-    host='localhost',
-    user='root',
-    password='admin',
-    database='airpure_aqi_db'
-)
-
-cursor = conn.cursor()
+from db import get_engine, table_counts
 
 # Check all tables
 tables = [
@@ -22,15 +12,18 @@ tables = [
     'fact_vehicle_registration'
 ]
 
+engine = get_engine(pool_size=1, max_overflow=0)
+
 print("="*60)
 print("DATABASE RECORD COUNTS")
 print("="*60)
 
+# All counts in one query
+counts = table_counts(engine, tables)
 for table in tables:
-    cursor.execute(f"SELECT COUNT(*) FROM {table}")
-    count = cursor.fetchone()[0]
-    print(f"{table:30} {count:>10,} records")
+    count = counts[table]
+    print(f"{table:30} {count:>10,} records" if count is not None else f"{table:30} {'missing':>10}")
 
 print("="*60)
 
-conn.close()
+engine.dispose()
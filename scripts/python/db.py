@@ -0,0 +1,148 @@
+"""
+AirPure AQI Analytics - Database Access
+========================================
+The one place scripts get MySQL connections from.
+
+Settings come from config/database_config.ini (copy
+database_config.ini.template and fill in the password), or the file named
+by the AQI_DB_CONFIG environment variable:
+
+    [database]
+    host = localhost
+    port = 3306
+    user = root
+    password = ...
+    database = airpure_aqi_db
+
+Without the file the previous built-in settings are used. get_engine()
+returns one pooled SQLAlchemy engine per process and pool size, with
+pre-ping (dead connections are replaced instead of failing the first
+query) and recycling; connect() gives a raw pymysql connection for
+statements that run outside a database (schema setup, server checks).
+
+table_counts() fetches the row counts of many tables in one round trip:
+exact counts with a single UNION ALL of COUNT(*)s, or InnoDB's estimates
+straight from information_schema.TABLES.
+"""
+
+import configparser
+import os
+import threading
+
+import pymysql
+from sqlalchemy import URL, create_engine, exc
+
+# =====================================================
+# Configuration
+# =====================================================
+
+CONFIG_PATH = os.environ.get('AQI_DB_CONFIG') or r'd:\FEB_AQI_P2\config\database_config.ini'
+
+DEFAULT_CONFIG = {
+    'host': 'localhost',
+    'port': 3306,
+    'user': 'root',
+    'password': 'admin',
+    'database': 'airpure_aqi_db',
+}
+
+# Seconds after which pooled connections are replaced (below MySQL's wait_timeout)
+POOL_RECYCLE = 3600
+
+_config = None
+_engines = {}
+_engines_lock = threading.Lock()
+
+def load_config(path=CONFIG_PATH):
+    """Connection settings from the [database] section of an ini file
+
+    Missing keys (or a missing file) fall back to DEFAULT_CONFIG.
+    """
+    config = dict(DEFAULT_CONFIG)
+    parser = configparser.ConfigParser(interpolation=None)
+    if parser.read(path, encoding='utf-8') and parser.has_section('database'):
+        section = parser['database']
+        for key in config:
+            if key in section:
+                config[key] = section.getint(key) if key == 'port' else section[key]
+    return config
+
+def db_config():
+    """Settings of this process, read once"""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+# =====================================================
+# Connections
+# =====================================================
+
+def connection_url(database=True):
+    """SQLAlchemy URL of the configured server (and database); the password needs no escaping"""
+    config = db_config()
+    return URL.create('mysql+pymysql', username=config['user'], password=config['password'],
+                      host=config['host'], port=int(config['port']),
+                      database=config['database'] if database else None)
+
+def get_engine(pool_size=5, max_overflow=10):
+    """Pooled engine for the configured database
+
+    Engines are shared within a process (per pool size), so scripts and
+    helpers asking for one reuse the same connections.
+    """
+    key = (os.getpid(), pool_size, max_overflow)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            # local_infile is required by the LOAD DATA loader backend
+            engine = _engines[key] = create_engine(
+                connection_url(), echo=False, connect_args={'local_infile': True},
+                pool_size=pool_size, max_overflow=max_overflow,
+                pool_pre_ping=True, pool_recycle=POOL_RECYCLE)
+    return engine
+
+def connect(database=True, **overrides):
+    """Raw pymysql connection; overrides replace configured settings (e.g. password)"""
+    config = {**db_config(), **overrides}
+    return pymysql.connect(host=config['host'], port=int(config['port']), user=config['user'],
+                           password=config['password'],
+                           database=config['database'] if database else None,
+                           autocommit=overrides.get('autocommit', False))
+
+# =====================================================
+# Batched Metadata
+# =====================================================
+
+def _union_counts(conn, tables):
+    """Exact {table: rows} with one UNION ALL of COUNT(*)s"""
+    sql = ' UNION ALL '.join(f"SELECT %s, COUNT(*) FROM `{table}`" for table in tables)
+    return {name: int(count) for name, count in conn.exec_driver_sql(sql, tuple(tables))}
+
+def table_counts(engine, tables, exact=True):
+    """{table: rows} for many tables over one connection, normally in one round trip
+
+    Tables that do not exist map to None (found with one more query to
+    information_schema). exact=False returns InnoDB's row estimates from
+    information_schema instead: instant, but approximate.
+    """
+    tables = list(tables)
+    if not tables:
+        return {}
+    with engine.connect() as conn:
+        if exact:
+            try:
+                return _union_counts(conn, tables)
+            except exc.ProgrammingError:
+                # A missing table fails the whole UNION
+                conn.rollback()
+        placeholders = ', '.join(['%s'] * len(tables))
+        rows = conn.exec_driver_sql(
+            f"SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+            f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})", tuple(tables)).fetchall()
+        estimates = {name: int(count or 0) for name, count in rows}
+        counts = {table: estimates.get(table) for table in tables}
+        present = [table for table in tables if table in estimates]
+        if exact and present:
+            counts.update(_union_counts(conn, present))
+    return counts
@@ -0,0 +1,130 @@
+"""
+AirPure AQI Analytics - Load Checkpoints and Rejects
+=====================================================
+Per-chunk checkpoints and row rejects used by etl_simple.load_file.
+
+Every committed chunk writes one etl_checkpoint row (source row range,
+rows committed, content checksum) in the same transaction as its data,
+so after an interruption the table resumes right after the last
+checkpoint. Checkpoints are tied to the sha256 of the source file; a
+changed source invalidates them.
+
+Rows that cannot be loaded are written to etl_reject with their source
+position instead of failing the table:
+
+    source_line  malformed CSV line skipped by the parser (1-based)
+    source_row   data row rejected by the database (1-based, header excluded)
+"""
+
+import hashlib
+import json
+
+import pandas as pd
+import pymysql
+from sqlalchemy import exc
+
+from etl_loaders import insert_chunk
+
+# Errors caused by the data itself; anything else (lost connection, missing
+# table) still fails the chunk so it is not mistaken for bad rows
+ROW_ERRORS = (exc.DataError, exc.IntegrityError, pymysql.err.DataError, pymysql.err.IntegrityError)
+
+# =====================================================
+# Checkpoints
+# =====================================================
+
+def chunk_checksum(chunk):
+    """sha256 over the row hashes of a chunk (order sensitive)"""
+    hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+    return hashlib.sha256(hashes.tobytes()).hexdigest()
+
+def resume_point(engine, table_name, source_sha256):
+    """Last committed chunk number and the source row after it
+
+    Checkpoints left by a different version of the source are deleted.
+    """
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "DELETE FROM etl_checkpoint WHERE table_name = %s AND NOT (source_sha256 <=> %s)",
+            (table_name, source_sha256))
+        row = conn.exec_driver_sql(
+            "SELECT COALESCE(MAX(chunk_no), 0), COALESCE(MAX(row_end), 0), "
+            "COALESCE(SUM(rows_committed), 0) FROM etl_checkpoint WHERE table_name = %s",
+            (table_name,)).fetchone()
+    return int(row[0]), int(row[1]), int(row[2])
+
+def write_checkpoint(conn, table_name, chunk_no, source_sha256, row_start, row_end,
+                     rows_committed, rows_rejected, checksum):
+    """Record a committed chunk (call inside the chunk's own transaction)"""
+    conn.exec_driver_sql(
+        "INSERT INTO etl_checkpoint (table_name, chunk_no, source_sha256, row_start, row_end, "
+        "rows_committed, rows_rejected, chunk_checksum) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        (table_name, chunk_no, source_sha256, row_start, row_end,
+         rows_committed, rows_rejected, checksum))
+
+# =====================================================
+# Rejects
+# =====================================================
+
+def _is_row_error(error):
+    """True if an error (or one it was raised from, e.g. by pandas) is a data error"""
+    while error is not None:
+        if isinstance(error, ROW_ERRORS):
+            return True
+        error = error.__cause__
+    return False
+
+def write_rejects(conn, table_name, chunk_no, rejects):
+    """Insert reject records ({source_line|source_row, reason, raw}) for a chunk"""
+    if not rejects:
+        return
+    rows = [(table_name, chunk_no, r.get('source_line'), r.get('source_row'),
+             str(r.get('reason'))[:255], r.get('raw')) for r in rejects]
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(
+            "INSERT INTO etl_reject (table_name, chunk_no, source_line, source_row, reason, raw_record) "
+            "VALUES (%s, %s, %s, %s, %s, %s)", rows)
+    finally:
+        cursor.close()
+
+def parser_rejects(bad_lines):
+    """Reject records for lines the CSV parser skipped"""
+    return [{'source_line': b['line'], 'reason': b['reason'], 'raw': b.get('raw')} for b in bad_lines]
+
+def _row_reject(chunk, position, error):
+    """Reject record for one data row of a chunk (indexed by 0-based source row)"""
+    values = chunk.iloc[position].astype(object)
+    raw = json.dumps({k: (None if pd.isna(v) else str(v)) for k, v in values.items()})
+    while error.__cause__ is not None:
+        error = error.__cause__
+    reason = getattr(error, 'orig', error)
+    return {'source_row': int(chunk.index[position]) + 1, 'reason': reason, 'raw': raw}
+
+def insert_isolating_rejects(conn, backend, table_name, chunk, stats=None):
+    """Insert a chunk; if the database refuses it, bisect down to the bad rows
+
+    The chunk's index must hold 0-based source row numbers. Each attempt runs
+    in a savepoint, so the good rows of a failing chunk are still committed
+    with it. Returns (rows inserted, reject records).
+    """
+    rejects = []
+    inserted = 0
+    pending = [(0, len(chunk))] if len(chunk) else []
+    while pending:
+        start, end = pending.pop()
+        try:
+            with conn.begin_nested():
+                inserted += insert_chunk(conn, backend, table_name, chunk.iloc[start:end], stats)
+        except Exception as e:
+            if not _is_row_error(e):
+                raise
+            if end - start == 1:
+                rejects.append(_row_reject(chunk, start, e))
+                continue
+            middle = (start + end) // 2
+            # Pushed in reverse so the lower half is retried first
+            pending.append((middle, end))
+            pending.append((start, middle))
+    rejects.sort(key=lambda r: r['source_row'])
+    return inserted, rejects
@@ -0,0 +1,132 @@
+"""
+AirPure AQI Analytics - Incremental Load Support
+=================================================
+Source-file manifest and natural-key filtering used by
+etl_simple.py --incremental.
+
+The manifest is a small JSON file recording, per table, the fingerprint
+(size, mtime, sha256) of the source file that was last loaded. Unchanged
+files are skipped; changed files only contribute rows whose natural key
+is not already present in the table.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# =====================================================
+# Source Fingerprints and Manifest
+# =====================================================
+
+def file_fingerprint(file_path, previous=None):
+    """Return size, mtime and sha256 of a file
+
+    If size and mtime match a previous fingerprint the stored hash is reused,
+    so unchanged multi-GB sources are not re-read on every run.
+    """
+    stat = os.stat(file_path)
+    fingerprint = {'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+    if previous and previous.get('size') == fingerprint['size'] and previous.get('mtime') == fingerprint['mtime']:
+        fingerprint['sha256'] = previous.get('sha256')
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def same_content(fingerprint, previous):
+    """True when two fingerprints describe the same file content"""
+    return bool(previous) and previous.get('sha256') == fingerprint.get('sha256')
+
+def appended_content(file_path, previous):
+    """True when a file holds the content of a previous fingerprint with whole lines appended
+
+    Only the first previous['size'] bytes are hashed; they must end with a
+    line break, so no earlier line was extended.
+    """
+    if not previous or not previous.get('sha256') or os.path.getsize(file_path) <= previous['size']:
+        return False
+    digest = hashlib.sha256()
+    remaining = previous['size']
+    last = b''
+    with open(file_path, 'rb') as f:
+        while remaining:
+            block = f.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                return False
+            digest.update(block)
+            remaining -= len(block)
+            last = block[-1:]
+    return last == b'\n' and digest.hexdigest() == previous['sha256']
+
+def load_manifest(manifest_path):
+    """Read the manifest (empty when it does not exist yet)"""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest_path, manifest):
+    """Write the manifest atomically"""
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def record_load(manifest, table_name, file_name, fingerprint, rows_inserted):
+    """Update the manifest entry for a successfully loaded table"""
+    manifest[table_name] = {
+        'file': file_name,
+        'fingerprint': fingerprint,
+        'rows_inserted': rows_inserted,
+        'loaded_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+# =====================================================
+# Natural Keys
+# =====================================================
+
+def _normalize_key_column(series):
+    """Bring a key column to a type-stable form (source and DB values hash alike)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Typed chunks carry state/area/district as categoricals, which cannot take '' for nulls
+        categories = series.cat.categories.dtype
+        series = series.astype('float64' if pd.api.types.is_integer_dtype(categories) else categories)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%Y-%m-%d').fillna('')
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    # DATE columns come back from MySQL as datetime.date objects
+    values = series.map(lambda v: v.isoformat() if hasattr(v, 'isoformat') else v)
+    return values.where(values.notna(), '').astype(str)
+
+def key_hashes(df, key_cols):
+    """64-bit hash per row over the natural-key columns"""
+    keys = pd.DataFrame({col: _normalize_key_column(df[col]) for col in key_cols}, index=df.index)
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def existing_key_hashes(engine, table_name, key_cols):
+    """Hashes of the natural keys already present in a table"""
+    cols = ', '.join(f"`{col}`" for col in key_cols)
+    existing = pd.read_sql(f"SELECT {cols} FROM `{table_name}`", engine)
+    return set(key_hashes(existing, key_cols).tolist())
+
+def filter_new_rows(chunk, key_cols, seen):
+    """Drop rows whose natural key is already loaded; remember the new keys"""
+    hashes = key_hashes(chunk, key_cols).tolist()
+    keep = np.zeros(len(hashes), dtype=bool)
+    for i, h in enumerate(hashes):
+        if h not in seen:
+            seen.add(h)
+            keep[i] = True
+    return chunk[keep]
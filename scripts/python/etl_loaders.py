@@ -0,0 +1,134 @@
+"""
+AirPure AQI Analytics - Bulk Insert Backends
+=============================================
+Pluggable chunk loaders used by etl_simple.load_file.
+
+Each backend takes an open SQLAlchemy connection, a table name and a
+prepared DataFrame chunk, inserts the chunk inside the caller's transaction
+and returns the number of rows written.
+
+    load_data    temp TSV streamed through LOAD DATA LOCAL INFILE
+    executemany  raw pymysql multi-row INSERT
+    to_sql       pandas DataFrame.to_sql (original path, always works)
+"""
+
+import csv
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+DEFAULT_LOADER = 'to_sql'
+
+# =====================================================
+# Helpers
+# =====================================================
+
+def _column_list(chunk):
+    """Backtick-quoted column list for INSERT / LOAD DATA"""
+    return ', '.join(f"`{col}`" for col in chunk.columns)
+
+def _escape_tsv(series):
+    """Escape a text column for MySQL's default LOAD DATA format"""
+    return (series.str.replace('\\', '\\\\', regex=False)
+                  .str.replace('\t', '\\t', regex=False)
+                  .str.replace('\n', '\\n', regex=False)
+                  .str.replace('\r', '\\r', regex=False)
+                  .str.replace('\x00', '\\0', regex=False))
+
+def _to_records(chunk):
+    """Convert a chunk to DB-API parameter tuples (NaN/NaT become NULL)"""
+    out = chunk.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.date
+    out = out.astype(object).where(out.notna(), None)
+    return list(out.itertuples(index=False, name=None))
+
+# =====================================================
+# Backends
+# =====================================================
+
+def load_data_infile(conn, table_name, chunk):
+    """Write the chunk to a temp TSV and bulk load it with LOAD DATA LOCAL INFILE"""
+    out = chunk.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime('%Y-%m-%d')
+        elif not pd.api.types.is_numeric_dtype(out[col]):
+            mask = out[col].notna()
+            out[col] = _escape_tsv(out[col].astype(str)).where(mask, None)
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.tsv', prefix=f'{table_name}_')
+    os.close(fd)
+    try:
+        # Values are already escaped, so the writer must not quote or escape
+        out.to_csv(tmp_path, sep='\t', header=False, index=False, na_rep='\\N',
+                   quoting=csv.QUOTE_NONE, quotechar='\x00', lineterminator='\n',
+                   encoding='utf-8')
+        sql = (f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table_name}` "
+               f"CHARACTER SET utf8mb4 "
+               f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+               f"LINES TERMINATED BY '\\n' ({_column_list(chunk)})")
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(sql, (tmp_path,))
+        finally:
+            cursor.close()
+    finally:
+        os.remove(tmp_path)
+    return len(chunk)
+
+def load_executemany(conn, table_name, chunk):
+    """Insert the chunk with pymysql executemany (batched into multi-row INSERTs)"""
+    placeholders = ', '.join(['%s'] * len(chunk.columns))
+    sql = f"INSERT INTO `{table_name}` ({_column_list(chunk)}) VALUES ({placeholders})"
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(sql, _to_records(chunk))
+    finally:
+        cursor.close()
+    return len(chunk)
+
+def load_to_sql(conn, table_name, chunk):
+    """Insert the chunk with pandas DataFrame.to_sql"""
+    chunk.to_sql(table_name, conn, if_exists='append', index=False)
+    return len(chunk)
+
+LOADERS = {
+    'load_data': load_data_infile,
+    'executemany': load_executemany,
+    'to_sql': load_to_sql,
+}
+
+# =====================================================
+# Throughput Accounting
+# =====================================================
+
+def insert_chunk(conn, backend, table_name, chunk, stats=None):
+    """Insert a chunk with the named backend and record its throughput"""
+    if backend not in LOADERS:
+        raise ValueError(f"Unknown loader backend '{backend}' (choose from {', '.join(LOADERS)})")
+    started = time.perf_counter()
+    rows = LOADERS[backend](conn, table_name, chunk)
+    elapsed = time.perf_counter() - started
+    if stats is not None:
+        entry = stats.setdefault(backend, {'rows': 0, 'seconds': 0.0})
+        entry['rows'] += rows
+        entry['seconds'] += elapsed
+    return rows
+
+def merge_stats(total, other):
+    """Add the per-backend counters of one stats dict into another"""
+    for backend, entry in other.items():
+        agg = total.setdefault(backend, {'rows': 0, 'seconds': 0.0})
+        agg['rows'] += entry['rows']
+        agg['seconds'] += entry['seconds']
+    return total
+
+def print_stats(stats):
+    """Print rows/sec per backend"""
+    for backend, entry in stats.items():
+        rate = entry['rows'] / entry['seconds'] if entry['seconds'] > 0 else 0
+        print(f"  {backend:25} {entry['rows']:>12,} rows  {entry['seconds']:>8.2f}s  {rate:>12,.0f} rows/s")
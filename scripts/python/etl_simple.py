@@ -5,212 +5,436 @@ Loads all source CSV/Excel files directly into MySQL tables.
 No complex transformations - just clean loading for Power BI.
 """
 
-import pandas as pd
-import pymysql
-from sqlalchemy import create_engine
+import argparse
 import os
+import re
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+from aqi_rollup import backfill_rollup, rollup_rows, upsert_rollup
+from db import connect, get_engine
+from etl_checkpoint import (chunk_checksum, insert_isolating_rejects, parser_rejects, resume_point,
+                            write_checkpoint, write_rejects)
+from etl_incremental import (existing_key_hashes, file_fingerprint, filter_new_rows,
+                             load_manifest, record_load, same_content, save_manifest)
+from etl_loaders import DEFAULT_LOADER, LOADERS, merge_stats, print_stats
+from instrumentation import add_arguments, configure_from_args, frame_bytes, recording, stage, timed_iter
+from sources import BASE_PATH, COLUMN_MAPPING, FILES, prepare_chunk, read_chunks
+from staging import iter_table, stage_rejects
 
 # =====================================================
 # Configuration
 # =====================================================
 
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'admin',
-    'database': 'airpure_aqi_db',
-    'port': 3306
-}
-
-BASE_PATH = r'd:\FEB_AQI_P2\AQI_dataset_Original\Dataful_Datasets'
-
-FILES = {
-    'aqi_daily': {
-        'file': 'day-wise-state-wise-air-quality-index-aqi-of-major-cities-and-towns-in-india.csv',
-        'type': 'csv',
-        'encoding': 'utf-8'
-    },
-    'disease_outbreak': {
-        'file': 'master-data-state-district-and-disease-wise-cases-and-death-reported-due-to-outbreak-of-diseases-as-per-weekly-reports-under-idsp.csv',
-        'type': 'csv',
-        'encoding': 'latin-1'
-    },
-    'vehicle_registration': {
-        'file': 'master-data-state-vehicle-class-and-fuel-type-wise-total-number-of-vehicles-registered-in-each-month-in-india.csv',
-        'type': 'csv',
-        'encoding': 'utf-8'
-    },
-    'population': {
-        'file': 'population-projection-of-india-state-and-gender-wise-yearly-projected-urban-population-2011-2036.xlsx',
-        'type': 'excel',
-        'encoding': None
-    }
-}
-
-# Column mapping from source to database
-COLUMN_MAPPING = {
-    'aqi_daily': {
-        'date': 'date',
-        'state': 'state',
-        'area': 'area',
-        'number_of_monitoring_stations': 'monitoring_stations',
-        'prominent_pollutants': 'prominent_pollutants',
-        'aqi_value': 'aqi_value',
-        'air_quality_status': 'air_quality_status',
-        'unit': 'unit',
-        'note': 'note'
-    },
-    'disease_outbreak': {
-        'year': 'year',
-        'week': 'week',
-        'outbreak_starting_date': 'outbreak_date',
-        'reporting_date': 'reporting_date',
-        'state': 'state',
-        'district': 'district',
-        'disease / illness name': 'disease_name',
-        'status': 'status',
-        'cases': 'cases',
-        'deaths': 'deaths',
-        'unit': 'unit',
-        'note': 'note'
-    },
-    'vehicle_registration': {
-        'year': 'year',
-        'month': 'month',
-        'state': 'state',
-        'rto': 'rto',
-        'vehicle_class': 'vehicle_class',
-        'fuel': 'fuel',
-        'value': 'value',
-        'unit': 'unit',
-        'note': 'note'
-    },
-    'population': {
-        'state': 'state',
-        'year': 'year',
-        'month': 'month',
-        'gender': 'gender',
-        'value': 'population_thousands'
-    }
-}
+# Rows per insert batch (and per read in streaming mode)
+CHUNK_SIZE = 5000
+
+# Connections each parallel worker may hold; total is workers x this
+WORKER_POOL_SIZE = 1
+
+# Bulk-load mode commits after roughly this many rows
+BULK_COMMIT_ROWS = 100000
+
+SCHEMA_FILE = r'd:\FEB_AQI_P2\database\schema\database_schema_v2.sql'
+
+# Fingerprints of the source files behind the current database contents
+MANIFEST_PATH = r'd:\FEB_AQI_P2\data\processed\etl_manifest.json'
 
 # =====================================================
 # Helper Functions
 # =====================================================
 
-def execute_schema():
+def strip_comments(sql):
+    """Remove -- comments outside string literals, line by line"""
+    lines = []
+    for line in sql.splitlines():
+        quoted = False
+        for i, char in enumerate(line):
+            if char == "'":
+                quoted = not quoted
+            elif not quoted and line.startswith('--', i):
+                line = line[:i].rstrip()
+                break
+        lines.append(line)
+    return '\n'.join(lines)
+
+def schema_statements(sql):
+    """Split a schema file into executable statements
+
+    Comments are removed before splitting, so a ';' in comment text
+    cannot cut a statement in two.
+    """
+    for statement in strip_comments(sql).split(';'):
+        lines = [line for line in statement.splitlines() if line.strip()]
+        stmt = '\n'.join(lines).strip()
+        if stmt:
+            yield stmt
+
+def make_non_destructive(stmt):
+    """Rewrite a schema statement so it keeps existing data (None to skip it)"""
+    upper = stmt.upper()
+    if upper.startswith('DROP DATABASE'):
+        return None
+    if upper.startswith('CREATE DATABASE') and 'IF NOT EXISTS' not in upper:
+        return 'CREATE DATABASE IF NOT EXISTS' + stmt[len('CREATE DATABASE'):]
+    if upper.startswith('CREATE TABLE') and 'IF NOT EXISTS' not in upper:
+        return 'CREATE TABLE IF NOT EXISTS' + stmt[len('CREATE TABLE'):]
+    return stmt
+
+def split_secondary_indexes(stmt):
+    """Strip non-unique INDEX/KEY clauses from a CREATE TABLE statement
+
+    Returns the reduced statement, the table name and the removed index
+    definitions (None for statements that are not CREATE TABLE).
+    """
+    match = re.match(r'CREATE TABLE\s+(?:IF NOT EXISTS\s+)?`?(\w+)`?', stmt, re.IGNORECASE)
+    if not match:
+        return stmt, None, []
+    kept, indexes = [], []
+    for line in stmt.splitlines():
+        clause = line.strip().rstrip(',')
+        if re.match(r'(INDEX|KEY)\s+\w+\s*\(', clause, re.IGNORECASE):
+            indexes.append(clause)
+        else:
+            kept.append(line)
+    # The column list may now end with a dangling comma
+    reduced = re.sub(r',\s*\)\s*$', '\n)', '\n'.join(kept))
+    return reduced, match.group(1), indexes
+
+def deferred_indexes():
+    """Secondary index definitions per table, as declared in the schema file"""
+    with open(SCHEMA_FILE, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    result = {}
+    for stmt in schema_statements(sql):
+        _, table_name, indexes = split_secondary_indexes(stmt)
+        if indexes:
+            result[table_name] = indexes
+    return result
+
+def execute_schema(incremental=False, bulk=False, schema_file=SCHEMA_FILE, step="[1/5]"):
     """Execute SQL schema file to create database and tables"""
-    print("[1/5] Setting up database schema...")
-    
-    schema_file = r'd:\FEB_AQI_P2\database\schema\database_schema_v2.sql'
+    print(f"{step} Setting up database schema...")
     
     try:
-        conn = pymysql.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            port=DB_CONFIG['port'],
-            autocommit=True
-        )
+        conn = connect(database=False, autocommit=True)
         cursor = conn.cursor()
         
         with open(schema_file, 'r', encoding='utf-8') as f:
             sql = f.read()
         
-        for statement in sql.split(';'):
-            stmt = statement.strip()
-            if stmt and not stmt.startswith('--'):
-                try:
-                    cursor.execute(stmt)
-                except Exception as e:
-                    if 'SELECT' not in stmt.upper():
-                        print(f"  Warning: {e}")
+        for stmt in schema_statements(sql):
+            if incremental:
+                stmt = make_non_destructive(stmt)
+                if stmt is None:
+                    continue
+            if bulk:
+                # Secondary indexes are built once after the load
+                stmt, _, _ = split_secondary_indexes(stmt)
+            try:
+                cursor.execute(stmt)
+            except Exception as e:
+                if 'SELECT' not in stmt.upper():
+                    print(f"  Warning: {e}")
         
         conn.close()
-        print("  [OK] Database and tables created successfully")
+        if incremental:
+            print("  [OK] Existing database kept; missing tables created")
+        elif bulk:
+            print("  [OK] Database and tables created (secondary indexes deferred)")
+        else:
+            print("  [OK] Database and tables created successfully")
         return True
         
     except Exception as e:
         print(f"  [ERROR] Failed to execute schema: {e}")
         return False
 
-def get_engine():
-    """Create SQLAlchemy engine"""
-    connection_string = f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-    return create_engine(connection_string, echo=False)
+def prepared_chunks(table_name, file_info, column_map, streaming, chunk_size, staged,
+                    start_row=0, bad_lines=None):
+    """Yield cleaned chunks, from the Parquet stage or straight from the source file
 
-def load_file(table_name, file_info, engine, column_map):
-    """Load a single file into its corresponding table"""
+    Chunks are indexed by 0-based source row and start at start_row. Malformed
+    lines skipped by the parser are appended to bad_lines as they are found.
+    """
+    if staged:
+        if bad_lines is not None and start_row == 0:
+            bad_lines.extend(stage_rejects(table_name))
+        row = start_row
+        for chunk in timed_iter('etl.read', iter_table(table_name, chunk_size, start_row=start_row),
+                                table=table_name, source='stage'):
+            chunk.index = pd.RangeIndex(row, row + len(chunk))
+            row += len(chunk)
+            yield chunk
+        return
     file_path = os.path.join(BASE_PATH, file_info['file'])
+    row = 0
+    raw_chunks = read_chunks(file_path, file_info, chunk_size, streaming, rejects=bad_lines)
+    for raw_chunk in timed_iter('etl.read', raw_chunks, table=table_name, source='file'):
+        first = row
+        row += len(raw_chunk)
+        if row <= start_row:
+            # Already committed by an earlier run (its bad lines were recorded then)
+            if bad_lines is not None:
+                del bad_lines[:]
+            continue
+        if first < start_row:
+            raw_chunk = raw_chunk.iloc[start_row - first:]
+            first = start_row
+        chunk = prepare_chunk(raw_chunk, table_name, column_map)
+        chunk.index = pd.RangeIndex(first, row)
+        yield chunk
+
+@contextmanager
+def bulk_session(engine):
+    """Connection with unique/foreign-key checks relaxed for a bulk load"""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET SESSION unique_checks = 0")
+        conn.exec_driver_sql("SET SESSION foreign_key_checks = 0")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql("SET SESSION unique_checks = 1")
+            conn.exec_driver_sql("SET SESSION foreign_key_checks = 1")
+
+@contextmanager
+def chunk_transaction(engine, bulk_conn=None):
+    """Per-chunk transaction, or a savepoint inside the bulk-load transaction"""
+    if bulk_conn is None:
+        with engine.begin() as conn:
+            yield conn
+    else:
+        with bulk_conn.begin_nested():
+            yield bulk_conn
+
+def build_indexes(engine, table_name, index_defs):
+    """Create the deferred secondary indexes a table is still missing, in one ALTER TABLE
+
+    Returns the number of indexes built (a resumed bulk load may already have some).
+    """
+    with engine.begin() as conn:
+        existing = {row[2] for row in conn.exec_driver_sql(f"SHOW INDEX FROM `{table_name}`")}
+        missing = [d for d in index_defs if d.split()[1].strip('`') not in existing]
+        if missing:
+            clauses = ', '.join(f"ADD {index_def}" for index_def in missing)
+            conn.exec_driver_sql(f"ALTER TABLE `{table_name}` {clauses}")
+    return len(missing)
+
+def commit_chunk(conn, backend, chunk, parse_rejects, checkpoint, stats=None, rollup_table=None):
+    """Insert a chunk, its rejects, its rollup delta and its checkpoint in the caller's transaction
+
+    checkpoint is (table, chunk_no, source_sha256, row_start, row_end, checksum).
+    Returns the rows inserted and every reject recorded for the chunk.
+    """
+    table_name, chunk_no, source_sha256, row_start, row_end, checksum = checkpoint
+    inserted, row_rejects = insert_isolating_rejects(conn, backend, table_name, chunk, stats)
+    if rollup_table:
+        loaded = chunk.drop(index=[r['source_row'] - 1 for r in row_rejects])
+        upsert_rollup(conn, rollup_table, rollup_rows(loaded))
+    rejects = parse_rejects + row_rejects
+    write_rejects(conn, table_name, chunk_no, rejects)
+    write_checkpoint(conn, table_name, chunk_no, source_sha256, row_start, row_end,
+                     inserted, len(rejects), checksum)
+    return inserted, rejects
+
+def load_file(table_name, file_info, engine, column_map, streaming=False, chunk_size=CHUNK_SIZE,
+              loader=None, stats=None, incremental=False, staged=True, bulk=False, source_sha256=None):
+    """Load a single file into its corresponding table
+
+    Each chunk is committed together with its etl_checkpoint row and any
+    rejects, and the load continues after the last checkpoint of this source.
+    """
+    backend = loader or file_info.get('loader', DEFAULT_LOADER)
+    key_cols = file_info.get('natural_key') if incremental else None
+    rollup_table = file_info.get('rollup')
     
     print(f"\n  Loading: {file_info['file'][:50]}...")
+    print(f"    Loader backend: {backend}")
+    if staged:
+        print(f"    Reading from staging cache in chunks of {chunk_size:,} rows")
+    elif streaming:
+        print(f"    Streaming in chunks of {chunk_size:,} rows")
+    if key_cols:
+        seen_keys = existing_key_hashes(engine, table_name, key_cols)
+        print(f"    Incremental: {len(seen_keys):,} keys already loaded on ({', '.join(key_cols)})")
+        if rollup_table:
+            with engine.begin() as conn:
+                filled = backfill_rollup(conn, rollup_table)
+            if filled:
+                print(f"    Backfilled {rollup_table} from the loaded rows ({filled:,} rollup rows)")
     
-    # Read file
-    try:
-        if file_info['type'] == 'csv':
-            df = pd.read_csv(file_path, encoding=file_info['encoding'])
-        else:
-            df = pd.read_excel(file_path)
-    except UnicodeDecodeError:
-        print(f"    Retrying with latin-1 encoding...")
-        df = pd.read_csv(file_path, encoding='latin-1')
-    
-    print(f"    Source records: {len(df):,}")
-    
-    # Clean column names (lowercase, strip whitespace)
-    df.columns = df.columns.str.strip().str.lower()
-    
-    # Rename columns to match database schema
-    rename_map = {}
-    for src_col, db_col in column_map.items():
-        src_col_clean = src_col.lower().strip()
-        if src_col_clean in df.columns:
-            rename_map[src_col_clean] = db_col
-    
-    df = df.rename(columns=rename_map)
-    
-    # Keep only columns that exist in mapping
-    valid_cols = [col for col in column_map.values() if col in df.columns]
-    df = df[valid_cols]
+    last_chunk, start_row, committed = resume_point(engine, table_name, source_sha256)
+    if last_chunk:
+        print(f"    Resuming after chunk {last_chunk} (source row {start_row:,}, "
+              f"{committed:,} rows already committed)")
     
-    # Parse dates for AQI data
-    if table_name == 'aqi_daily' and 'date' in df.columns:
-        df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y', errors='coerce')
+    if bulk:
+        print(f"    Bulk mode: checks relaxed, commit every {BULK_COMMIT_ROWS:,} rows")
     
-    # Parse dates for disease data
-    if table_name == 'disease_outbreak':
-        if 'outbreak_date' in df.columns:
-            df['outbreak_date'] = pd.to_datetime(df['outbreak_date'], format='%d-%m-%Y', errors='coerce')
-        if 'reporting_date' in df.columns:
-            df['reporting_date'] = pd.to_datetime(df['reporting_date'], format='%d-%m-%Y', errors='coerce')
+    total = 0
+    rejected = 0
+    started = time.perf_counter()
+    chunk_start = started
+    bad_lines = []
     
-    # Load to database in chunks
-    chunk_size = 5000
-    total_chunks = (len(df) // chunk_size) + 1
+    with (bulk_session(engine) if bulk else nullcontext()) as bulk_conn:
+        uncommitted = 0
+        chunks = prepared_chunks(table_name, file_info, column_map, streaming, chunk_size, staged,
+                                 start_row=start_row, bad_lines=bad_lines)
+        for chunk_no, chunk in enumerate(chunks, last_chunk + 1):
+            row_start, row_end = chunk.index[0], chunk.index[-1] + 1
+            checksum = chunk_checksum(chunk)
+            if key_cols:
+                chunk = filter_new_rows(chunk, key_cols, seen_keys)
+            checkpoint = (table_name, chunk_no, source_sha256, int(row_start), int(row_end), checksum)
+            rejects = parser_rejects(bad_lines)
+            del bad_lines[:]
+            with stage('etl.insert', table=table_name, chunk=chunk_no, backend=backend) as record:
+                if recording():
+                    record['bytes'] = frame_bytes(chunk)
+                try:
+                    with chunk_transaction(engine, bulk_conn) as conn:
+                        inserted, rejects = commit_chunk(conn, backend, chunk, rejects, checkpoint, stats,
+                                                         rollup_table)
+                except Exception as e:
+                    if backend == DEFAULT_LOADER:
+                        raise
+                    # The failed chunk was rolled back; finish the table on the fallback path
+                    print(f"\n    [WARN] {backend} loader failed ({e}); falling back to {DEFAULT_LOADER}")
+                    backend = record['backend'] = DEFAULT_LOADER
+                    with chunk_transaction(engine, bulk_conn) as conn:
+                        inserted, rejects = commit_chunk(conn, backend, chunk, rejects, checkpoint, stats,
+                                                         rollup_table)
+                record.update(rows=inserted, rejects=len(rejects))
+            total += inserted
+            rejected += len(rejects)
+            if bulk_conn is not None:
+                uncommitted += len(chunk)
+                if uncommitted >= BULK_COMMIT_ROWS:
+                    bulk_conn.commit()
+                    uncommitted = 0
+            elapsed = time.perf_counter() - chunk_start
+            rate = len(chunk) / elapsed if elapsed > 0 else 0
+            print(f"    Chunk {chunk_no} loaded ({inserted:,} records, {rate:,.0f} rows/s, {total:,} total)", end='\r')
+            chunk_start = time.perf_counter()
+        if bulk_conn is not None:
+            bulk_conn.commit()
     
-    for i in range(0, len(df), chunk_size):
-        chunk = df.iloc[i:i+chunk_size]
-        chunk.to_sql(table_name, engine, if_exists='append', index=False)
-        current_chunk = (i // chunk_size) + 1
-        print(f"    Chunk {current_chunk}/{total_chunks} loaded ({len(chunk):,} records)", end='\r')
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"    [OK] Loaded {total:,} records to {table_name} ({rate:,.0f} rows/s)                    ")
+    if rejected:
+        print(f"    [WARN] {rejected:,} rows rejected (see etl_reject)")
+    return total
+
+def run_table(table_name, engine, options, stats, phases):
+    """Load one table (and build its deferred indexes in bulk mode), timing each phase"""
+    options = dict(options)
+    fingerprint = options.pop('fingerprints', {}).get(table_name) or {}
+    started = time.perf_counter()
+    with stage('etl.table', table=table_name, bytes=fingerprint.get('size')) as record:
+        count = load_file(table_name, FILES[table_name], engine, COLUMN_MAPPING[table_name],
+                          stats=stats, source_sha256=fingerprint.get('sha256'), **options)
+        record['rows'] = count
+    phases.append((f"load {table_name}", time.perf_counter() - started))
     
-    print(f"    [OK] Loaded {len(df):,} records to {table_name}                    ")
-    return len(df)
+    index_defs = deferred_indexes().get(table_name) if options.get('bulk') else None
+    if index_defs:
+        print(f"    Building indexes on {table_name}...")
+        started = time.perf_counter()
+        with stage('etl.index', table=table_name):
+            built = build_indexes(engine, table_name, index_defs)
+        print(f"    [OK] {built} of {len(index_defs)} indexes built")
+        phases.append((f"index {table_name}", time.perf_counter() - started))
+    return count
+
+def load_table(table_name, options):
+    """Load one table in its own process with a small bounded pool (parallel mode)"""
+    stats = {}
+    phases = []
+    engine = get_engine(pool_size=WORKER_POOL_SIZE, max_overflow=0)
+    try:
+        count = run_table(table_name, engine, options, stats, phases)
+        return table_name, count, stats, phases
+    except Exception as e:
+        print(f"  [ERROR] Failed to load {table_name}: {e}")
+        return table_name, f"ERROR: {e}", stats, phases
+    finally:
+        engine.dispose()
+
+def load_tables_parallel(tables, options, workers):
+    """Load the given FILES entries concurrently, one worker process per table"""
+    results = {}
+    loader_stats = {}
+    phases = []
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(tables)))) as pool:
+        futures = {pool.submit(load_table, table_name, options): table_name for table_name in tables}
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                _, count, stats, table_phases = future.result()
+            except Exception as e:
+                # Worker process died (e.g. out of memory); other tables still report
+                print(f"  [ERROR] Worker for {table_name} failed: {e}")
+                results[table_name] = f"ERROR: {e}"
+                continue
+            results[table_name] = count
+            merge_stats(loader_stats, stats)
+            phases.extend(table_phases)
+    # Report in FILES order regardless of completion order
+    return {t: results[t] for t in FILES if t in results}, loader_stats, phases
 
 # =====================================================
 # Main Execution
 # =====================================================
 
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Load AQI source files into MySQL")
+    parser.add_argument('--raw', action='store_true',
+                        help="read source files directly instead of the Parquet staging cache")
+    parser.add_argument('--stream', action='store_true',
+                        help="with --raw, read, clean and insert CSV sources chunk by chunk (bounded memory)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"rows per chunk (default {CHUNK_SIZE})")
+    parser.add_argument('--loader', choices=list(LOADERS),
+                        help="override the per-table loader backend from FILES")
+    parser.add_argument('--parallel', type=int, default=0, metavar='WORKERS',
+                        help="load tables concurrently in up to WORKERS processes")
+    parser.add_argument('--incremental', action='store_true',
+                        help="keep the database, skip unchanged source files and insert only new natural keys")
+    parser.add_argument('--bulk', action='store_true',
+                        help="full reload with secondary indexes deferred and checks relaxed (reports phase timings)")
+    parser.add_argument('--resume', action='store_true',
+                        help="keep the database and continue each table after its last committed chunk")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.bulk and args.incremental:
+        parser.error("--bulk is a full-reload mode and cannot be combined with --incremental")
+    return args
+
 def main():
+    args = parse_args()
+    configure_from_args(args)
+    
     print("=" * 60)
     print("AirPure AQI Analytics - ETL Process")
     print("=" * 60)
     
     # Step 1: Create database schema
-    if not execute_schema():
+    phases = []
+    phase_start = time.perf_counter()
+    with stage('etl.schema'):
+        schema_ok = execute_schema(incremental=args.incremental or args.resume, bulk=args.bulk)
+    if not schema_ok:
         print("\n[FAILED] Could not create database. Exiting.")
         sys.exit(1)
+    phases.append(("schema", time.perf_counter() - phase_start))
     
     # Step 2: Connect to database
     print("\n[2/5] Connecting to database...")
@@ -221,25 +445,56 @@ def main():
         print(f"  [ERROR] Connection failed: {e}")
         sys.exit(1)
     
+    # Fingerprint sources; in incremental mode unchanged files are skipped
+    manifest = load_manifest(MANIFEST_PATH)
+    fingerprints = {}
+    skipped = {}
+    for table_name, file_info in FILES.items():
+        try:
+            previous = manifest.get(table_name, {}).get('fingerprint')
+            fingerprints[table_name] = file_fingerprint(os.path.join(BASE_PATH, file_info['file']), previous)
+        except OSError:
+            continue  # load_file reports the missing file
+        if args.incremental and same_content(fingerprints[table_name], previous):
+            skipped[table_name] = f"SKIPPED (unchanged since {manifest[table_name]['loaded_at']})"
+    tables = [t for t in FILES if t not in skipped]
+    
     # Step 3-6: Load each file
+    options = {'streaming': args.stream, 'chunk_size': args.chunk_size, 'loader': args.loader,
+               'incremental': args.incremental, 'staged': not args.raw, 'bulk': args.bulk,
+               'fingerprints': fingerprints}
     results = {}
+    loader_stats = {}
     step = 2
+    started = time.perf_counter()
     
-    for table_name, file_info in FILES.items():
-        step += 1
-        print(f"\n[{step}/5] Processing {table_name}...")
-        try:
-            count = load_file(table_name, file_info, engine, COLUMN_MAPPING[table_name])
-            results[table_name] = count
-        except Exception as e:
-            print(f"  [ERROR] Failed to load {table_name}: {e}")
-            results[table_name] = f"ERROR: {e}"
+    if args.parallel > 1:
+        print(f"\n[3/5] Processing {len(tables)} tables in parallel ({args.parallel} workers)...")
+        results, loader_stats, table_phases = load_tables_parallel(tables, options, args.parallel)
+        phases.extend(table_phases)
+    else:
+        for table_name in tables:
+            step += 1
+            print(f"\n[{step}/5] Processing {table_name}...")
+            try:
+                count = run_table(table_name, engine, options, loader_stats, phases)
+                results[table_name] = count
+            except Exception as e:
+                print(f"  [ERROR] Failed to load {table_name}: {e}")
+                results[table_name] = f"ERROR: {e}"
+    
+    # Record what was loaded so the next incremental run can skip it
+    for table_name, count in results.items():
+        if isinstance(count, int) and table_name in fingerprints:
+            record_load(manifest, table_name, FILES[table_name]['file'], fingerprints[table_name], count)
+    save_manifest(MANIFEST_PATH, manifest)
     
     # Summary
     print("\n" + "=" * 60)
     print("ETL COMPLETE - Summary")
     print("=" * 60)
     
+    results = {t: skipped.get(t, results.get(t)) for t in FILES if t in skipped or t in results}
     for table, count in results.items():
         if isinstance(count, int):
             print(f"  {table:25} {count:>12,} records")
@@ -247,6 +502,16 @@ def main():
             print(f"  {table:25} {count}")
     
     print("=" * 60)
+    print(f"  Load time: {time.perf_counter() - started:.1f}s")
+    
+    if loader_stats:
+        print("\nLoader throughput:")
+        print_stats(loader_stats)
+    
+    print("\nPhase timings:")
+    for phase, seconds in phases:
+        print(f"  {phase:35} {seconds:>8.2f}s")
+    
     print("\nNext step: Run verify_counts.py to validate data integrity")
     
     engine.dispose()
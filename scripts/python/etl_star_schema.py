@@ -0,0 +1,348 @@
+"""
+AirPure AQI Analytics - Star Schema ETL
+========================================
+Loads the dimensional model in database/schema/database_schema.sql
+(dim_state, dim_city, dim_date, dim_population, fact_*) used by the
+analytical views in database/queries/create_analytical_views.sql.
+
+Dimensions are written with idempotent upserts, so re-running never fails
+on an existing dim_date / dim_state row. Surrogate keys are then cached in
+memory and every fact chunk resolves its foreign keys with vectorized
+lookups instead of per-row round trips. Facts are reloaded on each run,
+together with the fact_aqi_monthly rollup and the aqi_pollutant bridge.
+Finally the mv_* tables behind the views are refreshed where their
+sources changed (see materialized_views.py).
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from aqi_rollup import rollup_rows, upsert_rollup
+from etl_loaders import DEFAULT_LOADER, insert_chunk, print_stats
+from db import get_engine
+from etl_simple import CHUNK_SIZE, execute_schema
+from sources import FILES
+from staging import iter_table, read_table
+
+# =====================================================
+# Configuration
+# =====================================================
+
+STAR_SCHEMA_FILE = r'd:\FEB_AQI_P2\database\schema\database_schema.sql'
+
+STATE_REGIONS = {
+    'North': ['Delhi', 'Haryana', 'Punjab', 'Himachal Pradesh', 'Jammu and Kashmir', 'Ladakh',
+              'Chandigarh', 'Uttarakhand', 'Uttar Pradesh', 'Rajasthan'],
+    'South': ['Karnataka', 'Tamil Nadu', 'Kerala', 'Andhra Pradesh', 'Telangana', 'Puducherry',
+              'Lakshadweep', 'Andaman and Nicobar Islands'],
+    'East': ['West Bengal', 'Odisha', 'Bihar', 'Jharkhand'],
+    'West': ['Maharashtra', 'Gujarat', 'Goa', 'Dadra and Nagar Haveli and Daman and Diu'],
+    'Central': ['Madhya Pradesh', 'Chhattisgarh'],
+    'Northeast': ['Assam', 'Arunachal Pradesh', 'Manipur', 'Meghalaya', 'Mizoram', 'Nagaland',
+                  'Sikkim', 'Tripura'],
+}
+
+METRO_CITIES = ['Delhi', 'Mumbai', 'Chennai', 'Kolkata', 'Bengaluru', 'Bangalore',
+                'Hyderabad', 'Ahmedabad', 'Pune']
+
+TIER_2_CITIES = ['Jaipur', 'Lucknow', 'Kanpur', 'Nagpur', 'Indore', 'Bhopal', 'Patna', 'Surat',
+                 'Vadodara', 'Coimbatore', 'Kochi', 'Visakhapatnam', 'Chandigarh', 'Ludhiana',
+                 'Agra', 'Varanasi', 'Madurai', 'Nashik', 'Thiruvananthapuram', 'Guwahati',
+                 'Bhubaneswar', 'Raipur', 'Ranchi', 'Amritsar', 'Mysuru', 'Noida', 'Gurugram',
+                 'Ghaziabad', 'Faridabad', 'Howrah', 'Vijayawada', 'Jodhpur', 'Dehradun']
+
+# fact table -> (source table, source-to-fact column renames)
+FACTS = {
+    'fact_aqi_daily': ('aqi_daily', {
+        'date': 'date_value',
+        'state': 'state_name',
+        'area': 'city_name',
+        'monitoring_stations': 'number_of_monitoring_stations',
+    }),
+    'fact_disease_outbreak': ('disease_outbreak', {
+        'outbreak_date': 'outbreak_starting_date',
+        'state': 'state_name',
+        'disease_name': 'disease_illness_name',
+    }),
+    'fact_vehicle_registration': ('vehicle_registration', {
+        'state': 'state_name',
+    }),
+}
+
+# fact table -> monthly rollup maintained alongside it
+FACT_ROLLUPS = {
+    'fact_aqi_daily': 'fact_aqi_monthly',
+}
+STAR_ROLLUP_KEYS = ['state_name', 'city_name', 'year', 'month']
+
+# fact table -> pollutant bridge filled from its pollutant_mask
+FACT_BRIDGES = {
+    'fact_aqi_daily': 'aqi_pollutant',
+}
+
+# =====================================================
+# Helper Functions
+# =====================================================
+
+def region_of(state_name):
+    """Region for a state name (None if unknown)"""
+    for region, states in STATE_REGIONS.items():
+        if state_name in states:
+            return region
+    return None
+
+def city_tier(city_name):
+    """Tier classification used by the risk and demand views"""
+    if city_name in METRO_CITIES:
+        return 'Tier 1'
+    if city_name in TIER_2_CITIES:
+        return 'Tier 2'
+    return 'Tier 3'
+
+def upsert(conn, table_name, rows, columns, update_columns):
+    """Idempotent multi-row INSERT ... ON DUPLICATE KEY UPDATE"""
+    if not rows:
+        return
+    col_list = ', '.join(f"`{col}`" for col in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    if update_columns:
+        updates = ', '.join(f"`{col}` = VALUES(`{col}`)" for col in update_columns)
+    else:
+        # Nothing to refresh; a no-op assignment keeps the statement idempotent
+        updates = f"`{columns[0]}` = `{columns[0]}`"
+    sql = (f"INSERT INTO `{table_name}` ({col_list}) VALUES ({placeholders}) "
+           f"ON DUPLICATE KEY UPDATE {updates}")
+    cursor = conn.connection.cursor()
+    try:
+        cursor.executemany(sql, rows)
+    finally:
+        cursor.close()
+
+def distinct_values(table_name, columns):
+    """Distinct non-null combinations of columns, read column-wise from the stage"""
+    df = read_table(table_name, columns=columns).dropna().drop_duplicates()
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+# =====================================================
+# Dimensions
+# =====================================================
+
+def load_dim_state(conn):
+    """Upsert every state seen in any source; return an index of state names and matching ids"""
+    states = set()
+    for table_name in FILES:
+        states.update(distinct_values(table_name, ['state'])['state'])
+    rows = [(state, region_of(state)) for state in sorted(states)]
+    upsert(conn, 'dim_state', rows, ['state_name', 'region'], ['region'])
+    result = conn.exec_driver_sql("SELECT state_name, state_id FROM dim_state")
+    states = pd.DataFrame(result.fetchall(), columns=['state_name', 'state_id'])
+    return pd.Index(states['state_name']), states['state_id'].to_numpy()
+
+def load_dim_city(conn, state_ids):
+    """Upsert AQI areas; return a MultiIndex of (city_name, state_id) and matching ids"""
+    areas = distinct_values('aqi_daily', ['area', 'state'])
+    rows = [(area, state_ids[state], city_tier(area), area in METRO_CITIES)
+            for area, state in areas.itertuples(index=False) if state in state_ids]
+    upsert(conn, 'dim_city', rows, ['city_name', 'state_id', 'city_tier', 'is_metro'],
+           ['city_tier', 'is_metro'])
+    result = conn.exec_driver_sql("SELECT city_name, state_id, city_id FROM dim_city")
+    cities = pd.DataFrame(result.fetchall(), columns=['city_name', 'state_id', 'city_id'])
+    index = pd.MultiIndex.from_frame(cities[['city_name', 'state_id']])
+    return index, cities['city_id'].to_numpy()
+
+def load_dim_date(conn):
+    """Insert the calendar covering the AQI dates; return an index of dates and matching ids"""
+    dates = read_table('aqi_daily', columns=['date'])['date'].dropna()
+    if dates.empty:
+        return pd.DatetimeIndex([]), np.array([], dtype='int64')
+    calendar = pd.DataFrame({'date_value': pd.date_range(dates.min(), dates.max(), freq='D')})
+    d = calendar['date_value'].dt
+    calendar['year'] = d.year
+    calendar['quarter'] = d.quarter
+    calendar['month'] = d.month
+    calendar['month_name'] = d.month_name()
+    calendar['week'] = d.isocalendar().week.astype(int)
+    calendar['day_of_month'] = d.day
+    calendar['day_of_week'] = d.dayofweek + 1
+    calendar['day_name'] = d.day_name()
+    calendar['is_weekend'] = d.dayofweek >= 5
+    rows = list(calendar.assign(date_value=d.date).astype(object).itertuples(index=False, name=None))
+    # dim_date rows never change for a given date, so existing ones are left alone
+    upsert(conn, 'dim_date', rows, list(calendar.columns), [])
+    result = conn.exec_driver_sql("SELECT date_value, date_id FROM dim_date")
+    calendar_ids = pd.DataFrame(result.fetchall(), columns=['date_value', 'date_id'])
+    return pd.DatetimeIndex(calendar_ids['date_value']), calendar_ids['date_id'].to_numpy()
+
+def load_dim_population(conn, state_ids):
+    """Upsert population projections keyed by (state, year, month, gender)"""
+    population = read_table('population')
+    population['state_id'] = population['state'].astype(object).map(state_ids)
+    population = population.dropna(subset=['state_id'])
+    columns = ['state_id', 'year', 'month', 'gender', 'population_thousands']
+    frame = population[columns].astype(object)
+    rows = list(frame.where(frame.notna(), None).itertuples(index=False, name=None))
+    upsert(conn, 'dim_population', rows, columns, ['population_thousands'])
+    return len(rows)
+
+# =====================================================
+# Facts
+# =====================================================
+
+def _lookup(index, ids, values):
+    """Vectorized key lookup: ids at each value's position in index (NA when absent)"""
+    positions = index.get_indexer(values)
+    result = pd.array(ids[positions], dtype='Int64')
+    result[positions < 0] = pd.NA
+    return result
+
+def resolve_keys(chunk, keys):
+    """Attach surrogate keys to a fact chunk with vectorized lookups"""
+    if 'state_name' in chunk.columns:
+        chunk['state_id'] = _lookup(keys['state_index'], keys['state_ids'],
+                                    chunk['state_name'].astype(object))
+    if 'city_name' in chunk.columns:
+        cities = pd.MultiIndex.from_arrays([chunk['city_name'].astype(object), chunk['state_id']])
+        chunk['city_id'] = _lookup(keys['city_index'], keys['city_ids'], cities)
+    if 'date_value' in chunk.columns:
+        chunk['date_id'] = _lookup(keys['date_index'], keys['date_ids'], chunk['date_value'])
+    return chunk
+
+def fill_pollutant_bridge(conn, bridge_table, fact_table, after_id):
+    """Expand the pollutant_mask of fact rows with aqi_id > after_id into bridge rows
+
+    Set-based inside MySQL: each fact row joins the dim_pollutant rows whose
+    bit is set in its mask.
+    """
+    result = conn.exec_driver_sql(
+        f"INSERT INTO `{bridge_table}` (aqi_id, pollutant_id) "
+        f"SELECT f.aqi_id, p.pollutant_id FROM `{fact_table}` f "
+        f"JOIN dim_pollutant p ON f.pollutant_mask & (1 << p.bit_position) "
+        f"WHERE f.aqi_id > %s",
+        (after_id,))
+    return result.rowcount
+
+def load_fact(engine, fact_table, keys, chunk_size, stats):
+    """Reload one fact table from its staged source"""
+    source_table, renames = FACTS[fact_table]
+    backend = FILES[source_table].get('loader', DEFAULT_LOADER)
+    rollup_table = FACT_ROLLUPS.get(fact_table)
+    bridge_table = FACT_BRIDGES.get(fact_table)
+    with engine.begin() as conn:
+        if bridge_table:
+            conn.exec_driver_sql(f"DELETE FROM `{bridge_table}`")
+        conn.exec_driver_sql(f"DELETE FROM `{fact_table}`")
+        if rollup_table:
+            conn.exec_driver_sql(f"DELETE FROM `{rollup_table}`")
+
+    total = 0
+    started = time.perf_counter()
+    for chunk_no, chunk in enumerate(iter_table(source_table, chunk_size), 1):
+        chunk = resolve_keys(chunk.rename(columns=renames), keys)
+        with engine.begin() as conn:
+            if bridge_table:
+                last_id = conn.exec_driver_sql(f"SELECT COALESCE(MAX(aqi_id), 0) FROM `{fact_table}`").scalar()
+            insert_chunk(conn, backend, fact_table, chunk, stats)
+            if bridge_table:
+                fill_pollutant_bridge(conn, bridge_table, fact_table, last_id)
+            if rollup_table:
+                # Merged in the same transaction so the rollup never drifts from the facts
+                rollup = rollup_rows(chunk, key_cols=('state_name', 'city_name'), date_col='date_value',
+                                     attribute_cols=('state_id', 'city_id'))
+                upsert_rollup(conn, rollup_table, rollup, key_cols=STAR_ROLLUP_KEYS)
+        total += len(chunk)
+        print(f"    Chunk {chunk_no} loaded ({total:,} total)", end='\r')
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"    [OK] Loaded {total:,} records to {fact_table} ({rate:,.0f} rows/s)          ")
+    return total
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Load the AQI star schema")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="drop and recreate the database from the schema file first")
+    parser.add_argument('--skip-views', action='store_true',
+                        help="do not refresh the materialized mv_* tables after loading")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"rows per fact chunk (default {CHUNK_SIZE})")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Star Schema ETL")
+    print("=" * 60)
+
+    if not execute_schema(incremental=not args.rebuild, schema_file=STAR_SCHEMA_FILE, step="[1/4]"):
+        print("\n[FAILED] Could not create database. Exiting.")
+        sys.exit(1)
+
+    engine = get_engine()
+    results = {}
+    stats = {}
+
+    print("\n[2/4] Loading dimensions...")
+    with engine.begin() as conn:
+        state_index, state_ids = load_dim_state(conn)
+        state_map = dict(zip(state_index, state_ids))
+        print(f"  [OK] dim_state      {len(state_ids):>10,} keys")
+        city_index, city_ids = load_dim_city(conn, state_map)
+        print(f"  [OK] dim_city       {len(city_ids):>10,} keys")
+        date_index, date_ids = load_dim_date(conn)
+        print(f"  [OK] dim_date       {len(date_ids):>10,} keys")
+        population_rows = load_dim_population(conn, state_map)
+        print(f"  [OK] dim_population {population_rows:>10,} rows")
+    keys = {
+        'state_index': state_index, 'state_ids': state_ids,
+        'city_index': city_index, 'city_ids': city_ids,
+        'date_index': date_index, 'date_ids': date_ids,
+    }
+
+    print("\n[3/4] Loading facts...")
+    for fact_table in FACTS:
+        print(f"\n  {fact_table}")
+        try:
+            results[fact_table] = load_fact(engine, fact_table, keys, args.chunk_size, stats)
+        except Exception as e:
+            print(f"  [ERROR] Failed to load {fact_table}: {e}")
+            results[fact_table] = f"ERROR: {e}"
+
+    if args.skip_views:
+        print("\n[4/4] Materialized views skipped (--skip-views)")
+    else:
+        print("\n[4/4] Refreshing materialized views...")
+        from materialized_views import print_results, refresh_views
+        try:
+            print_results(refresh_views(engine))
+        except Exception as e:
+            print(f"  [ERROR] Failed to refresh materialized views: {e}")
+
+    print("\n" + "=" * 60)
+    print("STAR SCHEMA ETL COMPLETE - Summary")
+    print("=" * 60)
+    for table, count in results.items():
+        if isinstance(count, int):
+            print(f"  {table:30} {count:>12,} records")
+        else:
+            print(f"  {table:30} {count}")
+    print("=" * 60)
+    if stats:
+        print("\nLoader throughput:")
+        print_stats(stats)
+
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
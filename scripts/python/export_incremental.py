@@ -0,0 +1,204 @@
+"""
+AirPure AQI Analytics - Incremental Power BI Export
+====================================================
+Export mode for export_to_csv.py --incremental: instead of rewriting every
+table on each run, rows are written into one file per year/month partition
+and only partitions that received new rows are written again.
+
+    <output>/<table>/<table>_<YYYY>-<MM>.csv     (or .csv.gz / .csv.zst / .parquet)
+    <output>/<table>/<table>_undated.csv         rows without a partition date
+    <output>/export_manifest.json                partitions, rows and high-water marks
+
+The high-water mark of a table is the largest AUTO_INCREMENT id exported.
+A run asks MySQL, in one grouped query, which partitions hold rows above
+it; each of those partitions is re-read whole (including rows exported
+before) and replaced atomically, so late corrections landing in an old
+month rewrite just that month. If rows at or below the mark disappeared
+(e.g. a full ETL reload with different data) or the export format or
+columns changed, the table is re-exported in full and files of partitions
+that no longer exist are removed.
+
+The manifest is written after the files, so an interrupted run simply
+repeats the same partitions next time. Power BI incremental refresh can
+use each partition's written_at to pick up only what changed.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import pyarrow as pa
+
+from etl_incremental import load_manifest, save_manifest
+from export_to_csv import BATCH_SIZE, export_columns, output_name, stream_batches, write_batches
+from instrumentation import stage
+
+# =====================================================
+# Configuration
+# =====================================================
+
+MANIFEST_NAME = 'export_manifest.json'
+
+WATERMARK_COLUMN = 'id'
+
+# How each table is partitioned: ('date', column) or ('year_month', (year column, month column))
+PARTITIONS = {
+    'aqi_daily': ('date', 'date'),
+    'disease_outbreak': ('date', 'outbreak_date'),
+    'vehicle_registration': ('year_month', ('year', 'month')),
+    'population': ('year_month', ('year', 'month')),
+}
+
+UNDATED = 'undated'
+
+# =====================================================
+# Partitions
+# =====================================================
+
+def _partition_exprs(table_name):
+    """SQL expressions giving a row's partition year and month"""
+    kind, columns = PARTITIONS[table_name]
+    if kind == 'date':
+        return f"YEAR(`{columns}`)", f"MONTH(`{columns}`)"
+    return f"`{columns[0]}`", f"`{columns[1]}`"
+
+def partition_key(year, month):
+    """'YYYY-MM' (or 'undated' when the row has no date)"""
+    if year is None or month is None:
+        return UNDATED
+    return f"{int(year):04d}-{int(month):02d}"
+
+def partition_filter(table_name, key):
+    """(SQL condition, params) selecting every row of one partition
+
+    Date-partitioned tables use a half-open date range so the date index
+    can be used.
+    """
+    kind, columns = PARTITIONS[table_name]
+    if kind == 'date':
+        if key == UNDATED:
+            return f"`{columns}` IS NULL", ()
+        year, month = map(int, key.split('-'))
+        end = date(year + month // 12, month % 12 + 1, 1)
+        return f"`{columns}` >= %s AND `{columns}` < %s", (date(year, month, 1), end)
+    year_col, month_col = columns
+    if key == UNDATED:
+        return f"(`{year_col}` IS NULL OR `{month_col}` IS NULL)", ()
+    year, month = map(int, key.split('-'))
+    return f"`{year_col}` = %s AND `{month_col}` = %s", (year, month)
+
+def changed_partitions(engine, table_name, after_id=0):
+    """{partition key: rows} for partitions holding rows with id > after_id, in one query"""
+    year_expr, month_expr = _partition_exprs(table_name)
+    sql = (f"SELECT {year_expr} AS y, {month_expr} AS m, COUNT(*) FROM `{table_name}` "
+           f"WHERE `{WATERMARK_COLUMN}` > %s GROUP BY y, m")
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(sql, (after_id,)).fetchall()
+    changed = {}
+    for year, month, count in rows:
+        key = partition_key(year, month)
+        changed[key] = changed.get(key, 0) + count
+    return changed
+
+def table_watermark(engine, table_name, exported_high_water=0):
+    """(max id, rows with id <= the exported high-water mark)"""
+    sql = (f"SELECT MAX(`{WATERMARK_COLUMN}`), "
+           f"SUM(CASE WHEN `{WATERMARK_COLUMN}` <= %s THEN 1 ELSE 0 END) FROM `{table_name}`")
+    with engine.connect() as conn:
+        high_water, kept = conn.exec_driver_sql(sql, (exported_high_water,)).fetchone()
+    return int(high_water or 0), int(kept or 0)
+
+def partition_file(table_name, key, fmt, compression):
+    """Path of a partition file relative to the output directory"""
+    name = output_name(f"{table_name}_{key}", fmt, compression)
+    return os.path.join(table_name, name)
+
+# =====================================================
+# Export
+# =====================================================
+
+def export_table_incremental(engine, table_name, output_dir, entry=None, fmt='csv', compression='none',
+                             columns=None, exclude=(), batch_size=BATCH_SIZE, full=False):
+    """Bring one table's partition files up to date
+
+    entry is the table's previous manifest entry. Returns (partitions
+    written, rows written, new manifest entry).
+    """
+    fields = export_columns(engine, table_name, columns, exclude)
+    schema = pa.schema(fields)
+    entry = entry or {}
+    layout = {'format': fmt, 'compression': compression, 'columns': schema.names}
+
+    high_water, kept = table_watermark(engine, table_name, entry.get('high_water', 0))
+    rebuild = (full or not entry or entry.get('layout') != layout
+               or kept != entry.get('rows', 0) or high_water < entry.get('high_water', 0))
+    after_id = 0 if rebuild else entry['high_water']
+    changed = changed_partitions(engine, table_name, after_id)
+
+    partitions = {} if rebuild else dict(entry.get('partitions', {}))
+    written_rows = 0
+    os.makedirs(os.path.join(output_dir, table_name), exist_ok=True)
+    for key in sorted(changed):
+        where, params = partition_filter(table_name, key)
+        # Rows inserted while this run is going wait for the next run
+        where, params = f"({where}) AND `{WATERMARK_COLUMN}` <= %s", params + (high_water,)
+        relative = partition_file(table_name, key, fmt, compression)
+        with stage('export.partition', table=table_name, partition=key) as record:
+            rows = write_batches(stream_batches(engine, table_name, schema.names, batch_size,
+                                                where=where, params=params, order_by=f"`{WATERMARK_COLUMN}`"),
+                                 os.path.join(output_dir, relative), schema, fmt, compression)
+            record['rows'] = rows
+        partitions[key] = {'file': relative, 'rows': rows,
+                           'written_at': datetime.now().isoformat(timespec='seconds')}
+        written_rows += rows
+
+    if rebuild:
+        # Files of partitions that no longer exist (or of an earlier layout)
+        current = {os.path.normpath(p['file']) for p in partitions.values()}
+        for old in (entry.get('partitions') or {}).values():
+            if os.path.normpath(old['file']) not in current:
+                try:
+                    os.remove(os.path.join(output_dir, old['file']))
+                except OSError:
+                    pass
+
+    new_entry = {
+        'watermark_column': WATERMARK_COLUMN,
+        'high_water': high_water,
+        'rows': sum(p['rows'] for p in partitions.values()),
+        'layout': layout,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'full_rebuild': rebuild,
+        'partitions': dict(sorted(partitions.items())),
+    }
+    return len(changed), written_rows, new_entry
+
+def export_incremental(engine, tables, output_dir, workers=1, columns=None, full=False, **options):
+    """Incrementally export tables concurrently
+
+    Returns {table: (partitions written, rows written) or 'ERROR: ...'}. The
+    manifest is saved as each table finishes; options go to
+    export_table_incremental.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    manifest_lock = threading.Lock()
+    columns = columns or {}
+
+    def run(table_name):
+        try:
+            partitions, rows, entry = export_table_incremental(
+                engine, table_name, output_dir, manifest.get(table_name), columns=columns.get(table_name),
+                full=full, **options)
+        except Exception as e:
+            return f"ERROR: {e}"
+        with manifest_lock:
+            manifest[table_name] = entry
+            save_manifest(manifest_path, manifest)
+        return partitions, rows
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tables)))) as executor:
+        results = dict(zip(tables, executor.map(run, tables)))
+    return results
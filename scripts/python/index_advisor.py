@@ -0,0 +1,288 @@
+"""
+AirPure AQI Analytics - Query Plan and Index Advisor
+=====================================================
+Runs EXPLAIN and EXPLAIN ANALYZE over every analytical view in the
+database (SELECT * FROM vw_...) and every query behind the SQL analysis
+report (analysis_sql.py, captured while the questions run), and flags:
+
+    FULL SCAN     a table of MIN_SCAN_ROWS+ rows read without an index
+                  (possible_keys tells whether an index exists but was
+                  not chosen, or no index matches the filter)
+    FILESORT      rows sorted outside an index
+    NO PRUNING    a query comparing the partition date column with a
+                  value still reads every partition (filters such as
+                  YEAR(date) = ... never prune; compare the date itself)
+    OVERFLOW      rows in the catch-all pmax partition: add a partition
+                  for the new year (see aqi_partitioning.sql)
+
+Pruned queries are reported with the partitions they read (3/9). With
+partitioning and the composite indexes in place, a date-window query
+reads only its years, so its cost follows the window, not the history.
+
+EXPLAIN ANALYZE executes each query (MySQL 8.0.18+); --no-analyze only
+asks for the estimated plans.
+
+Usage:
+    python index_advisor.py                      (views and report queries)
+    python index_advisor.py --migrate            (apply aqi_partitioning.sql first)
+    python index_advisor.py --views-only --output plans.csv
+"""
+
+import argparse
+import re
+import sys
+import time
+
+import pandas as pd
+
+from analysis_sql import SQL_QUESTIONS, capture_queries
+from db import connect, get_engine
+from etl_simple import schema_statements
+
+# =====================================================
+# Configuration
+# =====================================================
+
+PARTITIONING_FILE = r'd:\FEB_AQI_P2\database\schema\aqi_partitioning.sql'
+
+# Smaller tables (dimensions, rollups) are cheap to scan and not flagged
+MIN_SCAN_ROWS = 10000
+
+# Partitioned table -> column its partitions are ranged on
+PARTITION_COLUMNS = {
+    'aqi_daily': 'date',
+    'fact_aqi_daily': 'date_value',
+}
+
+OVERFLOW_PARTITION = 'pmax'
+
+# =====================================================
+# Migration
+# =====================================================
+
+def apply_migration(path=PARTITIONING_FILE):
+    """Run a migration file statement by statement; returns (applied, warnings)"""
+    print(f"Applying {path}...")
+    with open(path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    applied = warnings = 0
+    conn = connect(database=False, autocommit=True)
+    try:
+        cursor = conn.cursor()
+        for stmt in schema_statements(sql):
+            summary = ' '.join(stmt.split())[:70]
+            started = time.perf_counter()
+            try:
+                cursor.execute(stmt)
+                applied += 1
+                print(f"  [OK] {summary} ({time.perf_counter() - started:.1f}s)")
+            except Exception as e:
+                # Already applied (duplicate or missing index, dropped key) or not possible yet
+                warnings += 1
+                print(f"  [WARN] {summary}: {e}")
+    finally:
+        conn.close()
+    return applied, warnings
+
+# =====================================================
+# Queries
+# =====================================================
+
+def view_queries(conn):
+    """[(name, sql, params)] selecting every view in the database"""
+    rows = conn.exec_driver_sql("SELECT TABLE_NAME FROM information_schema.VIEWS "
+                                "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME").fetchall()
+    return [(name, f"SELECT * FROM `{name}`", ()) for name, in rows]
+
+def report_queries(engine, questions=None):
+    """[(name, sql, params)] run by the SQL analysis questions, captured as they run"""
+    queries = []
+    for question in questions or SQL_QUESTIONS:
+        with capture_queries() as captured:
+            SQL_QUESTIONS[question](engine)
+        for i, (sql, params) in enumerate(captured, 1):
+            queries.append((f"{question}.{i}", sql, params))
+    return queries
+
+# =====================================================
+# Plans
+# =====================================================
+
+def partition_layout(conn):
+    """{table: [(partition, estimated rows)]} of the partitioned tables"""
+    rows = conn.exec_driver_sql(
+        "SELECT TABLE_NAME, PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND PARTITION_NAME IS NOT NULL "
+        "ORDER BY TABLE_NAME, PARTITION_ORDINAL_POSITION").fetchall()
+    layout = {}
+    for table, partition, count in rows:
+        layout.setdefault(table, []).append((partition, int(count or 0)))
+    return layout
+
+def explain(conn, sql, params=()):
+    """Estimated plan rows (id, table, partitions, type, possible_keys, key, rows, Extra, ...)"""
+    result = conn.exec_driver_sql(f"EXPLAIN {sql}", tuple(params))
+    return [dict(row) for row in result.mappings()]
+
+def explain_analyze(conn, sql, params=()):
+    """EXPLAIN ANALYZE tree of an executed query"""
+    return conn.exec_driver_sql(f"EXPLAIN ANALYZE {sql}", tuple(params)).scalar()
+
+_NODE = re.compile(r'->\s*(?P<operation>.*?)\s*(?:\(cost=[^)]*\)\s*)?'
+                   r'\(actual time=(?P<first>[\d.]+)\.\.(?P<last>[\d.]+) rows=(?P<rows>[\d.]+) loops=(?P<loops>\d+)\)')
+
+def parse_tree(tree):
+    """[(operation, total ms, rows, loops)] of the executed nodes of an EXPLAIN ANALYZE tree"""
+    nodes = []
+    for line in (tree or '').splitlines():
+        match = _NODE.search(line)
+        if match:
+            loops = int(match.group('loops'))
+            nodes.append((match.group('operation'), float(match.group('last')) * loops,
+                          float(match.group('rows')) * loops, loops))
+    return nodes
+
+def expects_pruning(sql, layout):
+    """Whether the query compares a partitioned table's date column with a value"""
+    for table in layout:
+        column = PARTITION_COLUMNS.get(table)
+        if column and re.search(rf'\b`?{column}`?\s*(>=|<=|>|<|=|BETWEEN\b)', sql, re.IGNORECASE):
+            return True
+    return False
+
+def findings(sql, plan, tree, layout):
+    """[(flag, detail)] for one query's plans"""
+    flags = []
+    pruning = expects_pruning(sql, layout)
+    for row in plan:
+        table = row.get('table') or ''
+        if table.startswith('<'):
+            # Derived tables and temporary results are sized by the query itself
+            continue
+        estimated = int(row.get('rows') or 0)
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL' and estimated >= MIN_SCAN_ROWS:
+            keys = row.get('possible_keys')
+            hint = f"possible keys {keys} not used" if keys else "no index matches the filter or join"
+            flags.append(('FULL SCAN', f"{table}: ~{estimated:,} rows, {hint}"))
+        if 'Using filesort' in extra:
+            flags.append(('FILESORT', f"{table}: {extra}"))
+        if row.get('partitions'):
+            used = row['partitions'].split(',')
+            total = max((len(parts) for parts in layout.values()
+                         if set(used) <= {name for name, _ in parts}), default=len(used))
+            if len(used) >= total and pruning:
+                flags.append(('NO PRUNING', f"{table}: all {total} partitions read despite a date filter"))
+            else:
+                flags.append(('PRUNED', f"{table}: {len(used)}/{total} partitions"))
+    for operation, _, rows, _ in parse_tree(tree):
+        if operation.startswith('Table scan on') and not operation.startswith('Table scan on <') \
+                and rows >= MIN_SCAN_ROWS:
+            flags.append(('SCANNED', f"{operation[len('Table scan on '):]}: {rows:,.0f} rows read"))
+    return flags
+
+def advise(engine, views=True, reports=True, analyze=True, questions=None):
+    """Check every query; returns (rows for the report, partition layout)"""
+    queries = []
+    with engine.connect() as conn:
+        layout = partition_layout(conn)
+        if views:
+            queries += [('view',) + query for query in view_queries(conn)]
+    if reports:
+        queries += [('report',) + query for query in report_queries(engine, questions)]
+
+    results = []
+    with engine.connect() as conn:
+        for kind, name, sql, params in queries:
+            entry = {'kind': kind, 'query': name, 'ms': None, 'flags': [], 'error': None}
+            try:
+                plan = explain(conn, sql, params)
+                tree = explain_analyze(conn, sql, params) if analyze else None
+                nodes = parse_tree(tree)
+                entry['ms'] = nodes[0][1] if nodes else None
+                entry['flags'] = findings(sql, plan, tree, layout)
+            except Exception as e:
+                conn.rollback()
+                entry['error'] = str(e)
+            results.append(entry)
+    return results, layout
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Flag full scans, filesorts and unpruned partitions in the "
+                                                 "analytical views and report queries")
+    parser.add_argument('--migrate', action='store_true',
+                        help=f"apply {PARTITIONING_FILE} (partitioning and composite indexes) first")
+    scope = parser.add_mutually_exclusive_group()
+    scope.add_argument('--views-only', action='store_true', help="check only the vw_* views")
+    scope.add_argument('--reports-only', action='store_true', help="check only the SQL analysis report queries")
+    parser.add_argument('--no-analyze', action='store_true',
+                        help="use estimated plans only (EXPLAIN, without executing the queries)")
+    parser.add_argument('--output', metavar='CSV', help="write every finding to a CSV file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 80)
+    print("QUERY PLAN ADVISOR (EXPLAIN ANALYZE over views and report queries)")
+    print("=" * 80)
+
+    if args.migrate:
+        applied, warnings = apply_migration()
+        print(f"  {applied} statement(s) applied, {warnings} warning(s)\n")
+
+    engine = get_engine(pool_size=1, max_overflow=0)
+    results, layout = advise(engine, views=not args.reports_only, reports=not args.views_only,
+                             analyze=not args.no_analyze)
+    engine.dispose()
+
+    print("Partitions:")
+    if not layout:
+        print("  [WARN] No partitioned tables (apply aqi_partitioning.sql with --migrate)")
+    for table, partitions in layout.items():
+        counts = ', '.join(f"{name} {rows:,}" for name, rows in partitions)
+        print(f"  {table:<16} {counts}")
+        overflow = dict(partitions).get(OVERFLOW_PARTITION, 0)
+        if overflow:
+            print(f"  [WARN] OVERFLOW {table}: ~{overflow:,} rows in {OVERFLOW_PARTITION}; add a partition "
+                  f"for the new year")
+
+    print(f"\n{'Query':<34} | {'ms':>9} | Findings")
+    print("-" * 80)
+    problems = 0
+    records = []
+    for entry in results:
+        ms = f"{entry['ms']:,.1f}" if entry['ms'] is not None else '-'
+        if entry['error']:
+            print(f"{entry['query']:<34} | {ms:>9} | [ERROR] {entry['error'][:60]}")
+            records.append({'kind': entry['kind'], 'query': entry['query'], 'ms': entry['ms'],
+                            'flag': 'ERROR', 'detail': entry['error']})
+            continue
+        flags = entry['flags']
+        serious = [flag for flag, _ in flags if flag in ('FULL SCAN', 'FILESORT', 'NO PRUNING')]
+        problems += bool(serious)
+        print(f"{entry['query']:<34} | {ms:>9} | {', '.join(sorted(set(serious))) or 'OK'}")
+        for flag, detail in flags:
+            print(f"    {flag:<10} {detail}")
+            records.append({'kind': entry['kind'], 'query': entry['query'], 'ms': entry['ms'],
+                            'flag': flag, 'detail': detail})
+    print("=" * 80)
+
+    if args.output:
+        pd.DataFrame(records, columns=['kind', 'query', 'ms', 'flag', 'detail']).to_csv(args.output, index=False)
+        print(f"\nFindings written to {args.output}")
+    if any(entry['error'] for entry in results):
+        print("\n[ERROR] Some queries could not be explained")
+        sys.exit(1)
+    if problems:
+        print(f"\n[WARN] {problems} of {len(results)} queries scan, sort or read every partition; see above")
+    else:
+        print(f"\n[OK] All {len(results)} queries use indexes and prune partitions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+AirPure AQI Analytics - Stage Instrumentation
+==============================================
+Wraps pipeline stages and writes one JSON line per stage run:
+
+    {"run": ..., "stage": "etl.insert", "table": "aqi_daily", "chunk": 12,
+     "wall_seconds": 0.41, "cpu_seconds": 0.05, "rows": 5000, "bytes": 1893442,
+     "rss_mb": 412.3, "peak_rss_mb": 498.0, "status": "ok", ...}
+
+Stages used by the pipeline:
+
+    etl.schema, etl.table           schema setup, one table's whole load
+    etl.read, etl.clean,            per chunk: reading the source (or the
+    etl.parse_dates, etl.types,     stage), cleaning, date parsing, typing,
+    etl.insert                      inserting
+    etl.index                       building deferred indexes (--bulk)
+    analysis.load, analysis.<q>     loading the datasets, each question
+    export.table, export.partition  Power BI export files
+    views.refresh                   rebuilding one materialized view
+
+cpu_seconds far below wall_seconds means the stage was waiting (disk,
+network, MySQL); close to it means pandas/Python work (parsing, cleaning).
+
+Recording is off until configure() is given a metrics path (--metrics on
+the command line). configure() also passes its settings to worker
+processes through environment variables. Stages whose name matches a
+--profile pattern (e.g. 'etl.insert', 'analysis.q*') additionally run under
+cProfile; each stage name accumulates into <profile dir>/<stage>.prof,
+readable with `python -m pstats`. A profiled stage inside another
+profiled stage is counted in the outer profile only.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from fnmatch import fnmatch
+
+# =====================================================
+# Configuration
+# =====================================================
+
+METRICS_PATH = r'd:\FEB_AQI_P2\data\processed\metrics.jsonl'
+PROFILE_PATH = r'd:\FEB_AQI_P2\data\processed\profiles'
+
+# Settings inherited by worker processes
+ENV_METRICS = 'AQI_METRICS_PATH'
+ENV_PROFILE = 'AQI_PROFILE_STAGES'
+ENV_PROFILE_PATH = 'AQI_PROFILE_PATH'
+ENV_RUN = 'AQI_RUN_ID'
+
+_config = {
+    'metrics_path': os.environ.get(ENV_METRICS) or None,
+    'profile': [p for p in os.environ.get(ENV_PROFILE, '').split(',') if p],
+    'profile_path': os.environ.get(ENV_PROFILE_PATH) or PROFILE_PATH,
+    'run': os.environ.get(ENV_RUN) or uuid.uuid4().hex[:12],
+}
+_write_lock = threading.Lock()
+_profile_lock = threading.Lock()
+_profilers = {}
+_local = threading.local()
+
+def configure(metrics_path=None, profile=(), profile_path=None):
+    """Enable stage records (and profiling of matching stages) for this run"""
+    _config['metrics_path'] = metrics_path
+    _config['profile'] = list(profile or [])
+    _config['profile_path'] = profile_path or PROFILE_PATH
+    os.environ[ENV_METRICS] = metrics_path or ''
+    os.environ[ENV_PROFILE] = ','.join(_config['profile'])
+    os.environ[ENV_PROFILE_PATH] = _config['profile_path']
+    os.environ[ENV_RUN] = _config['run']
+    if metrics_path:
+        os.makedirs(os.path.dirname(os.path.abspath(metrics_path)), exist_ok=True)
+
+def recording():
+    """Whether stage records are being written"""
+    return bool(_config['metrics_path'])
+
+def add_arguments(parser):
+    """Add --metrics and --profile to a script's argument parser"""
+    parser.add_argument('--metrics', nargs='?', const=METRICS_PATH, metavar='PATH',
+                        help=f"append per-stage timings as JSON lines (default file {METRICS_PATH})")
+    parser.add_argument('--profile', action='append', metavar='STAGE',
+                        help=f"cProfile stages matching this pattern into {PROFILE_PATH} (repeatable)")
+
+def configure_from_args(args):
+    """configure() from the --metrics / --profile options"""
+    if args.metrics or args.profile:
+        configure(args.metrics, args.profile)
+
+# =====================================================
+# Resource Readings
+# =====================================================
+
+def rss_mb():
+    """Current resident set size of this process (MB, None if unavailable)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        counters = _windows_memory()
+        return counters.WorkingSetSize / (1024 * 1024) if counters else None
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (MB, None if unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        counters = _windows_memory()
+        return counters.PeakWorkingSetSize / (1024 * 1024) if counters else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _windows_memory():
+    """PROCESS_MEMORY_COUNTERS of this process on Windows (None elsewhere)"""
+    if sys.platform != 'win32':
+        return None
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in
+            ('PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+             'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(Counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+def frame_bytes(df):
+    """In-memory size of a DataFrame chunk including string contents"""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+# =====================================================
+# Stages
+# =====================================================
+
+def _emit(record):
+    line = json.dumps(record, default=str) + '\n'
+    with _write_lock:
+        with open(_config['metrics_path'], 'a', encoding='utf-8') as f:
+            f.write(line)
+
+def _profiler_for(name):
+    """Accumulating profiler for a stage, or None if it is not profiled here"""
+    if getattr(_local, 'profiling', False) or not any(fnmatch(name, p) for p in _config['profile']):
+        return None
+    with _profile_lock:
+        profiler = _profilers.get(name)
+        if profiler is None:
+            profiler = _profilers[name] = [cProfile.Profile(), threading.Lock()]
+    # One thread at a time per profiler; concurrent runs of the stage go unprofiled
+    return profiler if profiler[1].acquire(blocking=False) else None
+
+def _dump_profile(name, profiler):
+    os.makedirs(_config['profile_path'], exist_ok=True)
+    file_name = ''.join(c if c.isalnum() or c in '._-' else '_' for c in name) + '.prof'
+    profiler.dump_stats(os.path.join(_config['profile_path'], file_name))
+
+@contextmanager
+def stage(name, **fields):
+    """Measure one run of a stage
+
+    Yields the record dict; set record['rows'] / record['bytes'] (or any other
+    field) inside the block. Costs next to nothing while recording is off.
+    """
+    record = dict(fields)
+    if not _config['metrics_path'] and not _config['profile']:
+        yield record
+        return
+
+    profiler = _profiler_for(name)
+    if profiler is not None:
+        _local.profiling = True
+        profiler[0].enable()
+    started_at = datetime.now()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    thread_cpu = time.thread_time()
+    status = 'ok'
+    try:
+        yield record
+    except BaseException as e:
+        status = f"error: {type(e).__name__}"
+        raise
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        thread_cpu = time.thread_time() - thread_cpu
+        if profiler is not None:
+            profiler[0].disable()
+            _local.profiling = False
+            try:
+                _dump_profile(name, profiler[0])
+            finally:
+                profiler[1].release()
+        if _config['metrics_path']:
+            current, peak = rss_mb(), peak_rss_mb()
+            _emit({
+                'run': _config['run'],
+                'stage': name,
+                **record,
+                'started_at': started_at.isoformat(timespec='milliseconds'),
+                'wall_seconds': round(wall, 6),
+                'cpu_seconds': round(cpu, 6),
+                'thread_cpu_seconds': round(thread_cpu, 6),
+                'rss_mb': round(current, 1) if current is not None else None,
+                'peak_rss_mb': round(peak, 1) if peak is not None else None,
+                'pid': os.getpid(),
+                'thread': threading.current_thread().name,
+                'status': status,
+            })
+
+def timed_iter(name, iterable, **fields):
+    """Yield from iterable, recording the time to produce each item as a stage
+
+    Items with a len() (e.g. DataFrame chunks) set the record's rows, and
+    its bytes when recording is on.
+    """
+    iterator = iter(iterable)
+    index = 0
+    while True:
+        with stage(name, **fields, chunk=index) as record:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record['rows'] = 0
+                return
+            record['rows'] = len(item) if hasattr(item, '__len__') else None
+            if recording() and hasattr(item, 'memory_usage'):
+                record['bytes'] = frame_bytes(item)
+        yield item
+        index += 1
@@ -0,0 +1,453 @@
+"""
+AirPure AQI Analytics - Materialized Analytical Views
+======================================================
+Persists every view in database/queries/create_analytical_views.sql as a
+physical summary table, so Power BI and dashboard queries read a few
+hundred precomputed rows instead of re-running the CTEs and joins over
+fact_aqi_daily on every refresh and click:
+
+    vw_top_bottom_areas_aqi   ->  mv_top_bottom_areas_aqi
+    vw_city_severity_risk     ->  mv_city_severity_risk   ...
+
+Each view's SQL is read from the views file; references to other
+materialized views are pointed at their mv_ tables, and views are
+refreshed in dependency order. The tables behind a view (found from its
+FROM / JOIN clauses) are fingerprinted with one query: per state for
+the fact tables (row count and sum of row hashes, as in reconcile.py),
+whole-table for the dimensions. mv_refresh_log keeps the fingerprint each
+mv_ table was built from, so a refresh after an ETL load:
+
+    skips       views whose sources are unchanged
+    partial     views listed in PARTITION_COLUMNS whose changes are
+                confined to some states: only those states' rows are
+                deleted and re-selected, in one transaction
+    full        everything else (dimension changes, ranking views whose
+                rows depend on all states, a changed definition, views
+                using CURDATE() refreshed on an earlier day); the table
+                is rebuilt under a temporary name and swapped in with an
+                atomic RENAME, so readers never see it empty
+
+Usage:
+    python materialized_views.py                   (refresh what changed)
+    python materialized_views.py --full            (rebuild everything)
+    python materialized_views.py --check           (staleness report; exit 1 if stale)
+    python materialized_views.py --view vw_city_severity_risk
+
+etl_star_schema.py runs the refresh after every load.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from datetime import date, datetime
+from graphlib import TopologicalSorter
+
+from db import get_engine
+from etl_simple import make_non_destructive, schema_statements
+from etl_star_schema import FACT_BRIDGES, STAR_SCHEMA_FILE
+from instrumentation import add_arguments, configure_from_args, stage
+from reconcile import sql_row_hash
+
+# =====================================================
+# Configuration
+# =====================================================
+
+VIEWS_FILE = r'd:\FEB_AQI_P2\database\queries\create_analytical_views.sql'
+
+LOG_TABLE = 'mv_refresh_log'
+
+# Views whose rows for a state depend only on that state's source rows
+PARTITION_COLUMNS = {
+    'vw_south_india_pollutants': 'state_name',
+    'vw_weekend_vs_weekday_aqi': 'state_name',
+    'vw_top_diseases_with_aqi': 'state_name',
+    'vw_city_severity_risk': 'state_name',
+    'vw_health_aqi_correlation': 'state_name',
+    'vw_pollutant_analysis': 'state_name',
+    'vw_market_demand_estimation': 'state_name',
+}
+
+# Source tables fingerprinted per state; all others as a whole
+PARTITIONED_SOURCES = {
+    'fact_aqi_daily': 'state_name',
+    'fact_aqi_monthly': 'state_name',
+    'fact_disease_outbreak': 'state_name',
+    'fact_vehicle_registration': 'state_name',
+}
+
+# Tables rebuilt from another table on every load (their surrogate ids change),
+# tracked through the table they are derived from
+DERIVED_SOURCES = {bridge: fact for fact, bridge in FACT_BRIDGES.items()}
+
+# Columns left out of fingerprints (set by MySQL, not by the data)
+IGNORED_COLUMNS = {'created_at'}
+
+# Above this share of changed states a full rebuild is cheaper than deleting and re-inserting
+MAX_PARTIAL_SHARE = 0.5
+
+WHOLE_TABLE = '*'
+
+# =====================================================
+# View Definitions
+# =====================================================
+
+def load_definitions(path=VIEWS_FILE):
+    """{view: SELECT statement} in file order"""
+    with open(path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    definitions = {}
+    for stmt in schema_statements(sql):
+        match = re.match(r'CREATE\s+(?:OR\s+REPLACE\s+)?VIEW\s+`?(\w+)`?\s+AS\s+(.*)', stmt,
+                         re.IGNORECASE | re.DOTALL)
+        if match:
+            definitions[match.group(1)] = match.group(2).strip()
+    return definitions
+
+def mv_table(view_name):
+    """Summary table of a view: vw_x -> mv_x"""
+    return 'mv_' + (view_name[3:] if view_name.startswith('vw_') else view_name)
+
+def references(sql):
+    """Names following FROM / JOIN (tables, views and CTE names)"""
+    return set(re.findall(r'\b(?:FROM|JOIN)\s+`?(\w+)`?', sql, re.IGNORECASE))
+
+def dependency_graph(definitions):
+    """{view: views it selects from}"""
+    return {view: references(sql) & set(definitions) - {view} for view, sql in definitions.items()}
+
+def refresh_order(definitions):
+    """Views with every view they read from ahead of them (otherwise in file order)"""
+    position = {view: i for i, view in enumerate(definitions)}
+    sorter = TopologicalSorter(dependency_graph(definitions))
+    sorter.prepare()
+    order = []
+    while sorter.is_active():
+        ready = sorted(sorter.get_ready(), key=position.get)
+        order.extend(ready)
+        sorter.done(*ready)
+    return order
+
+def source_tables(view_name, definitions, tables):
+    """Tables a view reads from, through other views, as tracked by fingerprints"""
+    sources, pending, seen = set(), [view_name], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        for ref in references(definitions[name]):
+            if ref in definitions:
+                pending.append(ref)
+            elif ref in tables:
+                sources.add(DERIVED_SOURCES.get(ref, ref))
+    return sources
+
+def materialized_sql(view_name, definitions):
+    """A view's SELECT reading other views from their mv_ tables, ready for exec_driver_sql"""
+    sql = definitions[view_name]
+    for upstream in dependency_graph(definitions)[view_name]:
+        sql = re.sub(rf'\b{upstream}\b', mv_table(upstream), sql)
+    # pymysql %-formats every statement it is given (a comment contains "Days %)")
+    return sql.replace('%', '%%')
+
+def definition_hash(sql):
+    return hashlib.sha1(' '.join(sql.split()).encode('utf-8')).hexdigest()
+
+def is_date_relative(sql):
+    """Whether the view's rows move with the calendar (CURDATE() / NOW())"""
+    return re.search(r'\b(CURDATE|CURRENT_DATE|NOW|SYSDATE)\b', sql, re.IGNORECASE) is not None
+
+# =====================================================
+# Source Fingerprints
+# =====================================================
+
+def base_tables(conn):
+    """Names of the base tables in the database"""
+    rows = conn.exec_driver_sql("SELECT TABLE_NAME FROM information_schema.TABLES "
+                                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'").fetchall()
+    return {name for name, in rows}
+
+def fingerprint_columns(conn, tables):
+    """{table: [(column, data type, scale)]} for the fingerprinted columns, in one query"""
+    placeholders = ', '.join(['%s'] * len(tables))
+    rows = conn.exec_driver_sql(
+        f"SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, NUMERIC_SCALE, EXTRA FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders}) "
+        f"ORDER BY TABLE_NAME, ORDINAL_POSITION", tuple(tables)).fetchall()
+    columns = {table: [] for table in tables}
+    for table, name, data_type, scale, extra in rows:
+        if name in IGNORED_COLUMNS or 'auto_increment' in (extra or '').lower():
+            continue
+        columns[table].append((name, data_type.lower(), scale))
+    return columns
+
+def source_fingerprints(conn, tables):
+    """{table: {state (or '*'): [rows, hash sum]}} for all tables in one UNION query"""
+    tables = sorted(tables)
+    if not tables:
+        return {}
+    columns = fingerprint_columns(conn, tables)
+    parts, params = [], []
+    for table in tables:
+        row_hash = sql_row_hash(columns[table])
+        partition = PARTITIONED_SOURCES.get(table)
+        if partition:
+            parts.append(f"SELECT %s, `{partition}`, COUNT(*), SUM({row_hash}) FROM `{table}` GROUP BY `{partition}`")
+        else:
+            parts.append(f"SELECT %s, NULL, COUNT(*), SUM({row_hash}) FROM `{table}`")
+        params.append(table)
+    fingerprints = {table: {} for table in tables}
+    for table, key, rows, hash_sum in conn.exec_driver_sql(' UNION ALL '.join(parts), tuple(params)):
+        if not PARTITIONED_SOURCES.get(table):
+            key = WHOLE_TABLE
+        fingerprints[table][key if key is not None else ''] = [int(rows), str(hash_sum or 0)]
+    return fingerprints
+
+def changed_partitions(old, new, tables):
+    """States whose source rows changed, or None when a whole-table source changed"""
+    changed = set()
+    for table in tables:
+        before, after = old.get(table), new.get(table, {})
+        if before is None or (table not in PARTITIONED_SOURCES and before != after):
+            return None
+        changed |= {key for key in set(before) | set(after) if before.get(key) != after.get(key)}
+    return changed
+
+# =====================================================
+# Refresh
+# =====================================================
+
+def ensure_log_table(conn):
+    """Create mv_refresh_log from the star schema file if it is missing"""
+    with open(STAR_SCHEMA_FILE, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    for stmt in schema_statements(sql):
+        # Searched, not matched, so stray leading text cannot hide the definition
+        match = re.search(rf'\bCREATE TABLE\s+`?{LOG_TABLE}`?\b', stmt, re.IGNORECASE)
+        if match:
+            conn.exec_driver_sql(make_non_destructive(stmt[match.start():]))
+            return
+    raise RuntimeError(f"{LOG_TABLE} is not defined in {STAR_SCHEMA_FILE}")
+
+def read_log(conn):
+    """{view: last refresh record}"""
+    result = conn.exec_driver_sql(f"SELECT view_name, table_name, refreshed_at, refresh_mode, definition_hash, "
+                                  f"source_fingerprint FROM `{LOG_TABLE}`")
+    log = {}
+    for row in result.mappings():
+        entry = dict(row)
+        entry['source_fingerprint'] = json.loads(entry['source_fingerprint'] or '{}')
+        log[entry['view_name']] = entry
+    return log
+
+def plan_refresh(view_name, sql, entry, fingerprint, sources, table_exists, full=False):
+    """(mode, states to refresh, reason) for one view; mode is skip, partial or full"""
+    if full:
+        return 'full', None, "requested"
+    if entry is None or not table_exists:
+        return 'full', None, "not materialized yet"
+    if entry['definition_hash'] != definition_hash(sql):
+        return 'full', None, "definition changed"
+    if is_date_relative(sql) and entry['refreshed_at'].date() != date.today():
+        return 'full', None, "date-relative, last refreshed on an earlier day"
+    changed = changed_partitions(entry['source_fingerprint'], fingerprint, sources)
+    if changed is None:
+        return 'full', None, "a whole-table source changed"
+    if not changed:
+        return 'skip', set(), "sources unchanged"
+    column = PARTITION_COLUMNS.get(view_name)
+    states = {key for table in sources if table in PARTITIONED_SOURCES for key in fingerprint.get(table, {})}
+    if column is None:
+        return 'full', None, f"{len(changed)} state(s) changed, view ranks across states"
+    if len(changed) > MAX_PARTIAL_SHARE * max(len(states), 1):
+        return 'full', None, f"{len(changed)} of {len(states)} states changed"
+    return 'partial', changed, f"{len(changed)} state(s) changed"
+
+def _partition_filter(column, states):
+    """(SQL condition, params) selecting the rows of some states ('' is NULL)"""
+    values = sorted(state for state in states if state != '')
+    clauses = []
+    if values:
+        clauses.append(f"`{column}` IN ({', '.join(['%s'] * len(values))})")
+    if '' in states:
+        clauses.append(f"`{column}` IS NULL")
+    return f"({' OR '.join(clauses)})", tuple(values)
+
+def rebuild(engine, view_name, sql):
+    """Build a view's table under a temporary name and swap it in; returns its rows"""
+    table = mv_table(view_name)
+    new, old = f"{table}__new", f"{table}__old"
+    with engine.begin() as conn:
+        exists = table in base_tables(conn)
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS `{new}`, `{old}`")
+        conn.exec_driver_sql(f"CREATE TABLE `{new}` AS SELECT * FROM (\n{sql}\n) v")
+        column = PARTITION_COLUMNS.get(view_name)
+        if column:
+            conn.exec_driver_sql(f"ALTER TABLE `{new}` ADD INDEX idx_partition (`{column}`)")
+        rows = conn.exec_driver_sql(f"SELECT COUNT(*) FROM `{new}`").scalar()
+        if exists:
+            conn.exec_driver_sql(f"RENAME TABLE `{table}` TO `{old}`, `{new}` TO `{table}`")
+            conn.exec_driver_sql(f"DROP TABLE `{old}`")
+        else:
+            conn.exec_driver_sql(f"RENAME TABLE `{new}` TO `{table}`")
+    return rows
+
+def refresh_partitions(engine, view_name, sql, states):
+    """Replace the rows of some states in one transaction; returns the rows written"""
+    table = mv_table(view_name)
+    where, params = _partition_filter(PARTITION_COLUMNS[view_name], states)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DELETE FROM `{table}` WHERE {where}", params)
+        result = conn.exec_driver_sql(f"INSERT INTO `{table}` SELECT * FROM (\n{sql}\n) v WHERE {where}", params)
+        return result.rowcount
+
+def _record(engine, view_name, mode, partitions, rows, seconds, sql, fingerprint):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"REPLACE INTO `{LOG_TABLE}` (view_name, table_name, refreshed_at, refresh_mode, partitions_refreshed, "
+            f"rows_written, seconds, definition_hash, source_fingerprint) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+            (view_name, mv_table(view_name), datetime.now().replace(microsecond=0), mode, partitions, rows,
+             round(seconds, 3), definition_hash(sql), json.dumps(fingerprint, sort_keys=True)))
+
+def _inspect(engine, definitions):
+    """(existing tables, refresh log, {view: its sources}, fingerprints of all sources)"""
+    with engine.begin() as conn:
+        ensure_log_table(conn)
+        tables = base_tables(conn)
+        log = read_log(conn)
+        sources = {view: source_tables(view, definitions, tables) for view in definitions}
+        fingerprints = source_fingerprints(conn, set().union(*sources.values()))
+    return tables, log, sources, fingerprints
+
+def refresh_views(engine, views=None, full=False, definitions=None):
+    """Refresh mv_ tables in dependency order
+
+    Returns {view: (mode, partitions refreshed, rows written, seconds, reason)
+    or 'ERROR: ...'}. Views downstream of a failed view are not refreshed.
+    Source fingerprints are taken before refreshing, so rows arriving
+    meanwhile are picked up by the next refresh.
+    """
+    definitions = definitions or load_definitions()
+    tables, log, sources, fingerprints = _inspect(engine, definitions)
+    graph = dependency_graph(definitions)
+    results = {}
+    for view_name in refresh_order(definitions):
+        if views and view_name not in views:
+            continue
+        failed = [upstream for upstream in graph[view_name] if isinstance(results.get(upstream), str)]
+        if failed:
+            results[view_name] = f"ERROR: depends on failed {', '.join(failed)}"
+            continue
+        sql = materialized_sql(view_name, definitions)
+        fingerprint = {table: fingerprints.get(table, {}) for table in sources[view_name]}
+        mode, states, reason = plan_refresh(view_name, sql, log.get(view_name), fingerprint, sources[view_name],
+                                            mv_table(view_name) in tables, full)
+        if mode == 'skip':
+            results[view_name] = (mode, 0, 0, 0.0, reason)
+            continue
+        started = time.perf_counter()
+        try:
+            with stage('views.refresh', view=view_name, mode=mode) as record:
+                if mode == 'full':
+                    rows = rebuild(engine, view_name, sql)
+                else:
+                    rows = refresh_partitions(engine, view_name, sql, states)
+                record['rows'] = rows
+            seconds = time.perf_counter() - started
+            partitions = len(states) if states is not None else None
+            _record(engine, view_name, mode, partitions, rows, seconds, sql, fingerprint)
+        except Exception as e:
+            results[view_name] = f"ERROR: {e}"
+            continue
+        results[view_name] = (mode, partitions, rows, seconds, reason)
+    return results
+
+def staleness(engine, definitions=None):
+    """{view: (state, last refreshed, reason)}; state is fresh, stale or missing"""
+    definitions = definitions or load_definitions()
+    tables, log, sources, fingerprints = _inspect(engine, definitions)
+    report = {}
+    for view_name in refresh_order(definitions):
+        sql = materialized_sql(view_name, definitions)
+        entry = log.get(view_name)
+        fingerprint = {table: fingerprints.get(table, {}) for table in sources[view_name]}
+        mode, _, reason = plan_refresh(view_name, sql, entry, fingerprint, sources[view_name],
+                                       mv_table(view_name) in tables)
+        if entry is None or mv_table(view_name) not in tables:
+            state = 'missing'
+        else:
+            state = 'fresh' if mode == 'skip' else 'stale'
+        report[view_name] = (state, entry['refreshed_at'] if entry else None, reason)
+    return report
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def print_results(results):
+    """Refresh summary table"""
+    print(f"\n{'View':<32} | {'Mode':<7} | {'States':>6} | {'Rows':>8} | {'Seconds':>7}")
+    print("-" * 72)
+    for view_name, result in results.items():
+        if isinstance(result, str):
+            print(f"{view_name:<32} | [ERROR] {result}")
+            continue
+        mode, partitions, rows, seconds, reason = result
+        states = '-' if partitions is None else f"{partitions:,}"
+        print(f"{view_name:<32} | {mode:<7} | {states:>6} | {rows:>8,} | {seconds:>7.2f}  ({reason})")
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Refresh the materialized mv_* tables behind the vw_* views")
+    parser.add_argument('--view', action='append', metavar='VIEW',
+                        help="refresh only this view (repeatable; default all)")
+    parser.add_argument('--full', action='store_true', help="rebuild every selected table")
+    parser.add_argument('--check', action='store_true',
+                        help="only report which tables are stale (exit status 1 if any)")
+    add_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_args(args)
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Materialized Views")
+    print("=" * 60)
+
+    definitions = load_definitions()
+    unknown = [view for view in args.view or [] if view not in definitions]
+    if unknown:
+        print(f"[ERROR] Not defined in {VIEWS_FILE}: {', '.join(unknown)}")
+        sys.exit(1)
+    engine = get_engine(pool_size=1, max_overflow=0)
+
+    if args.check:
+        report = staleness(engine, definitions)
+        engine.dispose()
+        print(f"\n{'View':<32} | {'State':<7} | {'Refreshed':<19} | Reason")
+        print("-" * 80)
+        for view_name, (state, refreshed_at, reason) in report.items():
+            refreshed = refreshed_at.strftime('%Y-%m-%d %H:%M:%S') if refreshed_at else '-'
+            print(f"{view_name:<32} | {state:<7} | {refreshed:<19} | {reason}")
+        if any(state != 'fresh' for state, _, _ in report.values()):
+            print("\n[WARN] Stale tables; run materialized_views.py to refresh them")
+            sys.exit(1)
+        print("\n[OK] All materialized views are up to date")
+        return
+
+    started = time.perf_counter()
+    results = refresh_views(engine, args.view, args.full, definitions)
+    engine.dispose()
+    print_results(results)
+    print(f"\nTotal: {time.perf_counter() - started:.1f}s")
+    if any(isinstance(result, str) for result in results.values()):
+        sys.exit(1)
+    print("\n[OK] Materialized views refreshed")
+
+if __name__ == "__main__":
+    main()
@@ -1,140 +1,97 @@
 """
 AirPure Innovations - Primary Analysis Script
 ==============================================
-Answers all 7 Primary Analysis questions using CSV data.
+Answers all 7 Primary Analysis questions using the source data
+(read through the staging cache).
 Results can be cross-verified with Power BI dashboard.
+
+The answers are computed by analysis_engine (--backend pandas, default) or
+pushed down to MySQL by analysis_sql (--backend sql, only result rows are
+transferred); this script only prints them. Answers are reused from the
+on-disk result cache while the data and parameters are unchanged. --check-parity runs the
+selected questions on both backends and reports any difference.
 """
 
-import pandas as pd
-import numpy as np
-from datetime import datetime
+import argparse
+import math
+import sys
 import warnings
 warnings.filterwarnings('ignore')
 
-# =====================================================
-# Load Data
-# =====================================================
-
-BASE_PATH = r'd:\FEB_AQI_P2\AQI_dataset_Original\Dataful_Datasets'
+from analysis_engine import QUESTIONS, load_datasets
+from analysis_runner import DEFAULT_WORKERS, print_timings, run_questions, write_results
+from instrumentation import add_arguments, configure_from_args
 
-print("Loading datasets...")
-aqi_df = pd.read_csv(f"{BASE_PATH}/day-wise-state-wise-air-quality-index-aqi-of-major-cities-and-towns-in-india.csv")
-disease_df = pd.read_csv(f"{BASE_PATH}/master-data-state-district-and-disease-wise-cases-and-death-reported-due-to-outbreak-of-diseases-as-per-weekly-reports-under-idsp.csv", encoding='latin-1')
-vehicle_df = pd.read_csv(f"{BASE_PATH}/master-data-state-vehicle-class-and-fuel-type-wise-total-number-of-vehicles-registered-in-each-month-in-india.csv")
+def header(title):
+    print("\n" + "="*70)
+    print(title)
+    print("="*70)
 
-# Clean column names
-aqi_df.columns = aqi_df.columns.str.strip().str.lower()
-disease_df.columns = disease_df.columns.str.strip().str.lower()
-vehicle_df.columns = vehicle_df.columns.str.strip().str.lower()
-
-# Parse dates
-aqi_df['date'] = pd.to_datetime(aqi_df['date'], format='%d-%m-%Y', errors='coerce')
-aqi_df['aqi_value'] = pd.to_numeric(aqi_df['aqi_value'], errors='coerce')
-
-print(f"AQI records: {len(aqi_df):,}")
-print(f"Disease records: {len(disease_df):,}")
-print(f"Vehicle records: {len(vehicle_df):,}")
+def fmt_aqi(value):
+    """AQI for display ('N/A' when the state has no readings)"""
+    return 'N/A' if value is None or (isinstance(value, float) and math.isnan(value)) else f"{value:.1f}"
 
 # =====================================================
 # Q1: Top 5 and bottom 5 areas with highest average AQI
 #     (December 2024 to May 2025)
 # =====================================================
 
-print("\n" + "="*70)
-print("Q1: TOP 5 AND BOTTOM 5 AREAS BY AVERAGE AQI (Dec 2024 - May 2025)")
-print("="*70)
-
-q1_start = datetime(2024, 12, 1)
-q1_end = datetime(2025, 5, 31)
-q1_df = aqi_df[(aqi_df['date'] >= q1_start) & (aqi_df['date'] <= q1_end)].copy()
+def print_q1(result):
+    header("Q1: TOP 5 AND BOTTOM 5 AREAS BY AVERAGE AQI (Dec 2024 - May 2025)")
+    if result['period_rows'] == 0:
+        print("   No data available for Dec 2024 - May 2025. Checking available date range...")
+        print(f"   Data range: {result['available'][0]} to {result['available'][1]}")
+        return
 
-if len(q1_df) > 0:
-    area_avg = q1_df.groupby('area')['aqi_value'].agg(['mean', 'count']).reset_index()
-    area_avg.columns = ['area', 'avg_aqi', 'data_points']
-    area_avg = area_avg[area_avg['data_points'] >= 30]
-    area_avg = area_avg.sort_values('avg_aqi', ascending=False)
-    
     print("\n[WORST] TOP 5 AREAS (HIGHEST AQI):")
-    top5 = area_avg.head(5)
-    for i, row in top5.iterrows():
-        print(f"   {row['area']:30} | Avg AQI: {row['avg_aqi']:.1f} | Data points: {row['data_points']}")
-    
+    for row in result['top'].itertuples():
+        print(f"   {row.area:30} | Avg AQI: {row.avg_aqi:.1f} | Data points: {row.data_points}")
+
     print("\n[BEST] BOTTOM 5 AREAS (LOWEST AQI):")
-    bottom5 = area_avg.tail(5).sort_values('avg_aqi')
-    for i, row in bottom5.iterrows():
-        print(f"   {row['area']:30} | Avg AQI: {row['avg_aqi']:.1f} | Data points: {row['data_points']}")
-else:
-    print("   No data available for Dec 2024 - May 2025. Checking available date range...")
-    print(f"   Data range: {aqi_df['date'].min()} to {aqi_df['date'].max()}")
+    for row in result['bottom'].itertuples():
+        print(f"   {row.area:30} | Avg AQI: {row.avg_aqi:.1f} | Data points: {row.data_points}")
 
 # =====================================================
-# Q2: Top 2 and bottom 2 prominent pollutants for 
+# Q2: Top 2 and bottom 2 prominent pollutants for
 #     each state of southern India (2022 onwards)
 # =====================================================
 
-print("\n" + "="*70)
-print("Q2: TOP 2 AND BOTTOM 2 POLLUTANTS FOR SOUTHERN STATES (2022+)")
-print("="*70)
-
-southern_states = ['Karnataka', 'Tamil Nadu', 'Kerala', 'Andhra Pradesh', 'Telangana', 'Puducherry']
+def print_q2(counts):
+    header("Q2: TOP 2 AND BOTTOM 2 POLLUTANTS FOR SOUTHERN STATES (2022+)")
+    if counts.empty:
+        print("   No data for southern states from 2022 onwards")
+        return
 
-q2_df = aqi_df[aqi_df['date'] >= datetime(2022, 1, 1)].copy()
-q2_df = q2_df[q2_df['state'].isin(southern_states)]
-
-if len(q2_df) > 0:
-    for state in southern_states:
-        state_df = q2_df[q2_df['state'] == state]
-        if len(state_df) == 0:
-            continue
-            
-        pollutants = state_df['prominent_pollutants'].dropna().str.split(',').explode().str.strip()
-        counts = pollutants.value_counts()
-        
+    for state, state_counts in counts.groupby('state', sort=False):
+        names = state_counts['pollutant'].tolist()
+        values = state_counts['count'].tolist()
         print(f"\n[STATE] {state}:")
-        if len(counts) >= 2:
-            print(f"   Top 2 pollutants:    {counts.index[0]} ({counts.iloc[0]}), {counts.index[1]} ({counts.iloc[1]})")
-        if len(counts) >= 4:
-            print(f"   Bottom 2 pollutants: {counts.index[-2]} ({counts.iloc[-2]}), {counts.index[-1]} ({counts.iloc[-1]})")
-        elif len(counts) > 0:
-            print(f"   All pollutants: {dict(counts)}")
-else:
-    print("   No data for southern states from 2022 onwards")
+        if len(names) >= 2:
+            print(f"   Top 2 pollutants:    {names[0]} ({values[0]}), {names[1]} ({values[1]})")
+        if len(names) >= 4:
+            print(f"   Bottom 2 pollutants: {names[-2]} ({values[-2]}), {names[-1]} ({values[-1]})")
+        elif len(names) > 0:
+            print(f"   All pollutants: {dict(zip(names, values))}")
 
 # =====================================================
 # Q3: AQI on weekends vs weekdays in metro cities
 #     (last 1 year)
 # =====================================================
 
-print("\n" + "="*70)
-print("Q3: AQI WEEKENDS VS WEEKDAYS IN METRO CITIES (Last 1 Year)")
-print("="*70)
-
-metro_cities = ['Delhi', 'Mumbai', 'Chennai', 'Kolkata', 'Bengaluru', 'Bangalore', 
-                'Hyderabad', 'Ahmedabad', 'Pune']
+def print_q3(result):
+    header("Q3: AQI WEEKENDS VS WEEKDAYS IN METRO CITIES (Last 1 Year)")
+    if result['rows'] == 0:
+        return
 
-latest_date = aqi_df['date'].max()
-one_year_ago = latest_date - pd.DateOffset(years=1)
-
-q3_df = aqi_df[(aqi_df['date'] >= one_year_ago) & (aqi_df['area'].isin(metro_cities))].copy()
-q3_df['day_of_week'] = q3_df['date'].dt.dayofweek
-q3_df['is_weekend'] = q3_df['day_of_week'] >= 5
-
-if len(q3_df) > 0:
-    print(f"\n[PERIOD] {one_year_ago.strftime('%Y-%m-%d')} to {latest_date.strftime('%Y-%m-%d')}")
+    print(f"\n[PERIOD] {result['start'].strftime('%Y-%m-%d')} to {result['end'].strftime('%Y-%m-%d')}")
     print(f"\n{'City':<20} | {'Weekday Avg':<12} | {'Weekend Avg':<12} | {'Difference':<12} | {'Better On':<10}")
     print("-" * 70)
-    
-    for city in metro_cities:
-        city_df = q3_df[q3_df['area'] == city]
-        if len(city_df) > 10:
-            weekday_avg = city_df[~city_df['is_weekend']]['aqi_value'].mean()
-            weekend_avg = city_df[city_df['is_weekend']]['aqi_value'].mean()
-            diff = weekday_avg - weekend_avg
-            better = "Weekend" if diff > 0 else "Weekday"
-            print(f"{city:<20} | {weekday_avg:>10.1f} | {weekend_avg:>10.1f} | {abs(diff):>10.1f} | {better:<10}")
-    
-    overall_weekday = q3_df[~q3_df['is_weekend']]['aqi_value'].mean()
-    overall_weekend = q3_df[q3_df['is_weekend']]['aqi_value'].mean()
+
+    for row in result['cities'].itertuples():
+        print(f"{row.area:<20} | {row.weekday_avg:>10.1f} | {row.weekend_avg:>10.1f} | {abs(row.difference):>10.1f} | {row.better_on:<10}")
+
+    overall_weekday = result['overall']['weekday_avg']
+    overall_weekend = result['overall']['weekend_avg']
     print("-" * 70)
     print(f"{'OVERALL':<20} | {overall_weekday:>10.1f} | {overall_weekend:>10.1f} | {abs(overall_weekday-overall_weekend):>10.1f} | {'Weekend' if overall_weekday > overall_weekend else 'Weekday':<10}")
 
@@ -143,69 +100,45 @@ if len(q3_df) > 0:
 #     (Top 10 states with high distinct areas)
 # =====================================================
 
-print("\n" + "="*70)
-print("Q4: MONTHS WITH WORST AIR QUALITY (Top 10 States by Distinct Areas)")
-print("="*70)
-
-state_areas = aqi_df.groupby('state')['area'].nunique().sort_values(ascending=False)
-top_10_states = state_areas.head(10).index.tolist()
+def print_q4(result):
+    header("Q4: MONTHS WITH WORST AIR QUALITY (Top 10 States by Distinct Areas)")
+    if result['months'].empty:
+        return
 
-q4_df = aqi_df[aqi_df['state'].isin(top_10_states)].copy()
-q4_df['month'] = q4_df['date'].dt.month
-q4_df['month_name'] = q4_df['date'].dt.strftime('%B')
-
-if len(q4_df) > 0:
-    monthly_avg = q4_df.groupby(['month', 'month_name'])['aqi_value'].mean().reset_index()
-    monthly_avg = monthly_avg.sort_values('aqi_value', ascending=False)
-    
     print(f"\n{'Rank':<6} | {'Month':<15} | {'Avg AQI':<10}")
     print("-" * 40)
-    
-    for rank, (_, row) in enumerate(monthly_avg.iterrows(), 1):
+
+    for rank, row in enumerate(result['months'].itertuples(), 1):
         indicator = "[BAD]" if rank <= 3 else "[MED]" if rank <= 6 else "[GOOD]"
-        print(f"{indicator} {rank:<2} | {row['month_name']:<15} | {row['aqi_value']:.1f}")
-    
-    print(f"\n[INFO] Top 10 states analyzed: {', '.join(top_10_states)}")
+        print(f"{indicator} {rank:<2} | {row.month_name:<15} | {row.aqi_value:.1f}")
+
+    print(f"\n[INFO] Top 10 states analyzed: {', '.join(result['states'])}")
 
 # =====================================================
 # Q5: Bengaluru - Days under each air quality category
 #     (March to May 2025)
 # =====================================================
 
-print("\n" + "="*70)
-print("Q5: BENGALURU - DAYS BY AIR QUALITY CATEGORY (Mar-May 2025)")
-print("="*70)
-
-q5_df = aqi_df[
-    (aqi_df['area'].isin(['Bengaluru', 'Bangalore'])) & 
-    (aqi_df['date'] >= datetime(2025, 3, 1)) & 
-    (aqi_df['date'] <= datetime(2025, 5, 31))
-].copy()
-
-if len(q5_df) > 0:
-    category_counts = q5_df['air_quality_status'].value_counts()
-    
-    print(f"\n{'Category':<20} | {'Days':<10} | {'Percentage':<10}")
-    print("-" * 45)
-    
-    total_days = len(q5_df)
-    for category, count in category_counts.items():
-        pct = (count / total_days) * 100
-        print(f"{str(category):<20} | {count:<10} | {pct:.1f}%")
-    
-    print(f"\nTotal days analyzed: {total_days}")
-else:
+def print_q5(result):
+    header("Q5: BENGALURU - DAYS BY AIR QUALITY CATEGORY (Mar-May 2025)")
+    if not result['fallback']:
+        print(f"\n{'Category':<20} | {'Days':<10} | {'Percentage':<10}")
+        print("-" * 45)
+
+        total_days = result['total_days']
+        for category, count in result['counts'].items():
+            pct = (count / total_days) * 100
+            print(f"{str(category):<20} | {count:<10} | {pct:.1f}%")
+
+        print(f"\nTotal days analyzed: {total_days}")
+        return
+
     print("   No data for Bengaluru in Mar-May 2025. Using most recent available data...")
-    blr_df = aqi_df[aqi_df['area'].isin(['Bengaluru', 'Bangalore'])]
-    if len(blr_df) > 0:
-        print(f"   Available date range: {blr_df['date'].min()} to {blr_df['date'].max()}")
-        latest = blr_df['date'].max()
-        three_months_ago = latest - pd.DateOffset(months=3)
-        recent_df = blr_df[blr_df['date'] >= three_months_ago]
-        if len(recent_df) > 0:
-            print(f"\n   Using period: {three_months_ago.strftime('%Y-%m-%d')} to {latest.strftime('%Y-%m-%d')}")
-            category_counts = recent_df['air_quality_status'].value_counts()
-            for category, count in category_counts.items():
+    if result['available']:
+        print(f"   Available date range: {result['available'][0]} to {result['available'][1]}")
+        if result['total_days'] > 0:
+            print(f"\n   Using period: {result['start'].strftime('%Y-%m-%d')} to {result['end'].strftime('%Y-%m-%d')}")
+            for category, count in result['counts'].items():
                 print(f"   {str(category):<20} | {count} days")
 
 # =====================================================
@@ -213,90 +146,40 @@ else:
 #     (Last 3 years)
 # =====================================================
 
-print("\n" + "="*70)
-print("Q6: TOP 2 DISEASE OUTBREAKS PER STATE WITH AVERAGE AQI (Last 3 Years)")
-print("="*70)
-
-current_year = datetime.now().year
-disease_df['year'] = pd.to_numeric(disease_df['year'], errors='coerce')
-q6_disease = disease_df[disease_df['year'] >= current_year - 3].copy()
-
-disease_col = None
-for col in disease_df.columns:
-    if 'disease' in col.lower() or 'illness' in col.lower():
-        disease_col = col
-        break
-
-if disease_col and len(q6_disease) > 0:
-    q6_disease['cases'] = pd.to_numeric(q6_disease['cases'], errors='coerce').fillna(0)
-    state_disease = q6_disease.groupby(['state', disease_col])['cases'].sum().reset_index()
-    states = q6_disease['state'].unique()[:10]
-    
-    aqi_3yr = aqi_df[aqi_df['date'] >= datetime(current_year - 3, 1, 1)]
-    state_aqi = aqi_3yr.groupby('state')['aqi_value'].mean()
-    
+def print_q6(table):
+    header("Q6: TOP 2 DISEASE OUTBREAKS PER STATE WITH AVERAGE AQI (Last 3 Years)")
+    if table.empty:
+        print("   Disease data not available for the last 3 years")
+        return
+
     print(f"\n{'State':<20} | {'Top Disease #1':<25} | {'Top Disease #2':<25} | {'Avg AQI':<10}")
     print("-" * 90)
-    
-    for state in states:
-        state_data = state_disease[state_disease['state'] == state].nlargest(2, 'cases')
-        if len(state_data) >= 2:
-            d1 = str(state_data.iloc[0][disease_col])[:23]
-            d2 = str(state_data.iloc[1][disease_col])[:23]
-            avg_aqi = state_aqi.get(state, 'N/A')
-            if isinstance(avg_aqi, float):
-                avg_aqi = f"{avg_aqi:.1f}"
-            print(f"{state:<20} | {d1:<25} | {d2:<25} | {str(avg_aqi):<10}")
-else:
-    print("   Disease data not available or column not found")
+
+    for row in table.itertuples():
+        d1 = str(row.disease_1)[:23]
+        d2 = str(row.disease_2)[:23]
+        print(f"{row.state:<20} | {d1:<25} | {d2:<25} | {fmt_aqi(row.avg_aqi):<10}")
 
 # =====================================================
 # Q7: Top 5 EV adoption states - AQI comparison
 # =====================================================
 
-print("\n" + "="*70)
-print("Q7: TOP 5 EV ADOPTION STATES VS LOW EV STATES - AQI COMPARISON")
-print("="*70)
-
-ev_df = vehicle_df[vehicle_df['fuel'].str.lower().str.contains('electric', na=False)].copy()
-ev_df['value'] = pd.to_numeric(ev_df['value'], errors='coerce')
-
-if len(ev_df) > 0:
-    ev_by_state = ev_df.groupby('state')['value'].sum().sort_values(ascending=False)
-    
-    top_5_ev = ev_by_state.head(5).index.tolist()
-    bottom_5_ev = ev_by_state.tail(5).index.tolist()
-    
-    state_aqi_all = aqi_df.groupby('state')['aqi_value'].mean()
-    
-    print("\n[HIGH EV] TOP 5 EV ADOPTION STATES:")
-    print(f"{'State':<25} | {'EV Registrations':<20} | {'Avg AQI':<10}")
-    print("-" * 60)
-    for state in top_5_ev:
-        ev_count = ev_by_state.get(state, 0)
-        aqi = state_aqi_all.get(state, 'N/A')
-        if isinstance(aqi, float):
-            aqi_str = f"{aqi:.1f}"
-        else:
-            aqi_str = str(aqi)
-        print(f"{state:<25} | {ev_count:>18,} | {aqi_str:<10}")
-    
-    avg_aqi_top_ev = state_aqi_all[state_aqi_all.index.isin(top_5_ev)].mean()
-    
-    print("\n[LOW EV] BOTTOM 5 EV ADOPTION STATES:")
-    print(f"{'State':<25} | {'EV Registrations':<20} | {'Avg AQI':<10}")
-    print("-" * 60)
-    for state in bottom_5_ev:
-        ev_count = ev_by_state.get(state, 0)
-        aqi = state_aqi_all.get(state, 'N/A')
-        if isinstance(aqi, float):
-            aqi_str = f"{aqi:.1f}"
-        else:
-            aqi_str = str(aqi)
-        print(f"{state:<25} | {ev_count:>18,} | {aqi_str:<10}")
-    
-    avg_aqi_bottom_ev = state_aqi_all[state_aqi_all.index.isin(bottom_5_ev)].mean()
-    
+def print_q7(result):
+    header("Q7: TOP 5 EV ADOPTION STATES VS LOW EV STATES - AQI COMPARISON")
+    if result['ev_by_state'].empty:
+        print("   No electric vehicle data found in vehicle registration dataset")
+        return
+
+    for label, side in (("[HIGH EV] TOP 5 EV ADOPTION STATES:", result['top']),
+                        ("[LOW EV] BOTTOM 5 EV ADOPTION STATES:", result['bottom'])):
+        print(f"\n{label}")
+        print(f"{'State':<25} | {'EV Registrations':<20} | {'Avg AQI':<10}")
+        print("-" * 60)
+        for row in side.itertuples():
+            print(f"{row.state:<25} | {row.ev_registrations:>18,} | {fmt_aqi(row.avg_aqi):<10}")
+
+    avg_aqi_top_ev = result['avg_aqi_top']
+    avg_aqi_bottom_ev = result['avg_aqi_bottom']
     print("\n[SUMMARY] COMPARISON:")
     print(f"   Average AQI in Top 5 EV states:    {avg_aqi_top_ev:.1f}")
     print(f"   Average AQI in Bottom 5 EV states: {avg_aqi_bottom_ev:.1f}")
@@ -304,10 +187,80 @@ if len(ev_df) > 0:
         print(f"   [OK] High EV adoption states have {avg_aqi_bottom_ev - avg_aqi_top_ev:.1f} points BETTER air quality")
     else:
         print(f"   [WARN] High EV adoption states have {avg_aqi_top_ev - avg_aqi_bottom_ev:.1f} points WORSE air quality")
-else:
-    print("   No electric vehicle data found in vehicle registration dataset")
 
-print("\n" + "="*70)
-print("ANALYSIS COMPLETE")
-print("="*70)
-print("\nThese results can be cross-verified with the Power BI dashboard.")
+# =====================================================
+# Main Execution
+# =====================================================
+
+PRINTERS = {
+    'q1': print_q1,
+    'q2': print_q2,
+    'q3': print_q3,
+    'q4': print_q4,
+    'q5': print_q5,
+    'q6': print_q6,
+    'q7': print_q7,
+}
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Answer the Primary Analysis questions")
+    parser.add_argument('--backend', choices=['pandas', 'sql'], default='pandas',
+                        help="pandas: in memory from the staging cache; sql: aggregate queries in MySQL")
+    parser.add_argument('--question', action='append', choices=list(QUESTIONS),
+                        help="answer only this question (repeatable; default all)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"questions answered concurrently (default {DEFAULT_WORKERS})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="recompute every answer instead of using the result cache")
+    parser.add_argument('--output', metavar='DIR',
+                        help="also write results.json, Parquet tables and timings to DIR")
+    parser.add_argument('--check-parity', action='store_true',
+                        help="answer on both backends and compare instead of printing the report")
+    add_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_from_args(args)
+    questions = args.question or list(QUESTIONS)
+
+    def load_and_report():
+        print("Loading datasets...")
+        data = load_datasets()
+        print(f"AQI records: {len(data['aqi']):,}")
+        print(f"Disease records: {len(data['disease']):,}")
+        print(f"Vehicle records: {len(data['vehicle']):,}")
+        return data
+
+    if args.check_parity:
+        from analysis_sql import check_parity
+        report = check_parity(load_and_report(), questions=questions)
+        header("PARITY CHECK: PANDAS VS SQL BACKEND")
+        for name, differences in report.items():
+            print(f"   {name}: {'[OK] identical' if not differences else f'[MISMATCH] {len(differences)} difference(s)'}")
+            for difference in differences[:5]:
+                print(f"      {difference}")
+        if any(report.values()):
+            sys.exit(1)
+        return
+
+    results, timings, cached = run_questions(questions, backend=args.backend, workers=args.workers,
+                                             use_cache=not args.no_cache, load=load_and_report)
+    if cached:
+        print(f"Served from result cache: {', '.join(cached)}")
+    for name, result in results.items():
+        PRINTERS[name](result)
+
+    if args.output:
+        print_timings(timings, cached)
+        json_path = write_results(results, timings, args.output, args.backend, cached)
+        print(f"\n[OK] Structured results written to {json_path}")
+
+    print("\n" + "="*70)
+    print("ANALYSIS COMPLETE")
+    print("="*70)
+    print("\nThese results can be cross-verified with the Power BI dashboard.")
+
+if __name__ == "__main__":
+    main()
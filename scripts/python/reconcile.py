@@ -0,0 +1,384 @@
+"""
+AirPure AQI Analytics - Source vs Database Reconciliation
+==========================================================
+Finds exactly which rows differ between the staged source files and the
+MySQL tables, while moving almost no row data over the network.
+
+Every row is normalized to one string (columns in table order, NULL as
+\\N, DECIMALs at their scale, dates as YYYY-MM-DD) and hashed to 60 bits
+the same way on both sides: SHA1 in MySQL, hashlib in Python. MySQL then
+returns only COUNT(*) and SUM(hash) per key range:
+
+    aqi_daily              month -> day -> state -> area
+    disease_outbreak       year/week -> state -> district -> disease
+    vehicle_registration   year/month -> state -> rto
+    population             year -> state -> gender
+
+Ranges whose count and hash sum match the source are done. Each
+mismatching range is split along the next key with one more GROUP BY
+restricted to that range, so only the mismatching branches are
+descended. Once a range holds at most LEAF_ROWS rows (or the keys run
+out), the row hashes themselves are fetched and compared, which gives:
+
+    missing in MySQL    source rows (by staged row number) not in the table
+    extra in MySQL      table rows (by id) not in the source
+
+A clean 10M-row table costs one aggregate query; text keys are compared
+byte-wise, so 'Delhi' and 'DELHI' are different ranges.
+
+Usage:
+    python reconcile.py [--table disease_outbreak] [--output differences.csv]
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from collections import Counter
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+
+from sources import FILES
+from staging import read_table
+
+# =====================================================
+# Configuration
+# =====================================================
+
+# Ranges with at most this many table rows are compared row by row
+LEAF_ROWS = 256
+
+# Differing rows fetched in full per table for the report
+MAX_REPORTED_ROWS = 50
+
+# Normalized-row separator and NULL marker
+SEPARATOR = '|'
+NULL_MARKER = '\\N'
+
+HASH_HEX_DIGITS = 15  # 60-bit hashes: sums of millions of rows stay exact in MySQL
+
+INTEGER_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint', 'year'}
+
+# =====================================================
+# Key Ranges
+# =====================================================
+
+def month_key(col):
+    """YYYYMM of a DATE column; ranges filter on the date itself (index friendly)"""
+    def where(value):
+        if value is None:
+            return f"`{col}` IS NULL", ()
+        year, month = divmod(int(value), 100)
+        start = pd.Timestamp(year, month, 1)
+        return f"`{col}` >= %s AND `{col}` < %s", (start.date(), (start + pd.offsets.MonthBegin()).date())
+    return {
+        'select': f"YEAR(`{col}`) * 100 + MONTH(`{col}`)",
+        'where': where,
+        'python': lambda df: df[col].dt.year * 100 + df[col].dt.month,
+    }
+
+def day_key(col):
+    """A DATE column's value"""
+    def where(value):
+        if value is None:
+            return f"`{col}` IS NULL", ()
+        return f"`{col}` = %s", (value,)
+    return {
+        'select': f"`{col}`",
+        'where': where,
+        'python': lambda df: df[col].dt.date,
+    }
+
+def int_key(col):
+    """An integer column's value"""
+    def where(value):
+        if value is None:
+            return f"`{col}` IS NULL", ()
+        return f"`{col}` = %s", (int(value),)
+    return {
+        'select': f"`{col}`",
+        'where': where,
+        'python': lambda df: df[col],
+    }
+
+def text_key(col):
+    """A text column compared byte-wise (the collation would merge case variants)"""
+    def where(value):
+        if value is None:
+            return f"`{col}` IS NULL", ()
+        # The collation comparison can use the index; BINARY makes it exact
+        return f"`{col}` = %s AND BINARY `{col}` = %s", (value, value)
+    return {
+        'select': f"CAST(`{col}` AS BINARY)",
+        'where': where,
+        'python': lambda df: df[col].astype(object),
+    }
+
+# Key levels per table, coarsest first; a level may combine several keys
+KEY_LEVELS = {
+    'aqi_daily': [[month_key('date')], [day_key('date')], [text_key('state')], [text_key('area')]],
+    'disease_outbreak': [[int_key('year'), int_key('week')], [text_key('state')], [text_key('district')],
+                         [text_key('disease_name')]],
+    'vehicle_registration': [[int_key('year'), int_key('month')], [text_key('state')], [text_key('rto')]],
+    'population': [[int_key('year')], [text_key('state')], [text_key('gender')]],
+}
+
+def _key_value(value):
+    """Key values from either side in one comparable form (None for NULL)"""
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8')
+    if isinstance(value, (np.integer, float, Decimal)):
+        return int(value)
+    return value
+
+# =====================================================
+# Row Hashes
+# =====================================================
+
+def table_columns(engine, table_name):
+    """[(column, data type, numeric scale)] of a table in order, without id"""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT COLUMN_NAME, DATA_TYPE, NUMERIC_SCALE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+            (table_name,)).fetchall()
+    return [(name, data_type.lower(), scale) for name, data_type, scale in rows if name != 'id']
+
+def sql_row_hash(columns):
+    """SQL expression hashing a normalized row to an unsigned 60-bit integer"""
+    parts = []
+    for name, data_type, scale in columns:
+        if data_type in ('float', 'double'):
+            expr = f"CAST(CAST(`{name}` AS DECIMAL(65,6)) AS CHAR)"
+        elif data_type in INTEGER_TYPES or data_type in ('decimal', 'date', 'datetime', 'timestamp'):
+            expr = f"CAST(`{name}` AS CHAR)"
+        else:
+            expr = f"`{name}`"
+        # '\\\\N' in this source is the SQL literal '\\N', i.e. the string \N
+        parts.append(f"COALESCE({expr}, '\\\\N')")
+    return (f"CAST(CONV(LEFT(SHA1(CONCAT_WS('{SEPARATOR}', {', '.join(parts)})), {HASH_HEX_DIGITS}), 16, 10) "
+            f"AS UNSIGNED)")
+
+def _format_decimal(value, scale):
+    """A number as MySQL stores it in a DECIMAL of this scale (half up)"""
+    return str(Decimal(repr(float(value))).quantize(Decimal(1).scaleb(-scale), rounding=ROUND_HALF_UP))
+
+def _normalized(series, data_type, scale):
+    """Column values as the strings MySQL's CAST(... AS CHAR) produces"""
+    if data_type in ('date', 'datetime', 'timestamp'):
+        values = pd.to_datetime(series, errors='coerce')
+        text = values.dt.strftime('%Y-%m-%d' if data_type == 'date' else '%Y-%m-%d %H:%M:%S')
+        return text.where(values.notna(), NULL_MARKER).astype(object)
+    # Each distinct value is formatted once
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    if data_type in INTEGER_TYPES:
+        formatted = [str(int(value)) for value in uniques]
+    elif data_type == 'decimal':
+        formatted = [_format_decimal(value, scale or 0) for value in uniques]
+    elif data_type in ('float', 'double'):
+        formatted = [_format_decimal(value, 6) for value in uniques]
+    else:
+        formatted = [str(value) for value in uniques]
+    lookup = np.array(formatted + [NULL_MARKER], dtype=object)
+    return pd.Series(lookup[codes], index=series.index)
+
+def source_row_hashes(df, columns):
+    """uint64 hash of every normalized source row (same values as sql_row_hash)"""
+    joined = None
+    for name, data_type, scale in columns:
+        values = _normalized(df[name], data_type, scale) if name in df.columns else \
+            pd.Series(NULL_MARKER, index=df.index, dtype=object)
+        joined = values if joined is None else joined + SEPARATOR + values
+    hashes = [int(hashlib.sha1(text.encode('utf-8')).hexdigest()[:HASH_HEX_DIGITS], 16) for text in joined]
+    return np.array(hashes, dtype='uint64')
+
+# =====================================================
+# Bisection
+# =====================================================
+
+def _query(session, sql, params=()):
+    """Run one query for a reconciliation session, counting it and its rows"""
+    session['queries'] += 1
+    with session['engine'].connect() as conn:
+        rows = conn.exec_driver_sql(sql, tuple(params)).fetchall()
+    session['rows_fetched'] += len(rows)
+    return rows
+
+def _where(filters):
+    clauses = [clause for clause, _ in filters] or ['1 = 1']
+    params = [param for _, values in filters for param in values]
+    return ' AND '.join(f"({clause})" for clause in clauses), params
+
+def _db_groups(session, keys, filters):
+    """{key tuple: (count, hash sum mod 2**64)} for one level inside a range"""
+    selects = ', '.join(f"{key['select']} AS k{i}" for i, key in enumerate(keys))
+    group = ', '.join(f"k{i}" for i in range(len(keys)))
+    where, params = _where(filters)
+    sql = (f"SELECT {group}, COUNT(*), SUM(h) FROM (SELECT {selects}, {session['row_hash']} AS h "
+           f"FROM `{session['table']}` WHERE {where}) t GROUP BY {group}")
+    groups = {}
+    for row in _query(session, sql, params):
+        key = tuple(_key_value(value) for value in row[:len(keys)])
+        groups[key] = (int(row[-2]), int(row[-1] or 0) % (1 << 64))
+    return groups
+
+def _source_groups(frame, keys):
+    """Same as _db_groups for the source rows in the range, plus their positions"""
+    key_values = [key['python'](frame).map(_key_value) for key in keys]
+    labels = pd.Series(list(zip(*key_values)), index=frame.index) if len(frame) else pd.Series(dtype=object)
+    groups = {}
+    for label, positions in labels.groupby(labels, sort=False).groups.items():
+        hashes = frame.loc[positions, '_hash'].to_numpy(dtype='uint64')
+        groups[label] = (len(hashes), int(hashes.sum(dtype='uint64')), positions)
+    return groups
+
+def _compare_rows(session, frame, filters):
+    """Row-level comparison of one range by fetching only its row hashes"""
+    where, params = _where(filters)
+    rows = _query(session, f"SELECT id, {session['row_hash']} FROM `{session['table']}` WHERE {where}", params)
+    db_hashes = Counter()
+    db_ids = {}
+    for row_id, value in rows:
+        value = int(value)
+        db_hashes[value] += 1
+        db_ids.setdefault(value, []).append(row_id)
+    source_hashes = Counter(int(value) for value in frame['_hash'])
+
+    for value, count in (source_hashes - db_hashes).items():
+        positions = frame.index[frame['_hash'].to_numpy() == np.uint64(value)]
+        session['missing'].extend(positions[:count].tolist())
+    for value, count in (db_hashes - source_hashes).items():
+        session['extra'].extend(db_ids[value][:count])
+
+def _bisect(session, frame, levels, filters, db_count=None, db_groups=None):
+    """Descend the key levels below a mismatching range"""
+    if not levels or (db_count is not None and db_count <= LEAF_ROWS):
+        _compare_rows(session, frame, filters)
+        return
+    keys, rest = levels[0], levels[1:]
+    if db_groups is None:
+        db_groups = _db_groups(session, keys, filters)
+    source_groups = _source_groups(frame, keys)
+    for label in set(db_groups) | set(source_groups):
+        db_count_sum = db_groups.get(label, (0, 0))
+        source_count, source_sum, positions = source_groups.get(label, (0, 0, frame.index[:0]))
+        if db_count_sum == (source_count, source_sum):
+            continue
+        sub_filters = filters + [key['where'](value) for key, value in zip(keys, label)]
+        _bisect(session, frame.loc[positions], rest, sub_filters, db_count_sum[0])
+
+def reconcile_table(engine, table_name, source=None):
+    """Compare one table with its staged source
+
+    Returns {'table', 'source_rows', 'db_rows', 'missing' (source row
+    positions), 'extra' (MySQL ids), 'queries', 'rows_fetched', 'seconds'}.
+    """
+    started = time.perf_counter()
+    columns = table_columns(engine, table_name)
+    frame = (source if source is not None else read_table(table_name)).reset_index(drop=True)
+    frame = frame.assign(_hash=source_row_hashes(frame, columns))
+
+    session = {'engine': engine, 'table': table_name, 'row_hash': sql_row_hash(columns),
+               'queries': 0, 'rows_fetched': 0, 'missing': [], 'extra': []}
+    # The first level's groups also give the table totals
+    levels = KEY_LEVELS[table_name]
+    top = _db_groups(session, levels[0], [])
+    _bisect(session, frame, levels, [], db_groups=top)
+    return {
+        'table': table_name,
+        'source_rows': len(frame),
+        'db_rows': sum(count for count, _ in top.values()),
+        'missing': sorted(session['missing']),
+        'extra': sorted(session['extra']),
+        'queries': session['queries'],
+        'rows_fetched': session['rows_fetched'],
+        'seconds': time.perf_counter() - started,
+        'source': frame.drop(columns='_hash'),
+    }
+
+def fetch_rows(engine, table_name, ids):
+    """Full MySQL rows for a few ids"""
+    if not ids:
+        return pd.DataFrame()
+    placeholders = ', '.join(['%s'] * len(ids))
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(f"SELECT * FROM `{table_name}` WHERE id IN ({placeholders})", tuple(ids))
+        return pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def differences_frame(engine, report, limit=MAX_REPORTED_ROWS):
+    """Up to limit differing rows per side as one DataFrame"""
+    missing = report['source'].iloc[report['missing'][:limit]].copy()
+    missing.insert(0, 'source_row', [position + 1 for position in report['missing'][:limit]])
+    missing.insert(0, 'difference', 'missing in MySQL')
+    extra = fetch_rows(engine, report['table'], report['extra'][:limit])
+    if len(extra):
+        extra.insert(0, 'difference', 'extra in MySQL')
+    frame = pd.concat([missing, extra], ignore_index=True)
+    frame.insert(0, 'table', report['table'])
+    if 'source_row' in frame.columns:
+        frame['source_row'] = frame['source_row'].astype('Int64')
+    return frame
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Reconcile the staged sources with the MySQL tables row by row")
+    parser.add_argument('--table', action='append', choices=list(KEY_LEVELS),
+                        help="reconcile only this table (repeatable; default all)")
+    parser.add_argument('--output', metavar='CSV',
+                        help=f"write up to {MAX_REPORTED_ROWS} differing rows per table and side to a CSV file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 80)
+    print("RECONCILIATION REPORT (row hashes, source vs MySQL)")
+    print("=" * 80)
+
+    from db import get_engine
+    engine = get_engine(pool_size=1, max_overflow=0)
+    differences = []
+    clean = True
+    print(f"{'Table Name':<22} | {'Source':>10} | {'MySQL':>10} | {'Missing':>8} | {'Extra':>8} | "
+          f"{'Queries':>7} | {'Fetched':>8}")
+    print("-" * 80)
+    for table_name in args.table or [t for t in FILES if t in KEY_LEVELS]:
+        try:
+            report = reconcile_table(engine, table_name)
+        except Exception as e:
+            clean = False
+            print(f"{table_name:<22} | [ERROR] {e}")
+            continue
+        clean = clean and not report['missing'] and not report['extra']
+        print(f"{table_name:<22} | {report['source_rows']:>10,} | {report['db_rows']:>10,} | "
+              f"{len(report['missing']):>8,} | {len(report['extra']):>8,} | {report['queries']:>7,} | "
+              f"{report['rows_fetched']:>8,}")
+        if report['missing'] or report['extra']:
+            frame = differences_frame(engine, report)
+            differences.append(frame)
+            for _, row in frame.head(10).iterrows():
+                where = f"source row {row['source_row']}" if row['difference'] == 'missing in MySQL' \
+                    else f"id {row['id']}"
+                print(f"    {row['difference']:<17} {where}")
+    print("=" * 80)
+    engine.dispose()
+
+    if args.output and differences:
+        pd.concat(differences, ignore_index=True).to_csv(args.output, index=False)
+        print(f"\nDiffering rows written to {args.output}")
+    if clean:
+        print("\n[SUCCESS] Every row matches its source")
+    else:
+        print("\n[WARNING] Differences found (source rows rejected by the ETL show as missing; see etl_reject)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
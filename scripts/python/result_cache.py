@@ -0,0 +1,228 @@
+"""
+AirPure AQI Analytics - Analysis Result Cache
+==============================================
+On-disk cache of answered analysis questions.
+
+An entry is keyed by the question, the backend, its parameters with
+defaults filled in (so an explicit default and an omitted argument hit
+the same entry) and a fingerprint of everything the answer depends on:
+
+    pandas backend   the fingerprints and declared dtypes of the staged
+                     source files the question reads
+    sql backend      the ETL manifest entries (source sha256 and load
+                     time) of the MySQL tables it reads
+    code             the sha256 of the module defining the question and
+                     of every repository module it imports, directly or
+                     through others (aqi_rollup, sources, staging, ...)
+
+A new source file or ETL load therefore changes the key and old entries
+are simply never hit again. Entries are pickled files; reading one
+refreshes its mtime, and the least recently used entries are evicted
+once the cache exceeds CACHE_MAX_BYTES or CACHE_MAX_ENTRIES.
+"""
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+from datetime import datetime
+
+from etl_incremental import file_fingerprint, load_manifest
+from sources import COLUMN_TYPES
+from staging import source_path, stage_meta
+
+# =====================================================
+# Configuration
+# =====================================================
+
+CACHE_PATH = r'd:\FEB_AQI_P2\data\processed\result_cache'
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_MAX_ENTRIES = 1000
+
+# Bump to drop every existing entry (e.g. after changing answer formats)
+CACHE_VERSION = 1
+
+# load_datasets() key -> source table behind it
+DATASET_TABLES = {
+    'aqi': 'aqi_daily',
+    'rollup': 'aqi_daily',
+    'disease': 'disease_outbreak',
+    'vehicle': 'vehicle_registration',
+}
+
+# Tables each question reads in MySQL (analysis_sql)
+SQL_TABLES = {
+    'q1': ['aqi_daily'],
+    'q2': ['aqi_daily'],
+    'q3': ['aqi_daily'],
+    'q4': ['aqi_daily'],
+    'q5': ['aqi_daily'],
+    'q6': ['disease_outbreak', 'aqi_daily'],
+    'q7': ['vehicle_registration', 'aqi_daily'],
+}
+
+# =====================================================
+# Keys
+# =====================================================
+
+_code_hashes = {}
+
+def _local_modules(path):
+    """Source files of path and of the modules next to it that it imports, transitively"""
+    directory = os.path.dirname(path)
+    found = {}
+    pending = [path]
+    while pending:
+        current = pending.pop()
+        if current in found:
+            continue
+        with open(current, 'rb') as f:
+            found[current] = source = f.read()
+        # Function-level (lazy) imports count too
+        for node in ast.walk(ast.parse(source)):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(directory, name.split('.')[0] + '.py')
+                if os.path.exists(candidate):
+                    pending.append(candidate)
+    return found
+
+def _code_hash(func):
+    """sha256 over the code func's answer depends on (cached per process)"""
+    path = inspect.getsourcefile(func)
+    if path not in _code_hashes:
+        digest = hashlib.sha256()
+        for module_path, source in sorted(_local_modules(path).items()):
+            digest.update(os.path.basename(module_path).encode('utf-8'))
+            digest.update(hashlib.sha256(source).digest())
+        _code_hashes[path] = digest.hexdigest()
+    return _code_hashes[path]
+
+def normalize_params(func, params, data_args=1):
+    """Parameters with defaults applied, as JSON-stable values
+
+    The first data_args positional arguments carry data (DataFrames or an
+    engine) and are not part of the key. current_year=None means "this
+    year", so it is resolved here; otherwise the entry would outlive the
+    year it was computed in.
+    """
+    signature = inspect.signature(func)
+    bound = signature.bind_partial(*([None] * data_args), **params)
+    bound.apply_defaults()
+    skipped = list(signature.parameters)[:data_args]
+    normalized = {name: value for name, value in bound.arguments.items() if name not in skipped}
+    if 'current_year' in normalized and normalized['current_year'] is None:
+        normalized['current_year'] = datetime.now().year
+    return json.loads(json.dumps(normalized, sort_keys=True, default=str))
+
+def data_fingerprint(name, backend):
+    """What the answer to a question depends on, as a JSON-able dict"""
+    if backend == 'sql':
+        from etl_simple import MANIFEST_PATH
+        manifest = load_manifest(MANIFEST_PATH)
+        return {table: [manifest.get(table, {}).get('fingerprint', {}).get('sha256'),
+                        manifest.get(table, {}).get('loaded_at')]
+                for table in SQL_TABLES[name]}
+
+    from analysis_engine import QUESTIONS
+    fingerprint = {}
+    for dataset in QUESTIONS[name][1]:
+        table = DATASET_TABLES[dataset]
+        meta = stage_meta(table) or {}
+        # Reuses the staged sha256 while size and mtime are unchanged
+        current = file_fingerprint(source_path(table), meta.get('fingerprint'))
+        fingerprint[table] = [current['sha256'], COLUMN_TYPES.get(table, {})]
+    return fingerprint
+
+def cache_key(name, backend='pandas', params=None):
+    """Hex key for one question, backend, parameters and data state"""
+    if backend == 'sql':
+        from analysis_sql import SQL_QUESTIONS
+        func, data_args = SQL_QUESTIONS[name], 1
+    else:
+        from analysis_engine import QUESTIONS
+        func, datasets = QUESTIONS[name]
+        data_args = len(datasets)
+    document = {
+        'version': CACHE_VERSION,
+        'question': name,
+        'backend': backend,
+        'params': normalize_params(func, params or {}, data_args),
+        'data': data_fingerprint(name, backend),
+        'code': _code_hash(func),
+        'python': sys.version_info[:2],
+    }
+    encoded = json.dumps(document, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+# =====================================================
+# Storage
+# =====================================================
+
+def _entry_path(key, cache_path=None):
+    return os.path.join(cache_path or CACHE_PATH, f"{key}.pkl")
+
+def cache_get(key, cache_path=None):
+    """Cached answer for a key, or None; a hit counts as a use for LRU"""
+    path = _entry_path(key, cache_path)
+    try:
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        # Missing, truncated, or pickled against code that has since moved
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+def cache_put(key, result, cache_path=None):
+    """Store an answer atomically, then evict down to the size limits"""
+    cache_path = cache_path or CACHE_PATH
+    os.makedirs(cache_path, exist_ok=True)
+    path = _entry_path(key, cache_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    evict(cache_path)
+
+def evict(cache_path=None, max_bytes=CACHE_MAX_BYTES, max_entries=CACHE_MAX_ENTRIES):
+    """Remove least recently used entries beyond the limits; returns how many"""
+    cache_path = cache_path or CACHE_PATH
+    entries = []
+    for entry in os.scandir(cache_path):
+        if entry.name.endswith('.pkl'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort(reverse=True)  # most recently used first
+
+    kept_bytes = 0
+    removed = 0
+    for rank, (_, size, path) in enumerate(entries):
+        kept_bytes += size
+        if rank >= max_entries or kept_bytes > max_bytes:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+def clear_cache(cache_path=None):
+    """Delete every cached answer"""
+    cache_path = cache_path or CACHE_PATH
+    return evict(cache_path, max_bytes=-1, max_entries=0) if os.path.isdir(cache_path) else 0
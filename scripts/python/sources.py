@@ -0,0 +1,352 @@
+"""
+AirPure AQI Analytics - Source Definitions
+===========================================
+Source files, column mappings and the chunked reader/cleaner shared by
+the ETL, the staging cache and the analysis scripts.
+"""
+
+import re
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+
+# =====================================================
+# Configuration
+# =====================================================
+
+BASE_PATH = r'd:\FEB_AQI_P2\AQI_dataset_Original\Dataful_Datasets'
+
+FILES = {
+    'aqi_daily': {
+        'file': 'day-wise-state-wise-air-quality-index-aqi-of-major-cities-and-towns-in-india.csv',
+        'type': 'csv',
+        'encoding': 'utf-8',
+        'loader': 'load_data',
+        'natural_key': ['date', 'state', 'area'],
+        'rollup': 'aqi_monthly_rollup'
+    },
+    'disease_outbreak': {
+        'file': 'master-data-state-district-and-disease-wise-cases-and-death-reported-due-to-outbreak-of-diseases-as-per-weekly-reports-under-idsp.csv',
+        'type': 'csv',
+        'encoding': 'latin-1',
+        'loader': 'executemany',
+        'natural_key': ['year', 'week', 'state', 'district', 'disease_name', 'outbreak_date']
+    },
+    'vehicle_registration': {
+        'file': 'master-data-state-vehicle-class-and-fuel-type-wise-total-number-of-vehicles-registered-in-each-month-in-india.csv',
+        'type': 'csv',
+        'encoding': 'utf-8',
+        'loader': 'load_data',
+        'natural_key': ['year', 'month', 'state', 'rto', 'vehicle_class', 'fuel']
+    },
+    'population': {
+        'file': 'population-projection-of-india-state-and-gender-wise-yearly-projected-urban-population-2011-2036.xlsx',
+        'type': 'excel',
+        'encoding': None,
+        'loader': 'to_sql',
+        'natural_key': ['state', 'year', 'month', 'gender']
+    }
+}
+
+# Column mapping from source to database
+COLUMN_MAPPING = {
+    'aqi_daily': {
+        'date': 'date',
+        'state': 'state',
+        'area': 'area',
+        'number_of_monitoring_stations': 'monitoring_stations',
+        'prominent_pollutants': 'prominent_pollutants',
+        'aqi_value': 'aqi_value',
+        'air_quality_status': 'air_quality_status',
+        'unit': 'unit',
+        'note': 'note'
+    },
+    'disease_outbreak': {
+        'year': 'year',
+        'week': 'week',
+        'outbreak_starting_date': 'outbreak_date',
+        'reporting_date': 'reporting_date',
+        'state': 'state',
+        'district': 'district',
+        'disease / illness name': 'disease_name',
+        'status': 'status',
+        'cases': 'cases',
+        'deaths': 'deaths',
+        'unit': 'unit',
+        'note': 'note'
+    },
+    'vehicle_registration': {
+        'year': 'year',
+        'month': 'month',
+        'state': 'state',
+        'rto': 'rto',
+        'vehicle_class': 'vehicle_class',
+        'fuel': 'fuel',
+        'value': 'value',
+        'unit': 'unit',
+        'note': 'note'
+    },
+    'population': {
+        'state': 'state',
+        'year': 'year',
+        'month': 'month',
+        'gender': 'gender',
+        'value': 'population_thousands'
+    }
+}
+# Declared dtypes applied while parsing (keyed by database column name).
+# Low-cardinality strings are categoricals; small integers are downcast to
+# nullable types so NaN-bearing chunks keep the same dtype.
+COLUMN_TYPES = {
+    'aqi_daily': {
+        'state': 'category',
+        'area': 'category',
+        'monitoring_stations': 'Int16',
+        'prominent_pollutants': 'category',
+        'pollutant_mask': 'Int16',
+        'aqi_value': 'float64',
+        'air_quality_status': 'category',
+        'unit': 'category',
+        'note': 'category'
+    },
+    'disease_outbreak': {
+        'year': 'Int16',
+        'week': 'Int8',
+        'state': 'category',
+        'district': 'category',
+        'disease_name': 'category',
+        'status': 'category',
+        'cases': 'Int32',
+        'deaths': 'Int32',
+        'unit': 'category',
+        'note': 'category'
+    },
+    'vehicle_registration': {
+        'year': 'Int16',
+        'month': 'Int8',
+        'state': 'category',
+        'rto': 'category',
+        'vehicle_class': 'category',
+        'fuel': 'category',
+        'value': 'Int64',
+        'unit': 'category',
+        'note': 'category'
+    },
+    'population': {
+        'state': 'category',
+        'year': 'Int16',
+        'month': 'Int8',
+        'gender': 'category',
+        'population_thousands': 'float64'
+    }
+}
+
+# Explicit source date formats (unparseable values become NaT)
+DATE_FORMATS = {
+    'aqi_daily': {
+        'date': '%d-%m-%Y'
+    },
+    'disease_outbreak': {
+        'outbreak_date': '%d-%m-%Y',
+        'reporting_date': '%d-%m-%Y'
+    }
+}
+
+# Known pollutants and their bit in pollutant_mask (the order of
+# dim_pollutant; bit_position there must match). The mask is derived once
+# at ingest from the comma-joined prominent_pollutants string, so
+# "PM10,CO" and "CO,PM10" encode the same. Unknown names set no bit.
+POLLUTANT_BITS = {
+    'PM2.5': 0,
+    'PM10': 1,
+    'O3': 2,
+    'NO2': 3,
+    'SO2': 4,
+    'CO': 5,
+    'NH3': 6
+}
+
+# Spellings seen in the source, normalized (upper case, no spaces) first
+POLLUTANT_ALIASES = {
+    'PM25': 'PM2.5',
+    'OZONE': 'O3'
+}
+
+# pandas reports skipped malformed lines as "Skipping line N: <reason>"
+BAD_LINE_PATTERN = re.compile(r'Skipping line (\d+): (.*)')
+
+# =====================================================
+# Reading and Cleaning
+# =====================================================
+
+def _record_bad_lines(caught, rejects):
+    """Turn pandas 'Skipping line N: ...' parser warnings into reject records"""
+    for warning in caught:
+        for line in str(warning.message).splitlines():
+            match = BAD_LINE_PATTERN.match(line.strip())
+            if match:
+                rejects.append({'line': int(match.group(1)), 'reason': match.group(2)})
+            elif line.strip():
+                # Unrelated parser warnings are passed on unchanged
+                warnings.warn(line, warning.category)
+
+@contextmanager
+def _bad_lines_to(rejects):
+    """Skip malformed CSV lines into rejects (or raise as before when rejects is None)"""
+    if rejects is None:
+        yield 'error'
+        return
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always', pd.errors.ParserWarning)
+        yield 'warn'
+    _record_bad_lines(caught, rejects)
+
+def read_chunks(file_path, file_info, chunk_size, streaming=False, rejects=None):
+    """Yield raw DataFrame chunks from a source file
+
+    When a rejects list is given, CSV lines the parser cannot split into the
+    header's field count are skipped and appended to it as {'line', 'reason'}
+    (1-based physical line numbers) instead of failing the whole read.
+    """
+    if file_info['type'] != 'csv':
+        # openpyxl has no row iterator in pandas; Excel sources are read whole
+        df = pd.read_excel(file_path)
+        for i in range(0, len(df), chunk_size):
+            yield df.iloc[i:i+chunk_size]
+        return
+    
+    if not streaming:
+        try:
+            with _bad_lines_to(rejects) as on_bad_lines:
+                df = pd.read_csv(file_path, encoding=file_info['encoding'], on_bad_lines=on_bad_lines)
+        except UnicodeDecodeError:
+            print(f"    Retrying with latin-1 encoding...")
+            if rejects is not None:
+                del rejects[:]
+            with _bad_lines_to(rejects) as on_bad_lines:
+                df = pd.read_csv(file_path, encoding='latin-1', on_bad_lines=on_bad_lines)
+        for i in range(0, len(df), chunk_size):
+            yield df.iloc[i:i+chunk_size]
+        return
+    
+    # Streaming: only one chunk is held in memory at a time. A decode error
+    # can surface mid-file, so the retry resumes after the rows already yielded.
+    rows_yielded = 0
+    encoding = file_info['encoding']
+    while True:
+        skip = range(1, rows_yielded + len(rejects or []) + 1) if rows_yielded else None
+        try:
+            reader = pd.read_csv(file_path, encoding=encoding, chunksize=chunk_size, skiprows=skip,
+                                 on_bad_lines='error' if rejects is None else 'warn')
+            with reader:
+                while True:
+                    with _bad_lines_to(rejects):
+                        chunk = next(reader, None)
+                    if chunk is None:
+                        break
+                    rows_yielded += len(chunk)
+                    yield chunk
+            return
+        except UnicodeDecodeError:
+            if encoding == 'latin-1':
+                raise
+            print(f"    Retrying with latin-1 encoding from row {rows_yielded + 1:,}...")
+            encoding = 'latin-1'
+
+def read_source_lines(file_path, encoding, line_numbers):
+    """Raw text of the given 1-based physical lines of a file (for reject records)"""
+    wanted = set(line_numbers)
+    found = {}
+    if not wanted:
+        return found
+    with open(file_path, 'r', encoding=encoding or 'utf-8', errors='replace', newline='') as f:
+        for number, line in enumerate(f, 1):
+            if number in wanted:
+                found[number] = line.rstrip('\r\n')
+                if len(found) == len(wanted):
+                    break
+    return found
+
+def pollutant_code(name):
+    """Canonical pollutant code for one name from prominent_pollutants (None if unknown)"""
+    code = re.sub(r'\s+', '', str(name)).upper()
+    code = POLLUTANT_ALIASES.get(code, code)
+    return code if code in POLLUTANT_BITS else None
+
+def encode_pollutants(text):
+    """Bitmask of the known pollutants in one comma-joined string"""
+    mask = 0
+    for name in str(text).split(','):
+        code = pollutant_code(name)
+        if code is not None:
+            mask |= 1 << POLLUTANT_BITS[code]
+    return mask
+
+def pollutant_mask(values):
+    """Vectorized encode_pollutants over a Series
+
+    Each distinct string is parsed once and the masks are broadcast back by
+    position; missing values encode as 0.
+    """
+    codes, uniques = pd.factorize(values)
+    # factorize codes missing values as -1, which picks the trailing 0
+    masks = np.array([encode_pollutants(text) for text in uniques] + [0], dtype='int16')
+    return pd.Series(masks[codes], index=values.index, dtype='Int16')
+
+def decode_pollutants(mask):
+    """Pollutant codes set in a mask, in bit order"""
+    return [code for code, bit in POLLUTANT_BITS.items() if int(mask) >> bit & 1]
+
+def apply_dtypes(df, dtypes):
+    """Cast columns to their declared dtypes"""
+    for col, dtype in dtypes.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'category':
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+            elif not df[col].cat.categories.is_monotonic_increasing:
+                # Dictionary-encoded reads keep first-seen order; groupby expects sorted
+                df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+        elif df[col].dtype != dtype:
+            values = pd.to_numeric(df[col], errors='coerce')
+            if dtype.startswith('Int'):
+                # Nullable integer casts reject fractional values
+                values = values.round()
+            df[col] = values.astype(dtype)
+    return df
+
+def prepare_chunk(df, table_name, column_map):
+    """Clean, rename, project, date-parse and type a raw chunk"""
+    with stage('etl.clean', table=table_name, rows=len(df)):
+        # Clean column names (lowercase, strip whitespace)
+        df.columns = df.columns.str.strip().str.lower()
+        
+        # Rename columns to match database schema
+        rename_map = {}
+        for src_col, db_col in column_map.items():
+            src_col_clean = src_col.lower().strip()
+            if src_col_clean in df.columns:
+                rename_map[src_col_clean] = db_col
+        
+        df = df.rename(columns=rename_map)
+        
+        # Keep only columns that exist in mapping
+        valid_cols = [col for col in column_map.values() if col in df.columns]
+        df = df[valid_cols]
+    
+    # Parse dates and apply declared dtypes
+    with stage('etl.parse_dates', table=table_name, rows=len(df)):
+        for col, fmt in DATE_FORMATS.get(table_name, {}).items():
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], format=fmt, errors='coerce')
+    with stage('etl.types', table=table_name, rows=len(df)):
+        if 'prominent_pollutants' in df.columns:
+            df['pollutant_mask'] = pollutant_mask(df['prominent_pollutants'])
+        df = apply_dtypes(df, COLUMN_TYPES.get(table_name, {}))
+    
+    return df
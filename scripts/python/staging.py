@@ -0,0 +1,181 @@
+"""
+AirPure AQI Analytics - Columnar Staging Cache
+===============================================
+Converts each source in FILES once into a typed Parquet file (cleaned,
+renamed, dates parsed) and serves every later read from it.
+
+A sidecar JSON next to each Parquet file records the fingerprint of the
+source it was built from; when the source changes the stage is rebuilt
+on next access. etl_simple.py, primary_analysis.py and verify_counts.py
+all read through this module.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etl_incremental import file_fingerprint, same_content
+from sources import (BASE_PATH, COLUMN_MAPPING, COLUMN_TYPES, FILES, apply_dtypes, prepare_chunk,
+                     read_chunks, read_source_lines)
+
+# =====================================================
+# Configuration
+# =====================================================
+
+STAGING_PATH = r'd:\FEB_AQI_P2\data\processed\staging'
+
+# Rows per read while building a stage (bounds memory for large sources)
+BUILD_CHUNK_SIZE = 100000
+
+# =====================================================
+# Helpers
+# =====================================================
+
+def _paths(table_name):
+    """Parquet and sidecar paths for a table"""
+    base = os.path.join(STAGING_PATH, table_name)
+    return base + '.parquet', base + '.json'
+
+def read_meta(meta_path):
+    """Read a JSON sidecar (None when missing)"""
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _stable_types(chunk, dtypes):
+    """Give every chunk the same column types so they share one Parquet schema"""
+    for col in chunk.columns:
+        if dtypes.get(col) == 'category':
+            # Per-chunk category sets differ; Parquet dictionary-encodes on disk
+            # and readers get categoricals back through read_dictionary
+            chunk[col] = chunk[col].astype('string')
+            continue
+        if col in dtypes or pd.api.types.is_datetime64_any_dtype(chunk[col]):
+            continue
+        if pd.api.types.is_numeric_dtype(chunk[col]):
+            # Integer columns read as float because of NaNs stay integers
+            values = chunk[col].dropna()
+            integral = pd.api.types.is_integer_dtype(chunk[col]) or (values == values.round()).all()
+            chunk[col] = chunk[col].astype('Int64' if integral else 'float64')
+        else:
+            chunk[col] = chunk[col].astype('string')
+    return chunk
+
+def source_path(table_name):
+    """Absolute path of a table's source file"""
+    return os.path.join(BASE_PATH, FILES[table_name]['file'])
+
+# =====================================================
+# Building and Reading Stages
+# =====================================================
+
+def build_stage(table_name):
+    """Convert one source file into its Parquet stage"""
+    file_info = FILES[table_name]
+    parquet_path, meta_path = _paths(table_name)
+    os.makedirs(STAGING_PATH, exist_ok=True)
+
+    fingerprint = file_fingerprint(source_path(table_name))
+    tmp_path = parquet_path + '.tmp'
+    writer = None
+    rows = 0
+    rejects = []
+    try:
+        for raw_chunk in read_chunks(source_path(table_name), file_info, BUILD_CHUNK_SIZE,
+                                     streaming=True, rejects=rejects):
+            chunk = prepare_chunk(raw_chunk, table_name, COLUMN_MAPPING[table_name])
+            chunk = _stable_types(chunk, COLUMN_TYPES.get(table_name, {}))
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, parquet_path)
+
+    # Malformed source lines are kept with their text for the loader's rejects table
+    raw_lines = read_source_lines(source_path(table_name), file_info['encoding'],
+                                  [reject['line'] for reject in rejects])
+    for reject in rejects:
+        reject['raw'] = raw_lines.get(reject['line'])
+    if rejects:
+        print(f"    [WARN] {len(rejects):,} malformed lines skipped while staging {table_name}")
+
+    meta = {
+        'source': file_info['file'],
+        'fingerprint': fingerprint,
+        'column_types': COLUMN_TYPES.get(table_name, {}),
+        'rows': rows,
+        'rejects': rejects,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    return parquet_path
+
+def ensure_stage(table_name):
+    """Return the Parquet path for a table, rebuilding it if the source or declared types changed"""
+    parquet_path, meta_path = _paths(table_name)
+    meta = read_meta(meta_path)
+    current_types = COLUMN_TYPES.get(table_name, {})
+    if meta and os.path.exists(parquet_path) and meta.get('column_types') == current_types:
+        previous = meta['fingerprint']
+        if same_content(file_fingerprint(source_path(table_name), previous), previous):
+            return parquet_path
+    print(f"  Staging {table_name} from {FILES[table_name]['file'][:50]}...")
+    return build_stage(table_name)
+
+def _category_columns(table_name):
+    """Columns declared as categoricals for a table"""
+    return [col for col, dtype in COLUMN_TYPES.get(table_name, {}).items() if dtype == 'category']
+
+def read_table(table_name, columns=None):
+    """Read a whole staged table as a DataFrame with its declared dtypes"""
+    table = pq.read_table(ensure_stage(table_name), columns=columns,
+                          read_dictionary=_category_columns(table_name))
+    return apply_dtypes(table.to_pandas(), COLUMN_TYPES.get(table_name, {}))
+
+def iter_table(table_name, batch_size, columns=None, start_row=0):
+    """Yield a staged table as DataFrames of at most batch_size rows, from start_row on
+
+    Row groups entirely before start_row are skipped without being read.
+    """
+    parquet_file = pq.ParquetFile(ensure_stage(table_name), read_dictionary=_category_columns(table_name))
+    row_groups = []
+    offset = start_row
+    for i in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(i).num_rows
+        if not row_groups and offset >= group_rows:
+            offset -= group_rows
+        else:
+            row_groups.append(i)
+    if not row_groups:
+        return
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns, row_groups=row_groups):
+        if offset:
+            skipped = min(offset, batch.num_rows)
+            batch = batch.slice(skipped)
+            offset -= skipped
+            if batch.num_rows == 0:
+                continue
+        yield apply_dtypes(batch.to_pandas(), COLUMN_TYPES.get(table_name, {}))
+
+def staged_row_count(table_name):
+    """Row count of a staged table, read from Parquet metadata only"""
+    return pq.ParquetFile(ensure_stage(table_name)).metadata.num_rows
+
+def stage_meta(table_name):
+    """Sidecar of a table's current stage (None before it is first built); never rebuilds"""
+    return read_meta(_paths(table_name)[1])
+
+def stage_rejects(table_name):
+    """Source lines skipped as malformed while the stage was built"""
+    ensure_stage(table_name)
+    return stage_meta(table_name).get('rejects', [])
@@ -0,0 +1,330 @@
+"""
+AirPure AQI Analytics - Synthetic Source Generator
+===================================================
+Writes schema-faithful synthetic versions of the four source files (same
+file names, column headers, date formats and encodings as in sources.FILES)
+at a configurable scale, for benchmarking the ETL, the analysis and the
+exports beyond the size of the real data.
+
+Scale 1 matches the verified source row counts (425,971 AQI rows, 26,556
+disease rows, 199,552 vehicle rows, 8,892 population rows); --scale 10 and
+--scale 100 give roughly 4M and 40M AQI rows. Distributions follow the
+real data's shape:
+
+    aqi_daily    areas per state, a per-area baseline (higher in the north),
+                 a winter peak, day-to-day noise, missing days per area,
+                 CPCB status bands and weighted (sometimes two distinct)
+                 prominent pollutants
+    disease      weighted disease mix, heavy-tailed case counts, rare deaths
+    vehicle      weighted fuel / vehicle class mix, heavy-tailed counts
+    population   state x year x gender projections (2011-2036)
+
+Rows are generated and appended in batches, so memory stays bounded at
+any scale.
+
+Usage:
+    python synthetic_data.py --output d:\\bench\\x10 --scale 10
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sources import COLUMN_MAPPING, FILES
+
+# =====================================================
+# Configuration
+# =====================================================
+
+BASE_ROWS = {
+    'aqi_daily': 425971,
+    'disease_outbreak': 26556,
+    'vehicle_registration': 199552,
+    'population': 8892,
+}
+
+# Monitoring areas per state at scale 1 (extra areas are added at larger scales)
+STATE_AREAS = {
+    'Andhra Pradesh': ['Visakhapatnam', 'Vijayawada', 'Tirupati', 'Guntur', 'Nellore', 'Anantapur'],
+    'Assam': ['Guwahati', 'Silchar', 'Byrnihat', 'Nalbari', 'Sivasagar'],
+    'Bihar': ['Patna', 'Gaya', 'Muzaffarpur', 'Hajipur', 'Bhagalpur', 'Purnia', 'Arrah', 'Begusarai'],
+    'Chhattisgarh': ['Raipur', 'Bhilai', 'Bilaspur', 'Korba'],
+    'Delhi': ['Delhi'],
+    'Gujarat': ['Ahmedabad', 'Surat', 'Vadodara', 'Gandhinagar', 'Ankleshwar', 'Vapi', 'Rajkot'],
+    'Haryana': ['Gurugram', 'Faridabad', 'Panipat', 'Rohtak', 'Hisar', 'Sonipat', 'Ambala',
+                'Karnal', 'Bhiwani', 'Jind', 'Kaithal', 'Yamunanagar', 'Sirsa', 'Fatehabad'],
+    'Himachal Pradesh': ['Shimla', 'Baddi', 'Dharamshala'],
+    'Jharkhand': ['Ranchi', 'Dhanbad', 'Jamshedpur'],
+    'Karnataka': ['Bengaluru', 'Mysuru', 'Mangaluru', 'Hubballi', 'Belagavi', 'Kalaburagi',
+                  'Chamarajanagar', 'Madikeri', 'Davanagere', 'Shivamogga', 'Udupi', 'Vijayapura'],
+    'Kerala': ['Thiruvananthapuram', 'Kochi', 'Kozhikode', 'Kannur', 'Thrissur', 'Kollam'],
+    'Madhya Pradesh': ['Bhopal', 'Indore', 'Gwalior', 'Jabalpur', 'Ujjain', 'Sagar', 'Dewas',
+                       'Satna', 'Singrauli', 'Katni'],
+    'Maharashtra': ['Mumbai', 'Pune', 'Nagpur', 'Nashik', 'Aurangabad', 'Solapur', 'Thane',
+                    'Navi Mumbai', 'Kalyan', 'Chandrapur', 'Amravati', 'Kolhapur', 'Latur', 'Jalgaon'],
+    'Meghalaya': ['Shillong'],
+    'Mizoram': ['Aizawl'],
+    'Odisha': ['Bhubaneswar', 'Cuttack', 'Rourkela', 'Talcher', 'Balasore'],
+    'Puducherry': ['Puducherry'],
+    'Punjab': ['Amritsar', 'Ludhiana', 'Jalandhar', 'Patiala', 'Bathinda', 'Khanna', 'Mandi Gobindgarh'],
+    'Rajasthan': ['Jaipur', 'Jodhpur', 'Kota', 'Udaipur', 'Ajmer', 'Alwar', 'Bhiwadi', 'Bikaner',
+                  'Pali', 'Sikar', 'Churu', 'Jhunjhunu'],
+    'Tamil Nadu': ['Chennai', 'Coimbatore', 'Madurai', 'Tiruchirappalli', 'Salem', 'Tirunelveli',
+                   'Thanjavur', 'Palkalaiperur', 'Vellore', 'Hosur', 'Gummidipoondi', 'Ooty'],
+    'Telangana': ['Hyderabad'],
+    'Tripura': ['Agartala'],
+    'Uttar Pradesh': ['Lucknow', 'Kanpur', 'Agra', 'Varanasi', 'Noida', 'Ghaziabad', 'Meerut',
+                      'Greater Noida', 'Prayagraj', 'Gorakhpur', 'Moradabad', 'Bulandshahr',
+                      'Muzaffarnagar', 'Hapur', 'Baghpat', 'Firozabad', 'Jhansi', 'Bareilly'],
+    'Uttarakhand': ['Dehradun', 'Rishikesh', 'Kashipur'],
+    'West Bengal': ['Kolkata', 'Howrah', 'Asansol', 'Durgapur', 'Siliguri', 'Haldia'],
+}
+
+# States with markedly higher baseline AQI (Indo-Gangetic plain)
+HIGH_AQI_STATES = ['Delhi', 'Haryana', 'Uttar Pradesh', 'Bihar', 'Punjab', 'Rajasthan']
+
+# (upper bound, status) per CPCB AQI band
+STATUS_BANDS = [(50, 'Good'), (100, 'Satisfactory'), (200, 'Moderate'), (300, 'Poor'),
+                (400, 'Very Poor'), (np.inf, 'Severe')]
+
+POLLUTANT_WEIGHTS = {'PM10': 0.52, 'PM2.5': 0.26, 'O3': 0.08, 'CO': 0.06, 'NO2': 0.05,
+                     'SO2': 0.02, 'NH3': 0.01}
+MULTI_POLLUTANT_SHARE = 0.12
+
+DISEASE_WEIGHTS = {'Acute Diarrhoeal Disease': 0.24, 'Food Poisoning': 0.18, 'Dengue': 0.1,
+                   'Chickenpox': 0.1, 'Measles': 0.08, 'Hepatitis A': 0.06, 'Cholera': 0.05,
+                   'Malaria': 0.05, 'Chikungunya': 0.04, 'Leptospirosis': 0.04, 'Mumps': 0.03,
+                   'Typhoid': 0.03}
+
+FUEL_WEIGHTS = {'PETROL': 0.46, 'DIESEL': 0.2, 'CNG ONLY': 0.06, 'ELECTRIC(BOV)': 0.08,
+                'PURE EV': 0.03, 'PETROL/CNG': 0.05, 'STRONG HYBRID EV': 0.01, 'LPG ONLY': 0.01,
+                'NOT APPLICABLE': 0.1}
+
+VEHICLE_CLASS_WEIGHTS = {'MOTOR CYCLE/SCOOTER': 0.4, 'MOTOR CAR': 0.2, 'GOODS CARRIER': 0.1,
+                         'E-RICKSHAW(P)': 0.06, 'THREE WHEELER(T)': 0.06, 'BUS': 0.04,
+                         'TRACTOR (COMMERCIAL)': 0.08, 'MOPED': 0.06}
+
+AQI_END_DATE = pd.Timestamp('2025-06-30')
+AQI_AREA_BATCH = 50
+ROW_BATCH = 500000
+
+# openpyxl / Excel sheet limit (header row excluded)
+EXCEL_MAX_ROWS = 1048575
+
+# =====================================================
+# Helpers
+# =====================================================
+
+def _weighted(rng, weights, size):
+    """Draw size labels from a {label: weight} dict"""
+    labels = np.array(list(weights))
+    p = np.array(list(weights.values()), dtype='float64')
+    return labels[rng.choice(len(labels), size=size, p=p / p.sum())]
+
+def _status(values):
+    """CPCB air quality status for each AQI value"""
+    bounds = np.array([upper for upper, _ in STATUS_BANDS])
+    labels = np.array([label for _, label in STATUS_BANDS])
+    return labels[np.searchsorted(bounds, values, side='left')]
+
+def _distinct_second(rng, weights, first):
+    """A second label per row, drawn from weights without that row's first label"""
+    second = np.empty(len(first), dtype=object)
+    for label in np.unique(first):
+        rows = np.nonzero(first == label)[0]
+        others = {other: weight for other, weight in weights.items() if other != label}
+        second[rows] = _weighted(rng, others, len(rows))
+    return second
+
+def _areas(scale):
+    """(state, area) pairs; the area count grows with sqrt(scale)
+
+    Scales below 1 keep evenly spaced areas, so every region stays
+    represented; larger scales add numbered areas.
+    """
+    pairs = [(state, area) for state, areas in STATE_AREAS.items() for area in areas]
+    target = max(1, int(round(len(pairs) * max(scale, 0) ** 0.5)))
+    if target < len(pairs):
+        return [pairs[i] for i in np.linspace(0, len(pairs) - 1, target).round().astype(int)]
+    extra = [(state, f"{area} Zone {k}") for k in range(2, target) for state, area in pairs]
+    return (pairs + extra)[:target]
+
+def _write(frame, path, encoding, first):
+    """Append a batch to a CSV (header on the first batch)"""
+    frame.to_csv(path, mode='w' if first else 'a', header=first, index=False, encoding=encoding)
+
+def _source_columns(table_name):
+    """Source column names in mapping order"""
+    return list(COLUMN_MAPPING[table_name])
+
+# =====================================================
+# Generators
+# =====================================================
+
+def generate_aqi(path, rows, scale, rng):
+    """Daily AQI rows for every area, area by area in date order"""
+    areas = _areas(scale)
+    coverage = rng.uniform(0.75, 1.0, len(areas))
+    days = int(np.ceil(rows / (len(areas) * coverage.mean()))) + 1
+    dates = pd.date_range(end=AQI_END_DATE, periods=days)
+    doy = dates.dayofyear.to_numpy()
+    season = 1 + 0.35 * np.cos(2 * np.pi * (doy - 15) / 365.25)
+    date_text = dates.strftime('%d-%m-%Y').to_numpy()
+
+    written = 0
+    for start in range(0, len(areas), AQI_AREA_BATCH):
+        if written >= rows:
+            break
+        batch = areas[start:start + AQI_AREA_BATCH]
+        n_areas = len(batch)
+        baseline = rng.lognormal(np.log(95), 0.45, n_areas)
+        baseline *= np.where([state in HIGH_AQI_STATES for state, _ in batch], 1.7, 1.0)
+        stations = rng.geometric(0.3, n_areas).clip(1, 40)
+
+        present = rng.random((n_areas, days)) < coverage[start:start + n_areas, None]
+        area_idx, day_idx = np.nonzero(present)
+        values = baseline[area_idx] * season[day_idx] * rng.lognormal(0, 0.25, len(area_idx))
+        values = np.clip(np.round(values), 5, 500)
+
+        pollutants = _weighted(rng, POLLUTANT_WEIGHTS, len(area_idx)).astype(object)
+        multi = np.nonzero(rng.random(len(area_idx)) < MULTI_POLLUTANT_SHARE)[0]
+        pollutants[multi] = pollutants[multi] + ',' + _distinct_second(rng, POLLUTANT_WEIGHTS, pollutants[multi])
+
+        frame = pd.DataFrame({
+            'date': date_text[day_idx],
+            'state': np.array([state for state, _ in batch])[area_idx],
+            'area': np.array([area for _, area in batch])[area_idx],
+            'number_of_monitoring_stations': stations[area_idx],
+            'prominent_pollutants': pollutants,
+            'aqi_value': values.astype('int64'),
+            'air_quality_status': _status(values),
+            'unit': 'number_of_monitoring_stations in Absolute Number, aqi_value in Index',
+            'note': '',
+        })
+        frame = frame.iloc[:rows - written]
+        _write(frame, path, FILES['aqi_daily']['encoding'], written == 0)
+        written += len(frame)
+    return written
+
+def generate_disease(path, rows, rng):
+    """Weekly IDSP outbreak reports"""
+    states = list(STATE_AREAS)
+    written = 0
+    while written < rows:
+        n = min(ROW_BATCH, rows - written)
+        year = rng.integers(2018, 2026, n)
+        week = rng.integers(1, 53, n)
+        outbreak = pd.to_datetime(pd.DataFrame({'year': year, 'month': 1, 'day': 1})) \
+            + pd.to_timedelta((week - 1) * 7 + rng.integers(0, 7, n), unit='D')
+        reporting = outbreak + pd.to_timedelta(rng.integers(0, 15, n), unit='D')
+        state = np.array(states)[rng.integers(0, len(states), n)]
+        frame = pd.DataFrame({
+            'year': year,
+            'week': week,
+            'outbreak_starting_date': outbreak.dt.strftime('%d-%m-%Y'),
+            'reporting_date': reporting.dt.strftime('%d-%m-%Y'),
+            'state': state,
+            'district': pd.Series(state).str.split().str[0] + ' District ' + pd.Series(rng.integers(1, 25, n)).astype(str),
+            'disease / illness name': _weighted(rng, DISEASE_WEIGHTS, n),
+            'status': 'Reported',
+            'cases': rng.geometric(0.05, n),
+            'deaths': np.where(rng.random(n) < 0.06, rng.geometric(0.6, n), 0),
+            'unit': 'cases in Number, deaths in Number',
+            'note': '',
+        })[_source_columns('disease_outbreak')]
+        _write(frame, path, FILES['disease_outbreak']['encoding'], written == 0)
+        written += n
+    return written
+
+def generate_vehicle(path, rows, rng):
+    """Monthly registrations per RTO, vehicle class and fuel"""
+    states = list(STATE_AREAS)
+    written = 0
+    while written < rows:
+        n = min(ROW_BATCH, rows - written)
+        state = np.array(states)[rng.integers(0, len(states), n)]
+        frame = pd.DataFrame({
+            'year': rng.integers(2018, 2026, n),
+            'month': rng.integers(1, 13, n),
+            'state': state,
+            'rto': pd.Series(state).str[:2].str.upper() + pd.Series(rng.integers(1, 99, n)).map('{:02d}'.format),
+            'vehicle_class': _weighted(rng, VEHICLE_CLASS_WEIGHTS, n),
+            'fuel': _weighted(rng, FUEL_WEIGHTS, n),
+            'value': np.round(rng.pareto(1.3, n) * 40).astype('int64'),
+            'unit': 'value in Number',
+            'note': '',
+        })[_source_columns('vehicle_registration')]
+        _write(frame, path, FILES['vehicle_registration']['encoding'], written == 0)
+        written += n
+    return written
+
+def generate_population(path, rows, rng):
+    """Projected urban population (thousands) per state, year, month and gender"""
+    rows = min(rows, EXCEL_MAX_ROWS)
+    states = list(STATE_AREAS)
+    combos = len(states) * 26 * 3
+    months = max(1, int(np.ceil(rows / combos)))
+    grid = pd.MultiIndex.from_product([states, range(2011, 2037), range(1, months + 1),
+                                       ['Total', 'Male', 'Female']],
+                                      names=['state', 'year', 'month', 'gender']).to_frame(index=False)
+    grid = grid.iloc[:rows]
+    base = grid['state'].map({state: rng.uniform(200, 30000) for state in states})
+    growth = 1.02 ** (grid['year'] - 2011)
+    share = grid['gender'].map({'Total': 1.0, 'Male': 0.52, 'Female': 0.48})
+    grid['value'] = np.round(base * growth * share, 2)
+    grid.to_excel(path, index=False)
+    return len(grid)
+
+# =====================================================
+# Main Execution
+# =====================================================
+
+def generate(output_dir, scale=1.0, seed=42, tables=None, rows=None):
+    """Write the synthetic sources into output_dir; returns {table: rows}"""
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    rows = rows or {}
+    counts = {}
+    for table_name in tables or FILES:
+        target = rows.get(table_name) or max(1, int(round(BASE_ROWS[table_name] * scale)))
+        path = os.path.join(output_dir, FILES[table_name]['file'])
+        started = time.perf_counter()
+        if table_name == 'aqi_daily':
+            counts[table_name] = generate_aqi(path, target, scale, rng)
+        elif table_name == 'disease_outbreak':
+            counts[table_name] = generate_disease(path, target, rng)
+        elif table_name == 'vehicle_registration':
+            counts[table_name] = generate_vehicle(path, target, rng)
+        else:
+            counts[table_name] = generate_population(path, target, rng)
+        print(f"  [OK] {table_name:<22} {counts[table_name]:>12,} rows in {time.perf_counter() - started:.1f}s")
+    return counts
+
+def parse_args():
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Generate synthetic AQI source files")
+    parser.add_argument('--output', required=True, help="directory for the generated source files")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiple of the real row counts (default 1; 10 ~ 4M, 100 ~ 40M AQI rows)")
+    parser.add_argument('--aqi-rows', type=int, help="exact aqi_daily row count (overrides --scale)")
+    parser.add_argument('--seed', type=int, default=42, help="random seed (default 42)")
+    parser.add_argument('--table', action='append', choices=list(FILES),
+                        help="generate only this table (repeatable; default all)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("AirPure AQI Analytics - Synthetic Data Generator")
+    print("=" * 60)
+    print(f"Scale: {args.scale:g} | Seed: {args.seed} | Output: {args.output}")
+
+    generate(args.output, scale=args.scale, seed=args.seed, tables=args.table,
+             rows={'aqi_daily': args.aqi_rows} if args.aqi_rows else None)
+
+if __name__ == "__main__":
+    main()
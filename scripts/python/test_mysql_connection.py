@@ -3,17 +3,12 @@ MySQL Connection Tester
 Purpose: Test MySQL connection with different passwords
 """
 
-import pymysql
+from db import CONFIG_PATH, connect, db_config
 
 def test_mysql_connection(password=''):
     """Test MySQL connection with given password"""
     try:
-        connection = pymysql.connect(
-            host='localhost',
-            user='root',
-            password=password,
-            port=3306
-        )
+        connection = connect(database=False, password=password)
         print(f"✅ SUCCESS! Connected to MySQL")
         print(f"   Password: '{password if password else '(EMPTY/BLANK)'}'")
         
@@ -41,8 +36,9 @@ def main():
     print("\nTesting MySQL connection with common passwords...")
     print("-" * 60)
     
-    # Common passwords to try (in order of likelihood)
+    # The configured password first, then common ones (in order of likelihood)
     passwords_to_test = [
+        (db_config()['password'], f"configured ({CONFIG_PATH})"),
         ('', 'Empty/Blank (No Password)'),
         ('root', 'root'),
         ('admin', 'admin'),
@@ -68,15 +64,15 @@ def main():
             print("🎉 CONNECTION SUCCESSFUL!")
             print("=" * 60)
             print(f"\n📝 Your MySQL password is: '{pwd if pwd else '(EMPTY)'}'")
-            print("\n💡 Update your ETL script with:")
+            config = db_config()
+            print(f"\n💡 Save it in {CONFIG_PATH} (copy of database_config.ini.template):")
             print("-" * 60)
-            print(f"DB_CONFIG = {{")
-            print(f"    'host': 'localhost',")
-            print(f"    'user': 'root',")
-            print(f"    'password': '{pwd}',  # ← Use this")
-            print(f"    'database': 'airpure_aqi_db',")
-            print(f"    'port': 3306")
-            print(f"}}")
+            print("[database]")
+            print(f"host = {config['host']}")
+            print(f"port = {config['port']}")
+            print(f"user = {config['user']}")
+            print(f"password = {pwd}")
+            print(f"database = {config['database']}")
             print("-" * 60)
             break
         else:
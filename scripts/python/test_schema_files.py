@@ -0,0 +1,69 @@
+"""
+Schema File Tests
+Purpose: Every schema file splits into executable statements, and every
+         table the scripts write to is created by one of them
+Run: python -m pytest test_schema_files.py
+"""
+
+import glob
+import os
+import re
+
+import pytest
+
+import aqi_rolling
+import materialized_views
+from aqi_rollup import ROLLUP_SOURCES
+from etl_simple import schema_statements
+from etl_star_schema import FACT_BRIDGES, FACT_ROLLUPS, FACTS
+from sources import FILES
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database', 'schema')
+
+SCHEMA_FILES = sorted(glob.glob(os.path.join(SCHEMA_DIR, '*.sql')))
+
+STATEMENT_KEYWORDS = ('USE', 'CREATE', 'DROP', 'ALTER', 'INSERT', 'SELECT')
+
+# Written by code without a table-name constant (etl_star_schema dimension
+# loaders, etl_checkpoint)
+OTHER_WRITTEN_TABLES = ['dim_state', 'dim_city', 'dim_date', 'dim_population',
+                        'etl_checkpoint', 'etl_reject']
+
+def statements(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(schema_statements(f.read()))
+
+def written_tables():
+    """Tables the Python modules insert into, delete from or refresh"""
+    tables = set(FILES) | {info['rollup'] for info in FILES.values() if info.get('rollup')}
+    tables |= set(FACTS) | set(FACT_ROLLUPS.values()) | set(FACT_BRIDGES.values()) | set(ROLLUP_SOURCES)
+    tables |= {materialized_views.LOG_TABLE, aqi_rolling.ROLLING_TABLE, aqi_rolling.STREAK_TABLE}
+    return sorted(tables | set(OTHER_WRITTEN_TABLES))
+
+def test_schema_files_found():
+    assert len(SCHEMA_FILES) >= 3
+
+@pytest.mark.parametrize('path', SCHEMA_FILES, ids=os.path.basename)
+def test_statements_start_with_keyword(path):
+    """No comment text (e.g. after a ';' in a comment) ends up in a statement"""
+    for stmt in statements(path):
+        assert stmt.split()[0].upper() in STATEMENT_KEYWORDS, stmt[:80]
+
+def test_written_tables_are_created():
+    created = set()
+    for path in SCHEMA_FILES:
+        for stmt in statements(path):
+            match = re.match(r'CREATE TABLE\s+(?:IF NOT EXISTS\s+)?`?(\w+)`?', stmt, re.IGNORECASE)
+            if match:
+                created.add(match.group(1))
+    missing = [table for table in written_tables() if table not in created]
+    assert not missing
+
+def test_semicolon_in_comment_does_not_split():
+    sql = ("-- Means are sums; counts follow\n"
+           "CREATE TABLE t (\n"
+           "    note VARCHAR(10) DEFAULT '--',  -- inline; comment\n"
+           "    n INT\n"
+           ");\n")
+    assert list(schema_statements(sql)) == [
+        "CREATE TABLE t (\n    note VARCHAR(10) DEFAULT '--',\n    n INT\n)"]
@@ -2,52 +2,41 @@
 AirPure AQI Analytics - Data Verification Script
 =================================================
 Compares row counts between source files and MySQL tables.
+All table counts come from one query over a single pooled connection.
 """
 
-import pymysql
-import os
+from db import db_config, get_engine, table_counts
+from sources import FILES
+from staging import staged_row_count
 
-# Configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'admin',
-    'database': 'airpure_aqi_db'
-}
+def count_source_rows(table_name):
+    """Count source rows (excluding header) via the staging cache
 
-BASE_PATH = r'd:\FEB_AQI_P2\AQI_dataset_Original\Dataful_Datasets'
-
-FILES = {
-    'aqi_daily': 'day-wise-state-wise-air-quality-index-aqi-of-major-cities-and-towns-in-india.csv',
-    'disease_outbreak': 'master-data-state-district-and-disease-wise-cases-and-death-reported-due-to-outbreak-of-diseases-as-per-weekly-reports-under-idsp.csv',
-    'vehicle_registration': 'master-data-state-vehicle-class-and-fuel-type-wise-total-number-of-vehicles-registered-in-each-month-in-india.csv',
-    'population': 'population-projection-of-india-state-and-gender-wise-yearly-projected-urban-population-2011-2036.xlsx'
-}
-
-def count_file_rows(file_path):
-    """Count rows in a file (excluding header)"""
+    The count comes from Parquet metadata, so quoted multi-line CSV fields
+    are counted once and the .xlsx is parsed only when it changes.
+    """
     try:
-        if file_path.endswith('.xlsx'):
-            import pandas as pd
-            df = pd.read_excel(file_path)
-            return len(df)
-        else:
-            with open(file_path, 'rb') as f:
-                return sum(1 for _ in f) - 1
+        return staged_row_count(table_name)
     except Exception as e:
         return f"Error: {e}"
 
-def count_db_rows(table_name):
-    """Count rows in a database table"""
+def count_db_rows(engine, tables):
+    """{table: rows} for every table in one batched query (an error string for missing tables)"""
     try:
-        conn = pymysql.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        counts = table_counts(engine, tables)
     except Exception as e:
-        return f"Error: {e}"
+        return {table: f"Error: {e}" for table in tables}
+    return {table: count if count is not None else "Error: no such table" for table, count in counts.items()}
+
+def count_rejects(engine):
+    """Rejected lines/rows per table recorded by the ETL (empty if none or no etl_reject table)"""
+    try:
+        with engine.connect() as conn:
+            result = conn.exec_driver_sql("SELECT table_name, COUNT(source_line), COUNT(source_row) "
+                                          "FROM etl_reject GROUP BY table_name").fetchall()
+        return {table: (lines, rows) for table, lines, rows in result}
+    except Exception:
+        return {}
 
 def main():
     print("=" * 80)
@@ -57,12 +46,12 @@ def main():
     print("-" * 80)
     
     all_match = True
+    engine = get_engine(pool_size=1, max_overflow=0)
+    db_counts = count_db_rows(engine, list(FILES))
     
-    for table, filename in FILES.items():
-        file_path = os.path.join(BASE_PATH, filename)
-        
-        source_count = count_file_rows(file_path)
-        db_count = count_db_rows(table)
+    for table in FILES:
+        source_count = count_source_rows(table)
+        db_count = db_counts[table]
         
         if isinstance(source_count, int) and isinstance(db_count, int):
             if source_count == db_count:
@@ -81,13 +70,20 @@ def main():
     
     print("=" * 80)
     
+    rejects = count_rejects(engine)
+    engine.dispose()
+    if rejects:
+        print("\nRejected during load (details in etl_reject):")
+        for table, (lines, rows) in rejects.items():
+            print(f"  {table:<25} {lines:>8,} malformed source lines, {rows:>8,} rows refused by MySQL")
+    
     if all_match:
         print("\n[SUCCESS] All tables verified - Data integrity confirmed!")
         print("You can now connect Power BI to the MySQL database.")
     else:
-        print("\n[WARNING] Some tables have mismatched counts. Please review.")
+        print("\n[WARNING] Some tables have mismatched counts. Run reconcile.py to find the rows.")
     
-    print("\nDatabase: airpure_aqi_db")
+    print(f"\nDatabase: {db_config()['database']}")
     print("Tables: aqi_daily, disease_outbreak, vehicle_registration, population")
 
 if __name__ == "__main__":